@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from uds import models
+from uds.core.util import permissions
+from uds.REST.methods.services_pools import ServicesPools
+
+from tests import fixtures
+from tests.REST.utils import createHandler
+
+POOLS = 5000
+# Session, user, configuration, permissions and the pools query (and its prefetchs) do not depend on number of pools
+MAX_QUERIES = 12
+
+
+class ServicesPoolsListingTest(TestCase):
+    def setUp(self) -> None:
+        self.pools = fixtures.createServicePools(POOLS, max_srvs=10)
+        auth = fixtures.createAuthenticator()
+        self.user = fixtures.createUsers(auth, 1)[0]
+        self.user.staff_member = True
+        self.user.save()
+        group = fixtures.createGroups(auth, 1)[0]
+        self.user.groups.add(group)
+
+        # Every third pool readable by user, every fifth by its group (and so, some by both)
+        for i, pool in enumerate(self.pools):
+            if i % 3 == 0:
+                permissions.addUserPermission(self.user, pool, permissions.PERMISSION_READ)
+            if i % 5 == 0:
+                permissions.addGroupPermission(group, pool, permissions.PERMISSION_MANAGEMENT)
+
+    def readable(self) -> dict:
+        return {
+            pool.uuid: permissions.PERMISSION_MANAGEMENT if i % 5 == 0 else permissions.PERMISSION_READ
+            for i, pool in enumerate(self.pools)
+            if i % 3 == 0 or i % 5 == 0
+        }
+
+    def test_listing_queries_are_bounded(self) -> None:
+        for args in ((), ('overview',)):
+            handler = createHandler(ServicesPools, self.user, *args)
+            with CaptureQueriesContext(connection) as queries:
+                result = handler.get()
+
+            self.assertLessEqual(len(queries), MAX_QUERIES, args)
+            self.assertEqual({item['id']: item['permission'] for item in result}, self.readable())
+
+    def test_paged_listing_queries_are_bounded(self) -> None:
+        readable = sorted(self.readable())
+        handler = createHandler(ServicesPools, self.user, 'overview', params={'order': 'uuid', 'offset': '100', 'limit': '50'})
+        with CaptureQueriesContext(connection) as queries:
+            result = handler.get()
+
+        self.assertLessEqual(len(queries), MAX_QUERIES)
+        self.assertEqual([item['id'] for item in result], readable[100:150])
+        self.assertEqual(handler.headers()['X-Total-Count'], str(len(readable)))
+
+    def test_admin_listing(self) -> None:
+        self.user.is_admin = True
+        self.user.save()
+        handler = createHandler(ServicesPools, self.user, 'overview', params={'offset': '0', 'limit': '10'})
+        with CaptureQueriesContext(connection) as queries:
+            result = handler.get()
+
+        self.assertLessEqual(len(queries), MAX_QUERIES)
+        self.assertEqual([item['id'] for item in result], [p.uuid for p in models.ServicePool.objects.order_by('name', 'pk')[:10]])
+        self.assertEqual({item['permission'] for item in result}, {permissions.PERMISSION_ALL})
+        self.assertEqual(handler.headers()['X-Total-Count'], str(POOLS))
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import fnmatch
+import typing
+
+from django.db.models import Q
+from django.test import TestCase
+
+from uds import models
+from uds.core.util import permissions
+from uds.REST.methods.authenticators import Authenticators
+from uds.REST.methods.services_pools import ServicesPools
+
+from tests import fixtures
+from tests.REST.utils import createHandler
+
+POOLS = 60
+
+
+class ModelHandlerTest(TestCase):
+    def setUp(self) -> None:
+        self.pools = fixtures.createServicePools(POOLS, max_srvs=10)
+        for i, pool in enumerate(self.pools):  # Names with repeated values, so ties must be resolved
+            pool.name = 'Pool {:02d}'.format(i // 2)
+            pool.short_name = 'short' if i % 4 == 0 else ''
+            pool.save()
+        auth = fixtures.createAuthenticator()
+        self.user = fixtures.createUsers(auth, 1)[0]
+        self.user.staff_member = True
+        self.user.save()
+        # Every third pool readable by user
+        self.readable = [pool for i, pool in enumerate(self.pools) if i % 3 == 0]
+        for pool in self.readable:
+            permissions.addUserPermission(self.user, pool, permissions.PERMISSION_READ)
+
+    def handler(self, *args: str, **params: str) -> typing.Any:
+        return createHandler(ServicesPools, self.user, *args, params=params)
+
+    def lookup(self, fltr: str) -> typing.Optional[Q]:
+        handler = self.handler()
+        handler.fltr = fltr
+        return handler.filterLookup(models.ServicePool)
+
+    def test_filter_lookup(self) -> None:
+        self.assertEqual(self.lookup('name=Pool 01'), Q(name__iexact='Pool 01'))
+        self.assertEqual(self.lookup('name=^Pool 01$'), Q(name__iexact='Pool 01'))
+        self.assertEqual(self.lookup('name=Pool*'), Q(name__istartswith='Pool'))
+        self.assertEqual(self.lookup('name=*01'), Q(name__iendswith='01'))
+        self.assertEqual(self.lookup('name=*ol 0*'), Q(name__icontains='ol 0'))
+        # Not translatable, filtered in memory
+        for fltr in ('name=Po?l', 'name=Pool [01]', 'name=P*l*1', 'name', 'id=x', 'service=x', 'max_srvs=10', 'unknown=x'):
+            self.assertIsNone(self.lookup(fltr), fltr)
+
+    def test_push_down(self) -> None:
+        query = models.ServicePool.objects.all()
+        handler = self.handler()
+        handler.fltr, handler.order = 'name=Pool 0*', '-name'
+        pushed, complete = handler.pushDown(query)
+        self.assertTrue(complete)
+        self.assertEqual(list(pushed), list(query.filter(name__istartswith='Pool 0').order_by('-name')))
+
+        # Paging resolves ties with primary key
+        handler.limit = 10
+        pushed, complete = handler.pushDown(query)
+        self.assertEqual(pushed.query.order_by, ('-name', 'pk'))
+
+        # Order not by a field of model, done in memory
+        handler.fltr, handler.order = None, 'user_services_count'
+        pushed, complete = handler.pushDown(query)
+        self.assertFalse(complete)
+
+    def test_unpaged_listing(self) -> None:
+        for args in ((), ('overview',)):
+            handler = self.handler(*args)
+            result = handler.get()
+            self.assertEqual([item['id'] for item in result], [pool.uuid for pool in self.readable], args)
+            self.assertNotIn('X-Total-Count', handler.headers())
+
+        # Filtered, both translatable and not translatable filters, gives same results as in memory filtering
+        for fltr in ('name=Pool 1*', 'name=*1?'):
+            handler = self.handler('overview', filter=fltr)
+            self.assertEqual(
+                [item['id'] for item in handler.get()],
+                [pool.uuid for pool in self.readable if fnmatch.fnmatch(pool.name.lower(), fltr[5:].lower())],
+                fltr,
+            )
+            self.assertNotIn('X-Total-Count', handler.headers())
+
+    def test_paged_listing(self) -> None:
+        expected = sorted(self.readable, key=lambda pool: (pool.name, pool.pk))
+        handler = self.handler('overview', order='name', offset='3', limit='5')
+        self.assertEqual([item['id'] for item in handler.get()], [pool.uuid for pool in expected[3:8]])
+        # Total of readable items, not of items on database
+        self.assertEqual(handler.headers()['X-Total-Count'], str(len(self.readable)))
+
+        # Pages cover all items, with no repetitions, even with ties
+        pages: typing.List[str] = []
+        for offset in range(0, len(self.readable), 4):
+            pages += [item['id'] for item in self.handler('overview', order='-name', offset=str(offset), limit='4').get()]
+        self.assertEqual(sorted(pages), sorted(pool.uuid for pool in self.readable))
+
+    def test_paged_filtered_listing(self) -> None:
+        matching = [pool for pool in self.readable if pool.name.startswith('Pool 1')]
+        handler = self.handler('overview', filter='name=Pool 1*', offset='1', limit='2')
+        self.assertEqual(len(handler.get()), 2)
+        self.assertEqual(handler.headers()['X-Total-Count'], str(len(matching)))
+
+        # Filter not translatable, paged in memory
+        handler = self.handler('overview', filter='name=Pool 1?', offset='1', limit='100')
+        self.assertEqual([item['id'] for item in handler.get()], [pool.uuid for pool in matching[1:]])
+        self.assertEqual(handler.headers()['X-Total-Count'], str(len(matching)))
+
+    def test_paged_by_not_field(self) -> None:
+        # "id" of REST items is the uuid, so sorting is done in memory
+        handler = self.handler('overview', order='-id', offset='2', limit='3')
+        self.assertEqual([item['id'] for item in handler.get()], sorted((pool.uuid for pool in self.readable), reverse=True)[2:5])
+        self.assertEqual(handler.headers()['X-Total-Count'], str(len(self.readable)))
+
+    def test_paging_only_on_listings(self) -> None:
+        auth = models.Authenticator.objects.get()
+        admin = auth.users.create(name='admin', real_name='', comments='', state='A', is_admin=True)
+
+        handler = createHandler(Authenticators, admin, params={'limit': '10', 'offset': '2'})
+        handler.extractFilter()
+        self.assertEqual((handler.offset, handler.limit), (2, 10))
+        self.assertNotIn('limit', handler._params)
+
+        handler = createHandler(Authenticators, admin, auth.uuid, 'users', params={'limit': '10'})
+        handler.extractFilter()
+        self.assertEqual(handler.limit, 10)
+
+        # Custom methods (as search) and items get the parameters
+        for args in ((auth.uuid, 'search'), (auth.uuid,), (auth.uuid, 'users', admin.uuid)):
+            handler = createHandler(Authenticators, admin, *args, params={'limit': '10', 'term': 'a', 'type': 'user'})
+            handler.extractFilter()
+            self.assertIsNone(handler.limit, args)
+            self.assertEqual(handler._params['limit'], '10', args)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory
+
+from uds import models
+from uds.REST.handlers import Handler, AUTH_TOKEN_HEADER
+
+
+def createHandler(
+        cls: typing.Type[Handler],
+        user: models.User,
+        *args: str,
+        params: typing.Optional[typing.Dict[str, typing.Any]] = None,
+        operation: str = 'get'
+    ) -> typing.Any:
+    """
+    Creates a REST handler of class cls, for a request done by user (with the privileges of the user)
+    """
+    session = SessionStore()
+    Handler.storeSessionAuthdata(session, user.manager.id, user.name, '', 'en', 'test', user.is_admin, user.staff_member, 'scrambler')
+    session.save()
+
+    request = RequestFactory().generic(operation.upper(), '/uds/rest/', **{AUTH_TOKEN_HEADER: session.session_key})
+    request.ip = '127.0.0.1'  # type: ignore
+
+    return cls(request, '', operation, params or {}, *args)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+User services batched state checks: time, queries and platform calls needed to take a number of user services
+being prepared to usable, with an op checker delayed task per user service (as providers without batchStateChecks)
+and with UserServiceBatchChecker (one checkStates call per provider and round), using the fake provider of tests.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import pickle
+import datetime
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core import services
+from uds.core.environment import Environment
+from uds.core.jobs.delayed_task import DelayedTask
+from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.managers import userServiceManager
+from uds.core.util.state import State
+from uds.core.workers.userservice_batch_checker import UserServiceBatchChecker
+
+from tests import fixtures
+from tests.fake_services import FakeProvider, FakeService
+
+
+def delayedTasksRound() -> int:
+    """
+    Executes (right now, not waiting for them to be due) all pending delayed tasks. Returns the number of them
+    """
+    claimed = DelayedTaskRunner.runner()._claimTasks(  # pylint: disable=protected-access
+        models.getSqlDatetime() + datetime.timedelta(days=1), models.DelayedTask.objects.count()
+    )
+    for _, dump in claimed:
+        task: DelayedTask = pickle.loads(dump)
+        task.env = Environment.getEnvForType(task.__class__)
+        task.execute()
+    return len(claimed)
+
+
+def batchedRound() -> int:
+    checks = len(FakeProvider.checks)
+    UserServiceBatchChecker(Environment.getTempEnv()).run()
+    return len(FakeProvider.checks) - checks
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--userservices', type=int, default=500, help='Number of user services (default %(default)s)')
+    parser.add_argument('--checks', type=int, default=3, help='State checks needed by every operation (default %(default)s)')
+    args = parser.parse_args()
+    FakeService.checksNeeded = args.checks
+
+    with utils.testDatabase():
+        rows: typing.List[typing.Tuple[str, int, float, int, int]] = []
+        for title, batched, fnc in (
+            ('delayed task per user service', False, delayedTasksRound),
+            ('batched', True, batchedRound),
+        ):
+            FakeProvider.batchStateChecks = batched
+            servicePool = fixtures.createFakeServicePool(initial_srvs=0, cache_l1_srvs=0, max_srvs=args.userservices)
+            userServices = [
+                userServiceManager().createCacheFor(servicePool.activePublication(), services.UserDeployment.L1_CACHE)
+                for _ in range(args.userservices)
+            ]
+            rounds = calls = 0
+
+            def check() -> None:
+                nonlocal rounds, calls
+                while servicePool.userServices.filter(state=State.PREPARING).exists():
+                    calls += fnc()  # pylint: disable=cell-var-from-loop
+                    rounds += 1
+
+            measure = utils.measure(check)
+            assert servicePool.userServices.filter(state=State.USABLE).count() == len(userServices)
+            rows.append((title, rounds, measure.seconds, measure.queries, calls))
+
+    utils.report(
+        'Preparing {} user services, {} checks needed by each one'.format(args.userservices, args.checks),
+        ('state checks', 'rounds', 'seconds', 'queries', 'platform calls'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
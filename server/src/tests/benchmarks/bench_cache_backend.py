@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Django cache backend of utility cache: requests sent to the django cache (memcached on production) per operation,
+reading the namespace versions on every operation (as before keeping them in process) and keeping them.
+
+The "memory" django cache of settings is used. An optional latency can be added to every request,
+to simulate a remote memcached.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import time
+import typing
+
+from tests.benchmarks import utils
+
+from uds.core.util.cache_backends import DjangoCacheBackend
+
+
+class CountingCache:
+    """
+    Wraps a django cache, counting (and delaying) the requests done to it
+    """
+
+    def __init__(self, cache: typing.Any, latency: float) -> None:
+        self.cache = cache
+        self.latency = latency
+        self.requests = 0
+
+    def __getattr__(self, name: str) -> typing.Any:
+        method = getattr(self.cache, name)
+
+        def request(*args: typing.Any, **kwargs: typing.Any) -> typing.Any:
+            self.requests += 1
+            if self.latency:
+                time.sleep(self.latency)
+            return method(*args, **kwargs)
+
+        return request
+
+
+def operations(backend: DjangoCacheBackend, owners: int, keys: int) -> int:
+    """
+    Puts, gets and refreshes keys of several owners. Returns the number of operations done
+    """
+    count = 0
+    for o in range(owners):
+        owner = 'owner{}'.format(o)
+        for k in range(keys):
+            backend.put(owner, 'key{}'.format(k), b'value', 60)
+            backend.get(owner, 'key{}'.format(k))
+            count += 2
+        backend.getMany(owner, ['key{}'.format(k) for k in range(keys)])
+        count += 1
+    return count
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--owners', type=int, default=20, help='Number of owners (default %(default)s)')
+    parser.add_argument('--keys', type=int, default=500, help='Keys per owner (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0, help='Milliseconds added to every request (default %(default)s)')
+    args = parser.parse_args()
+
+    rows: typing.List[typing.Tuple[str, float, float, float]] = []
+    for title, versionsTTL in (('versions per operation', 0), ('versions kept in process', DjangoCacheBackend.VERSIONS_TTL)):
+        backend = DjangoCacheBackend('memory')
+        backend.VERSIONS_TTL = versionsTTL
+        backend._cache.clear()  # pylint: disable=protected-access
+        counter = CountingCache(backend._cache, args.latency / 1000)  # pylint: disable=protected-access
+        backend._cache = counter  # pylint: disable=protected-access
+
+        start = time.perf_counter()
+        count = operations(backend, args.owners, args.keys)
+        seconds = time.perf_counter() - start
+        rows.append((title, seconds, count / seconds, counter.requests / count))
+
+    utils.report(
+        'Utility cache operations, {} owners with {} keys, {}ms latency'.format(args.owners, args.keys, args.latency),
+        ('namespace versions', 'seconds', 'ops/s', 'requests/op'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Utility cache cleanup: time and queries needed to purge the expired rows of uds_utility_cache,
+walking every row as before the indexed "expires" column, and with the current Cache.cleanUp.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import typing
+
+from django.db import transaction
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.models.cache import Cache
+
+
+def createRows(count: int, expired: int) -> None:
+    Cache.objects.all().delete()
+    now = models.getSqlDatetime()
+    old = now - datetime.timedelta(hours=1)
+    rows = []
+    for i in range(count):
+        created = old if i < expired else now
+        rows.append(
+            Cache(
+                owner='bench', key='key{:08d}'.format(i), value='dmFsdWU=',
+                created=created, validity=60, expires=created + datetime.timedelta(seconds=60)
+            )
+        )
+    Cache.objects.bulk_create(rows, batch_size=1000)
+
+
+def legacyCleanUp() -> None:
+    """
+    Cache.cleanUp as it was before the "expires" column
+    """
+    now = models.getSqlDatetime()
+    with transaction.atomic():
+        for v in Cache.objects.all():
+            if now > v.created + datetime.timedelta(seconds=v.validity):
+                v.delete()
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--rows', type=int, default=100000, help='Rows on cache table (default %(default)s)')
+    parser.add_argument('--expired', type=float, default=0.1, help='Fraction of expired rows (default %(default)s)')
+    args = parser.parse_args()
+    expired = int(args.rows * args.expired)
+
+    with utils.testDatabase():
+        rows: typing.List[typing.Tuple[str, float, int]] = []
+        for title, cleanUp in (('walk all rows', legacyCleanUp), ('indexed expires', Cache.cleanUp)):
+            createRows(args.rows, expired)
+            result = utils.measure(cleanUp)
+            assert Cache.objects.count() == args.rows - expired
+            rows.append((title, result.seconds, result.queries))
+
+    utils.report(
+        'Cleaning {} expired rows of {}'.format(expired, args.rows),
+        ('cleanup', 'seconds', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Cache prediction offline replay: a synthetic demand trace (with a login storm every weekday morning) is stored
+as cache hit events for some weeks, and the following week is replayed hour by hour, keeping the L1 cache of every
+pool at cache_l1_srvs (prediction disabled) or at the target of ServiceCacheUpdater.cacheL1Target with the
+predicted demand.
+
+Every hour starts with the target number of elements ready on cache, and every request over it is a user
+waiting for a new deployment (a miss). Element hours (the sum of the targets) is the cost of keeping the cache.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import time
+import random
+import datetime
+import typing
+from unittest import mock
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.environment import Environment
+from uds.core.util.stats import events
+from uds.core.workers.servicepools_cache_updater import ServiceCacheUpdater
+
+from tests import fixtures
+
+HOUR = 3600
+WEEK = 7 * 24 * HOUR
+REPLAY_START = datetime.datetime(2020, 3, 2)  # A monday
+
+
+def demand(rnd: random.Random, stamp: int, storm: int) -> int:
+    """
+    Requests of a pool in the hour starting at stamp: a storm at 8h on weekdays, some requests on working hours
+    """
+    date = datetime.datetime.fromtimestamp(stamp)
+    if date.weekday() >= 5:
+        return rnd.randint(0, 1)
+    if date.hour == 8:
+        return max(0, storm + rnd.randint(-storm // 4, storm // 4))
+    if 9 <= date.hour < 18:
+        return rnd.randint(0, 3)
+    return 0
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--pools', type=int, default=20, help='Number of pools (default %(default)s)')
+    parser.add_argument('--storm', type=int, default=15, help='Mean requests of the morning storm (default %(default)s)')
+    parser.add_argument('--cache', type=int, default=2, help='Configured L1 cache of pools (default %(default)s)')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    start = int(time.mktime(REPLAY_START.timetuple()))
+
+    with utils.testDatabase():
+        pools = fixtures.createServicePools(args.pools, cache_l1_srvs=args.cache)
+        history = [
+            models.StatsEvents(
+                owner_type=events.OT_DEPLOYED, owner_id=pool.id, event_type=events.ET_CACHE_HIT, stamp=hour + rnd.randrange(HOUR)
+            )
+            for hour in range(start - ServiceCacheUpdater.PREDICTION_WEEKS * WEEK, start, HOUR)
+            for pool in pools
+            for _ in range(demand(rnd, hour, args.storm))
+        ]
+        models.StatsEvents.objects.bulk_create(history, batch_size=5000)
+        trace = {(pool.id, hour): demand(rnd, hour, args.storm) for hour in range(start, start + WEEK, HOUR) for pool in pools}
+
+        updater = ServiceCacheUpdater(Environment.getTempEnv())
+        misses = {'static': 0, 'predicted': 0}
+        elementHours = {'static': 0, 'predicted': 0}
+        predictionTime = 0.0
+        for hour in range(start, start + WEEK, HOUR):
+            with mock.patch('uds.core.workers.servicepools_cache_updater.getSqlDatetimeAsUnix', return_value=hour):
+                measure = utils.measure(lambda: setattr(updater, '_predictedDemand', updater.predictedCacheDemand(pools)))
+            predictionTime += measure.seconds
+            for pool in pools:
+                for mode, target in (('static', pool.cache_l1_srvs), ('predicted', updater.cacheL1Target(pool))):
+                    misses[mode] += max(0, trace[(pool.id, hour)] - target)
+                    elementHours[mode] += target
+
+    requests = sum(trace.values())
+    utils.report(
+        'Replay of a week of {} pools, {} requests ({} history events), L1 cache of {}'.format(
+            args.pools, requests, len(history), args.cache
+        ),
+        ('L1 target', 'misses', 'miss %', 'element hours'),
+        [(mode, misses[mode], misses[mode] * 100 / requests, elementHours[mode]) for mode in ('static', 'predicted')],
+    )
+    print('Prediction of all pools: {:.4f}s per hour ({} query)'.format(predictionTime / (WEEK // HOUR), measure.queries))
+
+
+if __name__ == '__main__':
+    main()
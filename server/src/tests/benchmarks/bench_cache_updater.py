@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Service pools cache updater: time and queries needed to find out the cache state of all service pools,
+with several counts per pool (as before the grouped snapshot) and with ServiceCacheUpdater.servicesPoolsNeedingCacheUpdate.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+
+from django.db.models import Q
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core import services
+from uds.core.environment import Environment
+from uds.core.managers import userServiceManager
+from uds.core.util.state import State
+from uds.core.workers.servicepools_cache_updater import ServiceCacheUpdater
+
+from tests import fixtures
+from tests.fake_services import FakeProvider
+
+L1, L2 = services.UserDeployment.L1_CACHE, services.UserDeployment.L2_CACHE
+
+# Cache level -> user services of every pool
+USER_SERVICES = {L1: 3, L2: 1, 0: 4}
+
+
+def createPools(provider: models.Provider, count: int) -> None:
+    now = models.getSqlDatetime()
+    for _ in range(count):
+        servicePool = fixtures.createFakeServicePool(provider, initial_srvs=0, cache_l1_srvs=5, cache_l2_srvs=2, max_srvs=100)
+        publication = servicePool.publications.get()
+        models.UserService.objects.bulk_create(
+            [
+                models.UserService(
+                    deployed_service=servicePool, publication=publication,
+                    unique_id='{}-{}-{}'.format(servicePool.id, level, i), state=State.USABLE, os_state=State.USABLE,
+                    state_date=now, creation_date=now, cache_level=level, in_use=False
+                )
+                for level, n in USER_SERVICES.items()
+                for i in range(n)
+            ]
+        )
+
+
+def legacyCounts() -> typing.Dict[int, typing.Tuple[int, int, int]]:
+    """
+    pool -> (L1, L2, assigned) of pools that can grow, obtained with several queries per pool
+    as servicesPoolsNeedingCacheUpdate did before the grouped snapshot
+    """
+    result: typing.Dict[int, typing.Tuple[int, int, int]] = {}
+    for servicePool in (
+        models.ServicePool.objects.filter(Q(initial_srvs__gte=0) | Q(cache_l1_srvs__gte=0))
+        .filter(max_srvs__gt=0, state=State.ACTIVE, service__provider__maintenance_mode=False)
+        .iterator()
+    ):
+        servicePool.userServices.update()
+        spServiceInstance = servicePool.service.getInstance()
+        if servicePool.activePublication() is None and spServiceInstance.publicationType is not None:
+            continue
+        if servicePool.publications.filter(state=State.PREPARING).count() > 0:
+            continue
+        if servicePool.isRestrained():
+            continue
+        inCacheL1 = (
+            servicePool.cachedUserServices()
+            .filter(userServiceManager().getCacheStateFilter(L1))
+            .exclude(Q(properties__name='destroy_after') & Q(properties__value='y'))
+            .count()
+        )
+        inCacheL2 = servicePool.cachedUserServices().filter(userServiceManager().getCacheStateFilter(L2)).count()
+        inAssigned = servicePool.assignedUserServices().filter(userServiceManager().getStateFilter()).count()
+        result[servicePool.id] = (inCacheL1, inCacheL2, inAssigned)
+    return result
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--pools', type=int, nargs='*', default=[10, 100, 1000], help='Number of pools (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        provider = models.Provider.objects.create(name='Fake provider', data_type=FakeProvider.typeType, comments='')
+        updater = ServiceCacheUpdater(Environment.getTempEnv())
+        rows: typing.List[typing.Tuple[int, float, int, float, int]] = []
+        for count in args.pools:
+            createPools(provider, count - models.ServicePool.objects.count())
+
+            legacy = utils.measure(legacyCounts)
+            current = utils.measure(updater.servicesPoolsNeedingCacheUpdate)
+            # Every pool needs to grow its cache, with the same counts
+            expected = legacyCounts()
+            assert len(expected) == count
+            assert {sp.id: (l1, l2, assigned) for sp, l1, l2, assigned in updater.servicesPoolsNeedingCacheUpdate()} == expected
+            rows.append((count, legacy.seconds, legacy.queries, current.seconds, current.queries))
+
+    utils.report(
+        'Cache state of service pools, every one with {} L1, {} L2 and {} assigned user services'.format(
+            USER_SERVICES[L1], USER_SERVICES[L2], USER_SERVICES[0]
+        ),
+        ('pools', 'per pool s', 'queries', 'snapshot s', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""
+Calendars checking: time and queries needed to check if many calendars are active, and their next start and end
+events, along a time span. Compares per day bitarrays stored on caches (as before the compiled timelines) and
+compiled calendar timelines.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import random
+import time
+import typing
+
+import bitarray
+
+from tests.benchmarks import utils
+
+from django.core.cache import caches
+
+from uds import models
+from uds.core.util.cache import Cache
+from uds.core.util.calendar import CalendarChecker, ONE_DAY
+from uds.models import calendar_rule
+
+
+class LegacyCalendarChecker(CalendarChecker):
+    """
+    CalendarChecker check & nextEvent as they were before the compiled timelines
+    """
+
+    cache = Cache('calChecker')
+
+    def _updateData(self, dtime: datetime.datetime) -> bitarray.bitarray:
+        data = bitarray.bitarray(60 * 24)  # Granurality is minute
+        data.setall(False)
+
+        data_date = dtime.date()
+
+        start = datetime.datetime.combine(data_date, datetime.datetime.min.time())
+        end = datetime.datetime.combine(data_date, datetime.datetime.max.time())
+
+        for rule in self.calendar.rules.all():
+            rr = rule.as_rrule()
+
+            r_end = datetime.datetime.combine(rule.end, datetime.datetime.max.time()) if rule.end is not None else None
+
+            ruleDurationMinutes = rule.duration_as_minutes
+            ruleFrequencyMinutes = rule.frequency_as_minutes
+
+            # Skip "bogus" definitions
+            if ruleDurationMinutes == 0 or ruleFrequencyMinutes == 0:
+                continue
+
+            diff = ruleFrequencyMinutes if ruleFrequencyMinutes > ruleDurationMinutes else ruleDurationMinutes
+            _start = (start if start > rule.start else rule.start) - datetime.timedelta(minutes=diff)
+
+            _end = end if r_end is None or end < r_end else r_end
+
+            for val in rr.between(_start, _end, inc=True):
+                if val.date() != data_date:
+                    diff = int((start - val).total_seconds() / 60)
+                    pos = 0
+                    posdur = ruleDurationMinutes - diff
+                    if posdur <= 0:
+                        continue
+                else:
+                    pos = val.hour * 60 + val.minute
+                    posdur = pos + ruleDurationMinutes
+                if posdur > 60 * 24:
+                    posdur = 60 * 24
+                data[pos:posdur] = True
+
+        return data
+
+    def check(self, dtime=None):
+        memCache = caches['memory']
+
+        cacheKey = (
+            str(self.calendar.modified.toordinal()) + str(dtime.date().toordinal()) + self.calendar.uuid + 'checker'
+        )
+        cached = memCache.get(cacheKey)
+        if not cached:
+            cached = LegacyCalendarChecker.cache.get(cacheKey, None)
+            if cached:
+                memCache.set(cacheKey, cached, ONE_DAY)
+
+        if cached:
+            data = bitarray.bitarray()  # Empty bitarray
+            data.frombytes(cached)
+        else:
+            data = self._updateData(dtime)
+            LegacyCalendarChecker.cache.put(cacheKey, data.tobytes(), ONE_DAY)
+            memCache.set(cacheKey, data.tobytes(), ONE_DAY)
+
+        return data[dtime.hour * 60 + dtime.minute]
+
+    def nextEvent(self, checkFrom=None, startEvent=True, offset=None):
+        if offset is None:
+            offset = datetime.timedelta(minutes=0)
+
+        cacheKey = (
+            str(hash(self.calendar.modified))
+            + self.calendar.uuid
+            + str(offset.seconds)
+            + str(int(time.mktime(checkFrom.timetuple())))
+            + 'event'
+            + ('x' if startEvent is True else '_')
+        )
+        next_event = LegacyCalendarChecker.cache.get(cacheKey, None)
+        if next_event is None:
+            next_event = self._updateEvents(checkFrom + offset, startEvent)
+            if next_event is not None:
+                next_event += offset
+            LegacyCalendarChecker.cache.put(cacheKey, next_event, 3600)
+
+        return next_event
+
+
+def createCalendars(count: int, rnd: random.Random) -> typing.List[models.Calendar]:
+    """
+    Creates calendars with a working hours rule, and some of them with a daily, weekly or monthly maintenance window
+    """
+    start = datetime.datetime(2020, 1, 6)
+    calendars = []
+    for i in range(count):
+        calendar = models.Calendar.objects.create(name='Calendar {}'.format(i), comments='')
+        calendar.rules.create(
+            name='Working hours',
+            comments='',
+            start=start.replace(hour=rnd.randrange(6, 10), minute=rnd.choice((0, 15, 30, 45))),
+            frequency=calendar_rule.WEEKDAYS,
+            interval=0b0111110,  # Monday to friday
+            duration=rnd.randrange(6, 11),
+            duration_unit='HOURS',
+        )
+        if i % 2:
+            calendar.rules.create(
+                name='Maintenance',
+                comments='',
+                start=start + datetime.timedelta(days=rnd.randrange(7), hours=rnd.randrange(24)),
+                frequency=rnd.choice(('DAILY', 'WEEKLY', 'MONTHLY')),
+                interval=rnd.randrange(1, 3),
+                duration=rnd.randrange(15, 180),
+                duration_unit='MINUTES',
+            )
+        calendars.append(calendar)
+    return calendars
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--calendars', type=int, default=500, help='Number of calendars (default %(default)s)')
+    parser.add_argument('--days', type=int, default=1, help='Days checked (default %(default)s)')
+    parser.add_argument('--step', type=int, default=30, help='Minutes between checks (default %(default)s)')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    with utils.testDatabase():
+        calendars = createCalendars(args.calendars, rnd)
+        since = datetime.datetime(2021, 3, 1, 0, 0, 30)
+        instants = [since + datetime.timedelta(minutes=m) for m in range(0, args.days * 24 * 60, args.step)]
+
+        def sweep(checker: typing.Type[CalendarChecker]) -> typing.List[typing.Any]:
+            Cache.delete('calChecker')
+            caches['memory'].clear()
+            CalendarChecker.timelines.clear()
+            result = []
+            for dtime in instants:
+                for calendar in calendars:
+                    chk = checker(calendar)
+                    result.append((chk.check(dtime), chk.nextEvent(dtime, True), chk.nextEvent(dtime, False)))
+            return result
+
+        rows: typing.List[typing.Tuple[str, float, float, int]] = []
+        results = []
+        checks = len(instants) * len(calendars)
+        for title, checker in (('cached per day bitarrays', LegacyCalendarChecker), ('compiled timelines', CalendarChecker)):
+            result: typing.List[typing.Any] = []
+            measure = utils.measure(lambda: result.append(sweep(checker)))  # pylint: disable=cell-var-from-loop
+            results.append(result[0])
+            rows.append((title, measure.seconds, measure.seconds * 1000000 / checks, measure.queries))
+        assert results[0] == results[1], 'Calendars checks differs'
+
+    utils.report(
+        '{} calendars checked every {} minutes along {} days (check, next start & next end)'.format(
+            args.calendars, args.step, args.days
+        ),
+        ('calendars', 'seconds', 'us/check', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
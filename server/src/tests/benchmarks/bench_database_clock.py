@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Database clock: calls per second of getting the database date/time, querying it on every call
+(calibration disabled, as getSqlDatetime did before DatabaseClock) and estimating it from the calibrated local clock.
+
+Sqlite has no microseconds on CURRENT_TIMESTAMP, so the value read is only used to check the roundtrip.
+An optional latency can be added to every query to simulate a remote database.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import time
+import datetime
+import threading
+import typing
+
+from django.db import connection
+
+from tests.benchmarks import utils
+
+from uds.models.util import DatabaseClock
+
+
+class Query:
+    """
+    Reads database time (with an optional extra latency), counting the queries done
+    """
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.queries = 0
+        self.lock = threading.Lock()
+
+    def __call__(self) -> datetime.datetime:
+        with self.lock:
+            self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT CURRENT_TIMESTAMP')
+            return datetime.datetime.strptime(cursor.fetchone()[0], '%Y-%m-%d %H:%M:%S')
+
+
+def run(clock: DatabaseClock, threads: int, calls: int) -> float:
+    """
+    Calls clock.now() "calls" times on every thread. Returns the elapsed time
+    """
+
+    def worker() -> None:
+        try:
+            for _ in range(calls):
+                clock.now()
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--calls', type=int, default=20000, help='Calls per thread (default %(default)s)')
+    parser.add_argument('--threads', type=int, nargs='*', default=[1, 8], help='Threads (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0, help='Milliseconds added to every query (default %(default)s)')
+    args = parser.parse_args()
+
+    rows: typing.List[typing.Tuple[str, int, float, float, int]] = []
+    for title, resync in (('query every call', 0), ('calibrated clock', 60)):
+        for threads in args.threads:
+            query = Query(args.latency / 1000)
+            clock = DatabaseClock(resync, 0.5, query=query)
+            seconds = run(clock, threads, args.calls)
+            total = threads * args.calls
+            rows.append((title, threads, seconds, total / seconds, query.queries))
+
+    utils.report(
+        'Getting database time {} times per thread, {}ms latency'.format(args.calls, args.latency),
+        ('mode', 'threads', 'seconds', 'calls/s', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
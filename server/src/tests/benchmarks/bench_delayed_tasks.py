@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Delayed tasks drain: time needed by several runners (with the task executor) to execute a number of due
+delayed tasks, for several batch sizes (DELAYED_TASKS_BATCH_SIZE).
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import codecs
+import pickle
+import threading
+import time
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.jobs.executor import TaskExecutor
+from uds.core.util.config import GlobalConfig
+
+from tests.core.jobs.test_delayed_task_runner import CountingTask, executions, executionsLock
+
+
+def createTasks(count: int) -> None:
+    # Same rows that DelayedTaskRunner.insert would create, but in bulk (insertion is not measured)
+    now = models.getSqlDatetime()
+    typeName = CountingTask.__module__ + '.' + CountingTask.__name__
+    models.DelayedTask.objects.bulk_create(
+        [
+            models.DelayedTask(
+                type=typeName,
+                instance=codecs.encode(pickle.dumps(CountingTask(i)), 'base64').decode(),
+                insert_date=now,
+                execution_delay=0,
+                execution_time=now,
+                tag='',
+            )
+            for i in range(count)
+        ]
+    )
+    executions.clear()
+
+
+def drain(count: int, runners: int, workers: int, timeout: float) -> float:
+    """
+    Starts the runners and waits until all tasks are executed. Returns the elapsed time
+    """
+    TaskExecutor._executor = TaskExecutor(workers, workers * 2)  # pylint: disable=protected-access
+    DelayedTaskRunner._runner = DelayedTaskRunner()  # pylint: disable=protected-access
+    threads = [threading.Thread(target=DelayedTaskRunner.runner().run) for _ in range(runners)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            with executionsLock:
+                executed = sum(executions.values())
+            if executed >= count:
+                break
+            if time.monotonic() > deadline:
+                raise Exception('Timeout: executed {} of {} tasks'.format(executed, count))
+            time.sleep(0.01)
+        return time.perf_counter() - start
+    finally:
+        DelayedTaskRunner.runner().notifyTermination()
+        for thread in threads:
+            thread.join()
+        TaskExecutor.executor().shutdown()
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--tasks', type=int, default=10000, help='Number of due tasks (default %(default)s)')
+    parser.add_argument('--runners', type=int, default=3, help='Number of runner threads (default %(default)s)')
+    parser.add_argument('--workers', type=int, default=16, help='Task executor workers (default %(default)s)')
+    parser.add_argument('--batch', type=int, nargs='*', default=[1, 8, 32], help='Batch sizes (default %(default)s)')
+    parser.add_argument('--timeout', type=float, default=600, help='Max seconds for every drain (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        rows: typing.List[typing.Tuple[int, float, float]] = []
+        for batchSize in args.batch:
+            utils.setConfig(GlobalConfig.DELAYED_TASKS_BATCH_SIZE, batchSize)
+            createTasks(args.tasks)
+            seconds = drain(args.tasks, args.runners, args.workers, args.timeout)
+            assert set(executions.values()) == {1} and len(executions) == args.tasks, 'Tasks not executed exactly once'
+            assert not models.DelayedTask.objects.exists()
+            rows.append((batchSize, seconds, args.tasks / seconds))
+
+    utils.report(
+        'Draining {} delayed tasks with {} runners and {} workers'.format(args.tasks, args.runners, args.workers),
+        ('batch', 'seconds', 'tasks/s'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""
+REST listings paging: time, queries and peak memory of the users listing of an authenticator (as the admin
+interface requests it), getting the whole listing and paging it on client (as before paging) and requesting
+just a page, sorted and filtered on database.
+
+REST needs WeasyPrint installed (for reports).
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import fnmatch
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.util.state import State
+
+from tests import fixtures
+
+
+def createUsers(auth: models.Authenticator, count: int) -> None:
+    start = datetime.datetime(2020, 1, 1)
+    models.User.objects.bulk_create(
+        (
+            models.User(
+                uuid='{:08x}-0000-0000-0000-000000000000'.format(i), manager=auth, name='user{:07d}'.format(i),
+                real_name='User {}'.format(i), comments='', state=State.ACTIVE,
+                last_access=start + datetime.timedelta(seconds=i)
+            )
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--users', type=int, default=100000, help='Number of users (default %(default)s, try 1000000)')
+    parser.add_argument('--limit', type=int, default=50, help='Page size (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        # REST methods read configuration when imported, so they are imported once the database exists
+        from uds.REST.methods.authenticators import Authenticators  # pylint: disable=import-outside-toplevel
+        from tests.REST.utils import createHandler  # pylint: disable=import-outside-toplevel
+
+        auth = fixtures.createAuthenticator()
+        createUsers(auth, args.users)
+        admin = fixtures.createUsers(auth, 1, prefix='admin')[0]
+        admin.is_admin = True
+        admin.save()
+
+        def listing(**params: str) -> typing.List[typing.Dict[str, typing.Any]]:
+            return createHandler(Authenticators, admin, auth.uuid, 'users', params=params).get()
+
+        offset = args.users // 2
+        page = {'offset': str(offset), 'limit': str(args.limit)}
+        cases: typing.List[typing.Tuple[str, typing.Callable[[], typing.Any], typing.Callable[[], typing.Any]]] = [
+            (
+                'middle page',
+                lambda: sorted(listing(), key=lambda u: u['name'])[offset : offset + args.limit],
+                lambda: listing(order='name', **page),
+            ),
+            (
+                'last page, descending',
+                lambda: sorted(listing(), key=lambda u: u['name'], reverse=True)[-args.limit :],
+                lambda: listing(order='-name', offset=str(args.users + 1 - args.limit), limit=str(args.limit)),
+            ),
+            (
+                'filtered page',
+                lambda: [u for u in listing() if fnmatch.fnmatch(u['name'], 'user00001*')][: args.limit],
+                lambda: listing(filter='name=user00001*', limit=str(args.limit)),
+            ),
+        ]
+
+        rows: typing.List[typing.Tuple[str, str, float, int, float]] = []
+        for title, before, paged in cases:
+            assert [u['id'] for u in before()] == [u['id'] for u in paged()], 'Listings differs ({})'.format(title)
+            for mode, fnc in (('whole listing', before), ('paged', paged)):
+                measure = utils.measure(fnc)
+                rows.append((title, mode, measure.seconds, measure.queries, utils.peakMemory(fnc) / 1024 / 1024))
+
+    utils.report(
+        'Users listing of an authenticator with {} users, pages of {}'.format(args.users + 1, args.limit),
+        ('listing', 'mode', 'seconds', 'queries', 'peak MiB'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Database logging: time and queries needed to log a number of lines for several owners with full history
+(so old lines must be removed), writing every line as before buffering, unbuffered (LOG_FLUSH_INTERVAL 0)
+and buffered (lines written on flush).
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.managers.log import LogManager, OT_USERSERVICE
+from uds.core.util import log
+from uds.core.util.config import GlobalConfig
+
+
+def createHistory(owners: int) -> None:
+    models.Log.objects.all().delete()
+    maxLogs = GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt()
+    created = models.getSqlDatetime() - datetime.timedelta(days=1)
+    models.Log.objects.bulk_create(
+        [
+            models.Log(owner_type=OT_USERSERVICE, owner_id=owner, created=created, source=log.INTERNAL, level=log.INFO, data='Old line {}'.format(i))
+            for owner in range(owners)
+            for i in range(maxLogs)
+        ],
+        batch_size=1000,
+    )
+
+
+def legacyLog(owner_type: int, owner_id: int, level: int, message: str, source: str, avoidDuplicates: bool) -> None:
+    """
+    LogManager log of a line as it was before buffering
+    """
+    message = str(message)[:255]
+
+    qs = models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type)
+    if qs.count() >= GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt():
+        for i in qs.order_by('-created',)[GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt() - 1:]:
+            i.delete()
+
+    if avoidDuplicates is True:
+        try:
+            lg = models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type, level=level, source=source).order_by('-created', '-id')[0]
+            if lg.data == message:
+                return
+        except Exception:
+            pass
+
+    models.Log.objects.create(owner_type=owner_type, owner_id=owner_id, created=models.getSqlDatetime(), source=source, level=level, data=message)
+
+
+def logLines(fnc: typing.Callable[..., None], owners: int, lines: int) -> None:
+    for n in range(lines):
+        fnc(OT_USERSERVICE, n % owners, log.INFO, 'Line {}'.format(n), log.INTERNAL, True)
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--owners', type=int, default=50, help='Number of owners (default %(default)s)')
+    parser.add_argument('--lines', type=int, default=5000, help='Lines to log (default %(default)s)')
+    args = parser.parse_args()
+
+    manager = LogManager()
+    managerLog = manager._LogManager__log  # type: ignore  # pylint: disable=protected-access
+
+    def buffered() -> None:
+        logLines(managerLog, args.owners, args.lines)
+        manager.flush()
+
+    with utils.testDatabase():
+        maxLogs = GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt()
+        rows: typing.List[typing.Tuple[str, float, float, float]] = []
+        for title, interval, fnc in (
+            ('line by line (before)', 0, lambda: logLines(legacyLog, args.owners, args.lines)),
+            ('unbuffered', 0, lambda: logLines(managerLog, args.owners, args.lines)),
+            ('buffered', 3600, buffered),  # Long interval, so only the explicit flush writes
+        ):
+            utils.setConfig(GlobalConfig.LOG_FLUSH_INTERVAL, interval)
+            createHistory(args.owners)
+            result = utils.measure(fnc)
+            # History of every owner is kept at its max
+            assert models.Log.objects.count() == args.owners * maxLogs
+            rows.append((title, result.seconds, args.lines / result.seconds, result.queries / args.lines))
+
+    utils.report(
+        'Logging {} lines for {} owners with full history'.format(args.lines, args.owners),
+        ('mode', 'seconds', 'lines/s', 'queries/line'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Transports networks matching: time and queries needed to check the transports valid for client ips,
+with database queries for every transport (as before the in memory networks index) and with Transport.validForIp.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import random
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.util import net
+
+
+def createNetworks(count: int, transports: int, perTransport: int, rnd: random.Random) -> typing.List[models.Transport]:
+    networks = []
+    for i in range(count):
+        if i % 10 == 9:
+            netRange = '2001:db8:{:x}::/48'.format(rnd.randrange(0x10000))
+        else:
+            netRange = '10.{}.{}.0/{}'.format(rnd.randrange(256), rnd.randrange(256), rnd.choice((16, 20, 24, 28)))
+        networks.append(models.Network.create('Network {}'.format(i), netRange))
+
+    result = []
+    for i in range(transports):
+        transport = models.Transport.objects.create(
+            name='Transport {}'.format(i), data_type='RDPTransport', comments='', nets_positive=i % 2 == 0
+        )
+        if i % 5:  # Some transports without networks, valid for every ip
+            transport.networks.set(rnd.sample(networks, perTransport))
+        result.append(transport)
+    return result
+
+
+def legacyValidForIp(transport: models.Transport, ipStr: str) -> bool:
+    """
+    Transport.validForIp as it was before the networks index
+    """
+    if transport.networks.count() == 0:
+        return True
+    ip = net.ipToLong(ipStr)
+    if transport.nets_positive:
+        return transport.networks.filter(net_start__lte=ip, net_end__gte=ip).count() > 0
+    return transport.networks.filter(net_start__lte=ip, net_end__gte=ip).count() == 0
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--networks', type=int, default=1000, help='Number of networks (default %(default)s)')
+    parser.add_argument('--transports', type=int, default=50, help='Number of transports (default %(default)s)')
+    parser.add_argument('--per-transport', type=int, default=20, help='Networks of every transport (default %(default)s)')
+    parser.add_argument('--ips', type=int, default=200, help='Client ips checked (default %(default)s)')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    with utils.testDatabase():
+        transports = createNetworks(args.networks, args.transports, args.per_transport, rnd)
+        ips = ['10.{}.{}.{}'.format(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(args.ips)]
+        ipsV6 = ['2001:db8:{:x}::{:x}'.format(rnd.randrange(0x10000), rnd.randrange(0x10000)) for _ in range(args.ips)]
+
+        def check(fnc: typing.Callable[[models.Transport, str], bool], ips: typing.List[str]) -> typing.List[bool]:
+            return [fnc(transport, ip) for ip in ips for transport in transports]
+
+        rows: typing.List[typing.Tuple[str, float, float, int]] = []
+        build = utils.measure(lambda: models.Network.indexVersion())  # First use builds the index
+        rows.append(('index build', build.seconds, 0, build.queries))
+
+        results = []
+        checks = args.ips * args.transports
+        for title, fnc, checkIps in (
+            ('queries per transport (IPv4)', legacyValidForIp, ips),
+            ('networks index (IPv4)', models.Transport.validForIp, ips),
+            ('networks index (IPv6)', models.Transport.validForIp, ipsV6),
+        ):
+            result: typing.List[typing.List[bool]] = []
+            measure = utils.measure(lambda: result.append(check(fnc, checkIps)))  # pylint: disable=cell-var-from-loop
+            results.append(result[0])
+            rows.append((title, measure.seconds, checks / measure.seconds, measure.queries))
+        assert results[0] == results[1], 'Matching differs'
+
+    utils.report(
+        'Checking {} transports for {} ips, {} networks ({} per transport)'.format(
+            args.transports, args.ips, args.networks, args.per_transport
+        ),
+        ('validForIp', 'seconds', 'checks/s', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Pools performance report: time and queries needed to compute the report data, with one query per pool and
+sampling interval (as before computing it in a single pass) and with PoolPerformanceReport.getRangeData.
+
+Reports need WeasyPrint installed.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import random
+import typing
+
+from django.db.models import Count
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.util.stats import events
+from uds.reports.stats.pools_performance import PoolPerformanceReport
+
+from tests import fixtures
+
+START, END = '2020-01-01', '2020-03-01'
+
+
+def createEvents(report: PoolPerformanceReport, count: int, users: int) -> None:
+    rnd = random.Random(0)
+    start, end = report.startDate.stamp(), report.endDate.stamp()
+    fld = events.statsManager().getEventFldFor('username')
+    pools = list(models.ServicePool.objects.values_list('id', flat=True))
+
+    def event() -> models.StatsEvents:
+        evt = models.StatsEvents(
+            owner_type=events.OT_DEPLOYED, owner_id=rnd.choice(pools), event_type=events.ET_ACCESS, stamp=rnd.randrange(start, end)
+        )
+        setattr(evt, fld, 'user{}'.format(rnd.randrange(users)))
+        return evt
+
+    models.StatsEvents.objects.bulk_create((event() for _ in range(count)), batch_size=5000)
+
+
+def legacyRangeData(report: PoolPerformanceReport) -> typing.List[typing.Tuple[int, int]]:
+    """
+    (users, accesses) of every pool & interval, as getRangeData obtained them before single pass
+    """
+    start, end = report.startDate.stamp(), report.endDate.stamp()
+    vals = list(range(start, end, int((end - start) / (report.samplingPoints.num() + 1))))
+    fld = events.statsManager().getEventFldFor('username')
+    result: typing.List[typing.Tuple[int, int]] = []
+    for poolId, _ in report.getPools():
+        for interval in zip(vals, vals[1:]):
+            q = (
+                events.statsManager()
+                .getEvents(events.OT_DEPLOYED, events.ET_ACCESS, since=interval[0], to=interval[1], owner_id=poolId)
+                .values(fld)
+                .annotate(cnt=Count(fld))
+            )
+            result.append((len(q), sum(v['cnt'] for v in q)))
+    return result
+
+
+def rangeData(report: PoolPerformanceReport) -> typing.List[typing.Tuple[int, int]]:
+    return [(v['users'], v['accesses']) for v in report.getRangeData()[2]]
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--pools', type=int, default=50, help='Number of pools on report (default %(default)s)')
+    parser.add_argument('--events', type=int, default=200000, help='Number of access events (default %(default)s)')
+    parser.add_argument('--users', type=int, default=1000, help='Number of distinct users (default %(default)s)')
+    parser.add_argument('--points', type=int, default=32, help='Sampling points (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        pools = fixtures.createServicePools(args.pools)
+        report = PoolPerformanceReport(
+            {'pools': [p.uuid for p in pools], 'startDate': START, 'endDate': END, 'samplingPoints': str(args.points)}
+        )
+        createEvents(report, args.events, args.users)
+
+        rows: typing.List[typing.Tuple[str, float, int]] = []
+        results = []
+        for title, fnc in (('query per interval', legacyRangeData), ('single pass', rangeData)):
+            result: typing.List[typing.Any] = []
+            measure = utils.measure(lambda: result.append(fnc(report)))  # pylint: disable=cell-var-from-loop
+            results.append(result[0])
+            rows.append((title, measure.seconds, measure.queries))
+        assert results[0] == results[1], 'Report data differs'
+
+    utils.report(
+        'Pools performance report of {} pools, {} sampling points, {} events'.format(args.pools, args.points, args.events),
+        ('report data', 'seconds', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Scheduler jobs claiming: time and queries needed to claim a number of due jobs,
+claiming them one by one (as before batch claiming) or in batches of several sizes.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.jobs.scheduler import Scheduler
+from uds.core.util.state import State
+
+
+def createJobs(count: int) -> None:
+    models.Scheduler.objects.all().delete()
+    due = models.getSqlDatetime() - datetime.timedelta(minutes=1)
+    models.Scheduler.objects.bulk_create(
+        [models.Scheduler(name='job{:06d}'.format(i), last_execution=due, next_execution=due, state=State.FOR_EXECUTE) for i in range(count)]
+    )
+
+
+def drain(scheduler: Scheduler, batchSize: int) -> None:
+    now = models.getSqlDatetime()
+    while scheduler._claimJobs(now, batchSize):  # pylint: disable=protected-access
+        pass
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--jobs', type=int, default=2000, help='Number of due jobs (default %(default)s)')
+    parser.add_argument('--batch', type=int, nargs='*', default=[1, 4, 16, 64], help='Batch sizes (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        scheduler = Scheduler()
+        rows: typing.List[typing.Tuple[int, float, float, float]] = []
+        for batchSize in args.batch:
+            createJobs(args.jobs)
+            result = utils.measure(lambda: drain(scheduler, batchSize))
+            assert not models.Scheduler.objects.filter(state=State.FOR_EXECUTE).exists()
+            rows.append((batchSize, result.seconds, args.jobs / result.seconds, result.queries / args.jobs))
+
+    utils.report(
+        'Claiming {} due jobs ({})'.format(args.jobs, 'row locking' if models.util.hasRowLocking() else 'no row locking'),
+        ('batch', 'seconds', 'jobs/s', 'queries/job'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
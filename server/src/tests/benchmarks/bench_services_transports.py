@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""
+Services list transports: time and queries of the services list (getServicesData) of an user with access to
+many pools, checking the transports of every pool on each call (as before the valid transports cache) and
+reusing the valid transports cached for the client networks and OS.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import random
+import types
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.util import os_detector
+from uds.web.util import services
+
+from tests import fixtures
+from tests.benchmarks.bench_networks import createNetworks
+
+
+def legacyValidTransports(pool: models.ServicePool, ip: str, osName: str) -> typing.List[models.Transport]:
+    """
+    Transports check of getServicesData as it was before the valid transports cache
+    """
+    trans = []
+    for t in sorted(pool.transports.all(), key=lambda x: x.priority):
+        try:
+            typeTrans = t.getType()
+        except Exception:
+            continue
+        if t.validForIp(ip) and typeTrans.supportsOs(osName) and t.validForOs(osName):
+            trans.append(t)
+    return trans
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--pools', type=int, default=300, help='Number of pools (default %(default)s)')
+    parser.add_argument('--transports', type=int, default=20, help='Number of transports (default %(default)s)')
+    parser.add_argument('--per-pool', type=int, default=4, help='Transports of every pool (default %(default)s)')
+    parser.add_argument('--networks', type=int, default=200, help='Number of networks (default %(default)s)')
+    parser.add_argument('--clients', type=int, default=50, help='Services lists requested, from different ips (default %(default)s)')
+    parser.add_argument('--subnets', type=int, default=5, help='Subnets (/24) of the client ips (default %(default)s)')
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    with utils.testDatabase():
+        transports = createNetworks(args.networks, args.transports, 10, rnd)
+        auth = fixtures.createAuthenticator()
+        group = fixtures.createGroups(auth, 1)[0]
+        user = fixtures.createUsers(auth, 1)[0]
+        user.groups.add(group)
+        for pool in fixtures.createServicePools(args.pools):
+            pool.assignedGroups.add(group)
+            pool.transports.set(rnd.sample(transports, args.per_pool))
+
+        subnets = ['10.{}.{}'.format(rnd.randrange(256), rnd.randrange(256)) for _ in range(args.subnets)]
+        requests = [
+            types.SimpleNamespace(
+                user=user,
+                ip='{}.{}'.format(rnd.choice(subnets), rnd.randrange(1, 255)),
+                os={'OS': rnd.choice((os_detector.Windows, os_detector.Linux, os_detector.Macintosh))},
+                session={},
+            )
+            for _ in range(args.clients)
+        ]
+        eligibility = services._TransportsEligibility.eligibility()  # pylint: disable=protected-access
+
+        def checks(fnc: typing.Callable[[models.ServicePool, str, str], typing.List[models.Transport]]) -> typing.List[typing.List[int]]:
+            pools = list(models.ServicePool.objects.prefetch_related('transports'))
+            return [[t.id for t in fnc(pool, r.ip, r.os['OS'])] for r in requests for pool in pools]
+
+        def render(cached: bool) -> typing.List[typing.Any]:
+            result = []
+            for r in requests:
+                if not cached:
+                    eligibility._eligible = {}  # pylint: disable=protected-access
+                result.append(services.getServicesData(typing.cast(typing.Any, r))['services'])
+            return result
+
+        models.Network.indexVersion()  # Builds the networks index, not measured
+        rows: typing.List[typing.Tuple[str, float, float, int]] = []
+        results: typing.List[typing.Any] = []
+        for title, fnc in (
+            ('pools transports, checked', lambda: checks(legacyValidTransports)),
+            ('pools transports, cached', lambda: checks(eligibility.validTransports)),
+            ('services list, checked', lambda: render(False)),
+            ('services list, cached', lambda: render(True)),
+        ):
+            result: typing.List[typing.Any] = []
+            measure = utils.measure(lambda: result.append(fnc()))  # pylint: disable=cell-var-from-loop
+            results.append(result[0])
+            rows.append((title, measure.seconds, measure.seconds * 1000 / args.clients, measure.queries))
+        assert results[0] == results[1], 'Valid transports differs'
+        assert results[2] == results[3], 'Services lists differs'
+        assert all(r for r in results[3]), 'Services lists are empty'
+        cachedEntries = len(eligibility._eligible)  # pylint: disable=protected-access
+
+    utils.report(
+        '{} services lists of {} pools ({} of {} transports each) from {} subnets, {} valid transports cached'.format(
+            args.clients, args.pools, args.per_pool, args.transports, args.subnets, cachedEntries
+        ),
+        ('transports', 'seconds', 'ms/client', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
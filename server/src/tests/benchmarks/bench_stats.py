@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Stats counters rollups: time and queries of a long range counters query (one value per day) over the raw counters
+and over the accumulated (hourly and daily) counters, plus the time needed to accumulate them.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import random
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.managers import statsManager
+from uds.core.util.stats import counters
+
+SAMPLE_INTERVAL = 600  # As the stats collector job
+OT_DEPLOYED = 2  # Owner type of service pools counters (declared inside uds.core.util.stats.counters)
+
+
+def createCounters(owners: int, days: int) -> typing.Tuple[int, int]:
+    """
+    Creates one counter every SAMPLE_INTERVAL for every owner. Returns the (since, to) unix stamps of them
+    """
+    to = models.getSqlDatetimeAsUnix() // SAMPLE_INTERVAL * SAMPLE_INTERVAL - statsManager().ACCUMULATE_MARGIN - SAMPLE_INTERVAL
+    since = to - days * 86400
+    rnd = random.Random(0)
+    rows = (
+        models.StatsCounters(
+            owner_id=owner, owner_type=OT_DEPLOYED, counter_type=counters.CT_ASSIGNED, stamp=stamp, value=rnd.randint(0, 100)
+        )
+        for stamp in range(since + SAMPLE_INTERVAL, to + 1, SAMPLE_INTERVAL)
+        for owner in range(owners)
+    )
+    models.StatsCounters.objects.bulk_create(rows, batch_size=5000)
+    return since, to
+
+
+def accumulate() -> None:
+    # As the accumulator job, until nothing is left (every run processes a bounded number of intervals)
+    last = None
+    while True:
+        statsManager().accumulateCounters()
+        current = [models.StatsCountersAccum.lastStamp(intervalType) for intervalType in models.StatsCountersAccum.INTERVALS]
+        if current == last:
+            break
+        last = current
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--owners', type=int, default=20, help='Number of pools (default %(default)s)')
+    parser.add_argument('--days', type=int, default=60, help='Days of counters (default %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions of every query, best is taken (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        since, to = createCounters(args.owners, args.days)
+        sinceDate, toDate = datetime.datetime.fromtimestamp(since), datetime.datetime.fromtimestamp(to)
+
+        def query() -> typing.List[typing.Tuple[int, int]]:
+            return [
+                (v.stamp, v.value)
+                for v in statsManager().getCounters(OT_DEPLOYED, counters.CT_ASSIGNED, None, sinceDate, toDate, 86400, None, None)
+            ]
+
+        rows: typing.List[typing.Tuple[str, float, int]] = []
+        raw = query()
+        rows.append(('raw counters', utils.measure(query, args.repeat).seconds, utils.measure(query).queries))
+
+        accumulation = utils.measure(accumulate)
+        rows.append(('accumulate (job runs)', accumulation.seconds, accumulation.queries))
+
+        accumulated = query()
+        assert accumulated == raw, 'Accumulated counters differs from raw ones'
+        rows.append(('accumulated counters', utils.measure(query, args.repeat).seconds, utils.measure(query).queries))
+
+    utils.report(
+        'Daily values of {} days of counters of {} pools ({} raw counters)'.format(
+            args.days, args.owners, args.owners * args.days * 86400 // SAMPLE_INTERVAL
+        ),
+        ('query', 'seconds', 'queries'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+User access report: time, queries and peak memory needed to compute the report data, counting every sampling
+interval with its own query and walking every login event in python for week & hour data (as before aggregating
+them on database), and with the current StatsReportLogin.
+
+Reports need WeasyPrint installed.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import random
+import typing
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.util.stats import events
+from uds.reports.stats.user_access import StatsReportLogin
+
+from tests import fixtures
+
+START, END = '2020-01-01', '2020-03-01'
+
+
+def createEvents(report: StatsReportLogin, count: int) -> None:
+    rnd = random.Random(0)
+    start, end = report.startDate.stamp(), report.endDate.stamp()
+    auth = fixtures.createAuthenticator()
+    models.StatsEvents.objects.bulk_create(
+        (
+            models.StatsEvents(
+                owner_type=events.OT_AUTHENTICATOR, owner_id=auth.id, event_type=events.ET_LOGIN, stamp=rnd.randrange(start, end)
+            )
+            for _ in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def legacyRangeData(report: StatsReportLogin) -> typing.List[int]:
+    """
+    Logins of every sampling interval, as getRangeData counted them before
+    """
+    start, end = report.startDate.stamp(), report.endDate.stamp()
+    vals = list(range(start, end, int((end - start) / (report.samplingPoints.num() + 1))))
+    return [
+        events.statsManager().getEvents(events.OT_AUTHENTICATOR, events.ET_LOGIN, since=interval[0], to=interval[1]).count()
+        for interval in zip(vals, vals[1:])
+    ]
+
+
+def legacyWeekHourlyData(
+    report: StatsReportLogin,
+) -> typing.Tuple[typing.List[int], typing.List[int], typing.List[typing.List[int]]]:
+    """
+    getWeekHourlyData as it was before
+    """
+    start, end = report.startDate.stamp(), report.endDate.stamp()
+    dataWeek = [0] * 7
+    dataHour = [0] * 24
+    dataWeekHour = [[0] * 24 for _ in range(7)]
+    for val in events.statsManager().getEvents(events.OT_AUTHENTICATOR, events.ET_LOGIN, since=start, to=end):
+        s = datetime.datetime.fromtimestamp(val.stamp)
+        dataWeek[s.weekday()] += 1
+        dataHour[s.hour] += 1
+        dataWeekHour[s.weekday()][s.hour] += 1
+    return dataWeek, dataHour, dataWeekHour
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--events', type=int, default=500000, help='Number of login events (default %(default)s)')
+    parser.add_argument('--points', type=int, default=128, help='Sampling points (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        report = StatsReportLogin({'startDate': START, 'endDate': END, 'samplingPoints': str(args.points)})
+        createEvents(report, args.events)
+
+        rows: typing.List[typing.Tuple[str, str, float, int, float]] = []
+        for data, legacy, current in (
+            ('range', legacyRangeData, lambda r: [v['users'] for v in r.getRangeData()[2]]),
+            ('week & hour', legacyWeekHourlyData, lambda r: r.getWeekHourlyData()),
+        ):
+            results = []
+            for title, fnc in (('before', legacy), ('aggregated on db', current)):
+                result: typing.List[typing.Any] = []
+                measure = utils.measure(lambda: result.append(fnc(report)))  # pylint: disable=cell-var-from-loop
+                peak = utils.peakMemory(lambda: fnc(report))  # pylint: disable=cell-var-from-loop
+                results.append(result[0])
+                rows.append((data, title, measure.seconds, measure.queries, peak / 1024 / 1024))
+            assert results[0] == results[1], 'Report data differs'
+
+    utils.report(
+        'User access report, {} sampling points, {} login events'.format(args.points, args.events),
+        ('data', 'mode', 'seconds', 'queries', 'peak MiB'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
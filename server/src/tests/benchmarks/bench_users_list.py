@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Users list csv report: time and peak memory needed to generate the list of users of an authenticator,
+building it in memory from model instances (as before streaming), with generate (the stream joined)
+and consuming the stream chunk by chunk (as the streamed REST response does).
+
+Reports need WeasyPrint installed.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import io
+import csv
+import datetime
+import typing
+
+from django.utils.translation import ugettext
+
+from tests.benchmarks import utils
+
+from uds import models
+from uds.core.util.state import State
+from uds.reports.lists.users import ListReportsUsersCSV
+
+from tests import fixtures
+
+
+def createUsers(auth: models.Authenticator, count: int) -> None:
+    start = datetime.datetime(2020, 1, 1)
+    models.User.objects.bulk_create(
+        (
+            models.User(
+                manager=auth, name='user{:07d}'.format(i), real_name='User {}'.format(i), comments='',
+                state=State.ACTIVE, last_access=start + datetime.timedelta(seconds=i)
+            )
+            for i in range(count)
+        ),
+        batch_size=5000,
+    )
+
+
+def legacyGenerate(report: ListReportsUsersCSV) -> bytes:
+    """
+    ListReportsUsersCSV.generate as it was before streaming
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    auth = models.Authenticator.objects.get(uuid=report.authenticator.value)
+    users = auth.users.order_by('name')
+
+    writer.writerow([ugettext('User ID'), ugettext('Real Name'), ugettext('Last access')])
+
+    for v in users:
+        writer.writerow([v.name, v.real_name, v.last_access])
+
+    return output.getvalue().encode()
+
+
+def stream(report: ListReportsUsersCSV) -> int:
+    """
+    Consumes the stream as the streamed response does (encoding and sending every chunk). Returns the size of output
+    """
+    return sum(len(chunk.encode()) for chunk in report.generateStream())
+
+
+def main() -> None:
+    parser = utils.parser(__doc__)
+    parser.add_argument('--users', type=int, default=100000, help='Number of users (default %(default)s)')
+    args = parser.parse_args()
+
+    with utils.testDatabase():
+        auth = fixtures.createAuthenticator()
+        createUsers(auth, args.users)
+        report = ListReportsUsersCSV({'authenticator': auth.uuid})
+
+        size = len(legacyGenerate(report))
+        assert size == len(report.generate()) == stream(report), 'Output differs'
+
+        rows: typing.List[typing.Tuple[str, float, int, float]] = []
+        for title, fnc in (
+            ('in memory (before)', lambda: legacyGenerate(report)),
+            ('generate', report.generate),
+            ('stream', lambda: stream(report)),
+        ):
+            measure = utils.measure(fnc)
+            rows.append((title, measure.seconds, measure.queries, utils.peakMemory(fnc) / 1024 / 1024))
+
+    utils.report(
+        'Users list csv of {} users ({:.1f} MiB)'.format(args.users, size / 1024 / 1024),
+        ('mode', 'seconds', 'queries', 'peak MiB'),
+        rows,
+    )
+
+
+if __name__ == '__main__':
+    main()
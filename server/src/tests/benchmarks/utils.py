@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Helpers for benchmarks. Importing this module setups django, so it must be imported before any uds module.
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import os
+import time
+import tracemalloc
+import argparse
+import contextlib
+import typing
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+django.setup()
+
+from django.db import connection  # pylint: disable=wrong-import-position
+
+
+class Measure(typing.NamedTuple):
+    seconds: float
+    queries: int
+
+
+def parser(description: typing.Optional[str]) -> argparse.ArgumentParser:
+    return argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+
+@contextlib.contextmanager
+def testDatabase() -> typing.Iterator[None]:
+    """
+    Creates a new database for the benchmark (named as the test one), and destroys it at end
+    """
+    oldName = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(oldName, verbosity=0)
+
+
+@contextlib.contextmanager
+def countQueries() -> typing.Iterator[typing.List[int]]:
+    """
+    Counts the queries executed on default database inside the block (on the only element of yielded list)
+    (CaptureQueriesContext can't be used, it only keeps the last 9000 queries)
+    """
+    counter = [0]
+
+    def count(execute, sql, params, many, context):
+        counter[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+def setConfig(value: typing.Any, newValue: typing.Any) -> None:
+    """
+    Sets a config value (Config.Value), reloading it so the new value is used from now on
+    (set does not update the value already read)
+    """
+    value.set(str(newValue))
+    value.get(force=True)
+
+
+def measure(fnc: typing.Callable[[], typing.Any], repeat: int = 1) -> Measure:
+    """
+    Executes fnc "repeat" times, returning the best time of them and the number of queries of the last one
+    """
+    best = float('inf')
+    queries = 0
+    for _ in range(repeat):
+        with countQueries() as counter:
+            start = time.perf_counter()
+            fnc()
+            best = min(best, time.perf_counter() - start)
+        queries = counter[0]
+    return Measure(best, queries)
+
+
+def peakMemory(fnc: typing.Callable[[], typing.Any]) -> int:
+    """
+    Executes fnc, returning the peak of memory (in bytes) allocated by python during its execution
+    """
+    tracemalloc.start()
+    try:
+        fnc()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def report(title: str, header: typing.Sequence[str], rows: typing.Iterable[typing.Sequence[typing.Any]]) -> None:
+    """
+    Prints the results as a table
+    """
+    def fmt(value: typing.Any) -> str:
+        return '{:.4f}'.format(value) if isinstance(value, float) else str(value)
+
+    lines = [list(header)] + [[fmt(v) for v in row] for row in rows]
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    print('\n' + title)
+    for n, line in enumerate(lines):
+        print('  '.join(v.rjust(w) for v, w in zip(line, widths)))
+        if n == 0:
+            print('  '.join('-' * w for w in widths))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import collections
+import threading
+import time
+import typing
+
+from django.test import TransactionTestCase
+
+from uds import models
+from uds.core.jobs.delayed_task import DelayedTask
+from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.jobs.executor import TaskExecutor
+
+TASKS = 2000
+RUNNERS = 3
+WORKERS = 4
+TIMEOUT = 120
+
+# Number of executions of every task
+executions: typing.Counter[int] = collections.Counter()
+executionsLock = threading.Lock()
+
+
+class CountingTask(DelayedTask):
+    """
+    Delayed task that just counts its executions
+    """
+
+    def __init__(self, number: int) -> None:
+        super().__init__()
+        self.number = number
+
+    def run(self) -> None:
+        with executionsLock:
+            executions[self.number] += 1
+
+
+class DelayedTaskRunnerTest(TransactionTestCase):
+    def setUp(self) -> None:
+        executions.clear()
+        # Own executor & runner, executing tasks as the task manager does
+        self.executor, TaskExecutor._executor = TaskExecutor._executor, TaskExecutor(WORKERS, WORKERS * 2)
+        self.runner, DelayedTaskRunner._runner = DelayedTaskRunner._runner, DelayedTaskRunner()
+        self.threads: typing.List[threading.Thread] = []
+
+    def tearDown(self) -> None:
+        DelayedTaskRunner.runner().notifyTermination()
+        for thread in self.threads:
+            thread.join()
+        TaskExecutor.executor().shutdown()
+        TaskExecutor._executor, DelayedTaskRunner._runner = self.executor, self.runner
+
+    def startRunners(self, count: int) -> None:
+        for _ in range(count):
+            thread = threading.Thread(target=DelayedTaskRunner.runner().run)
+            thread.start()
+            self.threads.append(thread)
+
+    def waitExecuted(self, count: int, timeout: float) -> bool:
+        """
+        Polls (bounded by timeout) until count tasks are executed and no task is left on database
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with executionsLock:
+                executed = sum(executions.values())
+            if executed >= count and not models.DelayedTask.objects.exists():
+                return True
+            time.sleep(0.1)
+        return False
+
+    def test_drain(self) -> None:
+        for i in range(TASKS):
+            self.assertTrue(DelayedTaskRunner.runner().insert(CountingTask(i), 0))
+
+        start = time.monotonic()
+        self.startRunners(RUNNERS)
+        self.assertTrue(self.waitExecuted(TASKS, TIMEOUT), 'Executed {} of {} tasks'.format(sum(executions.values()), TASKS))
+        elapsed = time.monotonic() - start
+
+        # Every task executed exactly once
+        self.assertEqual(set(executions), set(range(TASKS)))
+        self.assertEqual(set(executions.values()), {1})
+        # Tasks are claimed in batches, far faster than one per polling interval
+        self.assertLess(elapsed, TASKS * DelayedTaskRunner.granularity / 100)
+
+    def test_insert_wakes_up_runner(self) -> None:
+        self.startRunners(1)
+        time.sleep(DelayedTaskRunner.granularity / 2)  # Runner is waiting for its first check
+
+        DelayedTaskRunner.runner().insert(CountingTask(0), 0)
+        start = time.monotonic()
+        self.assertTrue(self.waitExecuted(1, DelayedTaskRunner.granularity * 4))
+        self.assertLess(time.monotonic() - start, DelayedTaskRunner.granularity / 2)
+
+    def test_not_due_tasks_are_kept(self) -> None:
+        DelayedTaskRunner.runner().insert(CountingTask(0), 3600)
+        self.startRunners(1)
+        self.assertFalse(self.waitExecuted(1, DelayedTaskRunner.granularity * 2))
+        self.assertEqual(models.DelayedTask.objects.count(), 1)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import platform
+import threading
+import time
+
+from django.test import TestCase
+
+from uds.core.jobs.executor import TaskExecutor
+from uds.core.util.cache import Cache
+from uds.REST.methods.system import System
+
+from tests import fixtures
+from tests.REST.utils import createHandler
+
+
+class TaskExecutorTest(TestCase):
+    def setUp(self) -> None:
+        Cache('TaskExecutor').clean()
+        self.executor = TaskExecutor(2, 2)
+
+    def tearDown(self) -> None:
+        self.executor.shutdown()
+
+    def test_counters(self) -> None:
+        release = threading.Event()
+        self.executor.submit('wait', lambda: release.wait(10) and None)
+        self.executor.submit('wait', lambda: release.wait(10) and None)
+        self.executor.submit('fast', lambda: None)
+        time.sleep(0.2)
+
+        counters = self.executor.counters()
+        self.assertEqual((counters['active'], counters['queued'], counters['workers']), (2, 1, 2))
+        self.assertEqual(self.executor.freeSlots(), 1)
+
+        release.set()
+        self.executor.shutdown()
+        counters = self.executor.counters()
+        self.assertEqual((counters['active'], counters['queued']), (0, 0))
+        self.assertEqual(counters['wallTime']['wait'][0], 2)
+        self.assertEqual(counters['wallTime']['fast'][0], 1)
+        self.assertEqual(self.executor.freeSlots(), 4)
+
+    def test_published_counters(self) -> None:
+        self.assertEqual(TaskExecutor.publishedCounters(), {})
+        self.executor.submit('task', lambda: None)
+        self.executor.shutdown()
+        self.executor.publishCounters()
+
+        admin = fixtures.createAuthenticator().users.create(name='admin', real_name='', comments='', state='A', is_admin=True)
+        published = createHandler(System, admin, 'tasks').get()
+        self.assertEqual(list(published), [platform.node()])
+        self.assertEqual(published[platform.node()]['wallTime']['task'][0], 1)
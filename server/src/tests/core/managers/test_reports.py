@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import threading
+import time
+import typing
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from uds import reports
+from uds.core.reports import Report
+from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.jobs.executor import TaskExecutor
+from uds.core.managers import reportManager
+from uds.core.managers.reports import RUNNING, FINISHED, ERROR
+from uds.REST.methods.reports import Reports
+
+from tests import fixtures
+from tests.REST.utils import createHandler
+
+JOBS = 8
+WORKERS = 4
+GENERATION_TIME = 1.0
+# Requests are not waiting for any report generation, so they must be answered far before one is generated
+MAX_LATENCY = GENERATION_TIME / 4
+
+
+class SlowReport(Report):
+    uuid = 'c2b9dcd4-46b0-4c3d-9d45-6c8f7d9a1a10'
+    filename = 'slow.csv'
+    mime_type = 'text/csv'
+    encoded = False
+
+    def generate(self) -> str:
+        time.sleep(GENERATION_TIME)
+        return 'slow,report\n'
+
+
+class FailingReport(SlowReport):
+    uuid = '7f0b0a52-3a8e-4b8c-8f35-7c2b9a0a9e21'
+
+    def generate(self) -> str:
+        raise Exception('Generation failed')
+
+
+class AsyncReportsTest(TransactionTestCase):
+    def setUp(self) -> None:
+        reports.availableReports.extend((SlowReport, FailingReport))
+        self.admin = fixtures.createUsers(fixtures.createAuthenticator(), 1, 'admin')[0]
+        self.admin.is_admin = True
+        self.admin.save()
+
+        # Own executor & runner, executing tasks as the task manager does
+        self.executor, TaskExecutor._executor = TaskExecutor._executor, TaskExecutor(WORKERS, WORKERS)
+        self.runner, DelayedTaskRunner._runner = DelayedTaskRunner._runner, DelayedTaskRunner()
+        self.runnerThread = threading.Thread(target=DelayedTaskRunner.runner().run)
+        self.runnerThread.start()
+
+    def tearDown(self) -> None:
+        DelayedTaskRunner.runner().notifyTermination()
+        self.runnerThread.join()
+        TaskExecutor.executor().shutdown()
+        TaskExecutor._executor, DelayedTaskRunner._runner = self.executor, self.runner
+        reports.availableReports.remove(SlowReport)
+        reports.availableReports.remove(FailingReport)
+
+    def request(self, *args: str, operation: str = 'get') -> typing.Tuple[typing.Any, float]:
+        """
+        Executes a REST request to reports, returning its result and how long it took
+        """
+        start = time.monotonic()
+        result = getattr(createHandler(Reports, self.admin, *args, operation=operation), operation)()
+        return result, time.monotonic() - start
+
+    def waitFor(self, jobIds: typing.Iterable[str], timeout: float) -> typing.Tuple[typing.Dict[str, typing.Any], typing.List[float]]:
+        """
+        Polls the results of the jobs until none of them is running (or timeout).
+        Returns the results, and the latencies of the poll requests
+        """
+        deadline = time.monotonic() + timeout
+        results: typing.Dict[str, typing.Any] = {}
+        latencies: typing.List[float] = []
+        pending = set(jobIds)
+        while pending and time.monotonic() < deadline:
+            for jobId in list(pending):
+                result, latency = self.request('result', jobId)
+                latencies.append(latency)
+                if result['state'] != RUNNING:
+                    results[jobId] = result
+                    pending.remove(jobId)
+            time.sleep(0.05)
+        return results, latencies
+
+    def test_concurrent_jobs(self) -> None:
+        jobIds: typing.List[str] = []
+        latencies: typing.List[float] = []
+        for _ in range(JOBS):
+            result, latency = self.request(SlowReport.uuid, 'async', operation='put')
+            jobIds.append(result['id'])
+            latencies.append(latency)
+
+        self.assertEqual(len(set(jobIds)), JOBS)
+        # Queuing does not wait for the generation of reports, no matter how many are already queued
+        self.assertLess(max(latencies), MAX_LATENCY, latencies)
+
+        start = time.monotonic()
+        results, latencies = self.waitFor(jobIds, GENERATION_TIME * JOBS * 2)
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(set(results), set(jobIds))
+        for result in results.values():
+            self.assertEqual(result['state'], FINISHED)
+            self.assertEqual(result['data'], 'slow,report\n')
+            self.assertEqual(result['filename'], 'slow.csv')
+        # Polling while reports are being generated is not slowed down by them
+        self.assertLess(max(latencies), MAX_LATENCY, latencies)
+        # Jobs are executed concurrently, by all workers
+        self.assertLess(elapsed, GENERATION_TIME * JOBS / WORKERS * 2)
+
+    def test_failed_job(self) -> None:
+        result, _ = self.request(FailingReport.uuid, 'async', operation='put')
+        results, _ = self.waitFor([result['id']], GENERATION_TIME * 4)
+        self.assertEqual(results[result['id']]['state'], ERROR)
+        self.assertIn('Generation failed', results[result['id']]['error'])
+
+    def test_job_not_queued(self) -> None:
+        with mock.patch.object(DelayedTaskRunner, 'insert', return_value=False):
+            jobId = reportManager().queue(SlowReport.uuid, {})
+
+        # Never executed, so clients polling it do not wait forever
+        self.assertEqual(reportManager().result(jobId), {'state': ERROR, 'error': 'Could not queue report generation'})
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from uds.core.util.cache_backends import DjangoCacheBackend
+
+
+class DjangoCacheBackendTest(SimpleTestCase):
+    def setUp(self) -> None:
+        caches['memory'].clear()
+
+    def backend(self) -> DjangoCacheBackend:
+        backend = DjangoCacheBackend('memory')
+        backend._cache = mock.Mock(wraps=backend._cache)
+        return backend
+
+    def requests(self, backend: DjangoCacheBackend) -> int:
+        return len(backend._cache.method_calls)
+
+    def test_operations_do_one_request(self) -> None:
+        backend = self.backend()
+        self.assertTrue(backend.put('owner', 'key', b'value', 60))  # Reads (and creates) versions
+        backend._cache.reset_mock()
+
+        self.assertTrue(backend.put('owner', 'key', b'value2', 60))
+        self.assertEqual(backend.get('owner', 'key')[0], b'value2')
+        self.assertEqual(backend.getMany('owner', ['key', 'other']).keys(), {'key'})
+        self.assertEqual(self.requests(backend), 3)
+        backend._cache.touch.assert_not_called()
+
+        # Other owners need to read its own version, but not the global one
+        backend._cache.reset_mock()
+        self.assertIsNone(backend.get('other', 'key'))
+        backend._cache.get_many.assert_called_once_with([backend._nsKey('other')])
+
+    def test_versions_expire(self) -> None:
+        backend = self.backend()
+        backend.put('owner', 'key', b'value', 60)
+        with mock.patch('time.monotonic', return_value=time.monotonic() + DjangoCacheBackend.VERSIONS_TTL):
+            backend._cache.reset_mock()
+            backend.get('owner', 'key')
+            backend._cache.get_many.assert_called_once()
+
+    def test_delete(self) -> None:
+        backend, other = self.backend(), self.backend()  # Two servers
+        backend.put('owner', 'key', b'value', 60)
+        backend.put('another', 'key', b'value', 60)
+        self.assertEqual(other.get('owner', 'key')[0], b'value')
+
+        backend.delete('owner')
+        self.assertIsNone(backend.get('owner', 'key'))
+        self.assertIsNotNone(backend.get('another', 'key'))
+        # Seen by other servers once its known version expires
+        self.assertIsNotNone(other.get('owner', 'key'))
+        with mock.patch('time.monotonic', return_value=time.monotonic() + DjangoCacheBackend.VERSIONS_TTL):
+            self.assertIsNone(other.get('owner', 'key'))
+
+        backend.delete(None)
+        self.assertIsNone(backend.get('another', 'key'))
+
+    def test_evicted_version(self) -> None:
+        backend = self.backend()
+        backend.put('owner', 'key', b'value', 60)
+        caches['memory'].delete(backend._nsKey('owner'))
+        with mock.patch('time.monotonic', return_value=time.monotonic() + DjangoCacheBackend.VERSIONS_TTL):
+            self.assertIsNone(backend.get('owner', 'key'))
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import threading
+import time
+import typing
+
+from django.test import SimpleTestCase
+
+from uds.core.util.decorators import allowCache
+
+
+THREADS = 16
+
+
+class MemCache:
+    """
+    Minimal in memory cache with same interface used by allowCache
+    """
+
+    def __init__(self, owner: str) -> None:
+        self.owner = owner
+        self._data: typing.Dict[str, typing.Any] = {}
+
+    def get(self, key: str, defValue: typing.Any = None) -> typing.Any:
+        return self._data.get(key, defValue)
+
+    def put(self, key: str, value: typing.Any, validity: typing.Optional[int] = None) -> bool:
+        self._data[key] = value
+        return True
+
+
+class SlowProvider:
+    """
+    Provider like object, whose cached method takes a while to complete
+    """
+
+    def __init__(self, owner: str, delay: float = 0.3) -> None:
+        self.cache = MemCache(owner)
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    @allowCache('machines', 60, cachingArgs=1)
+    def getMachines(self, pool: str) -> typing.List[str]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError('Provider failed')
+        return ['{}-{}'.format(pool, i) for i in range(4)]
+
+    @allowCache('templates', 1, staleTimeout=60)
+    def getTemplates(self) -> typing.List[str]:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return ['template-{}'.format(self.calls)]
+
+
+def runConcurrently(fnc: typing.Callable[[], typing.Any], count: int = THREADS) -> typing.Tuple[typing.List[typing.Any], typing.List[Exception]]:
+    """
+    Executes fnc on count threads, started at the same time, and returns their results and errors
+    """
+    barrier = threading.Barrier(count)
+    results: typing.List[typing.Any] = []
+    errors: typing.List[Exception] = []
+    lock = threading.Lock()
+
+    def runner() -> None:
+        barrier.wait()
+        try:
+            result = fnc()
+            with lock:
+                results.append(result)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=runner) for _ in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return results, errors
+
+
+class AllowCacheSingleFlightTest(SimpleTestCase):
+    def test_concurrent_misses_execute_once(self) -> None:
+        provider = SlowProvider('provider-1')
+
+        results, errors = runConcurrently(lambda: provider.getMachines('pool'))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(len(results), THREADS)
+        for result in results:
+            self.assertEqual(result, ['pool-0', 'pool-1', 'pool-2', 'pool-3'])
+
+        # Now it is cached, so no more calls are done
+        self.assertEqual(provider.getMachines('pool'), results[0])
+        self.assertEqual(provider.calls, 1)
+
+    def test_different_keys_are_not_coalesced(self) -> None:
+        provider = SlowProvider('provider-2')
+
+        results, errors = runConcurrently(lambda: provider.getMachines(threading.current_thread().name), 4)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(provider.calls, 4)
+        self.assertEqual(len({tuple(r) for r in results}), 4)
+
+    def test_different_owners_are_not_coalesced(self) -> None:
+        providers = [SlowProvider('provider-3'), SlowProvider('provider-4')]
+        lock = threading.Lock()
+
+        def getMachines() -> typing.List[str]:
+            with lock:
+                provider = providers.pop()
+            return provider.getMachines('pool')
+
+        owners = list(providers)
+        results, errors = runConcurrently(getMachines, 2)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 2)
+        for provider in owners:
+            self.assertEqual(provider.calls, 1)
+
+    def test_error_is_raised_on_every_waiter(self) -> None:
+        provider = SlowProvider('provider-5')
+        provider.fail = True
+
+        results, errors = runConcurrently(lambda: provider.getMachines('pool'))
+
+        self.assertEqual(results, [])
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(len(errors), THREADS)
+        for error in errors:
+            self.assertIsInstance(error, RuntimeError)
+
+        # Failures are not cached, next call executes the function again
+        provider.fail = False
+        self.assertEqual(len(provider.getMachines('pool')), 4)
+        self.assertEqual(provider.calls, 2)
+
+    def test_stale_value_is_returned_while_refreshing(self) -> None:
+        provider = SlowProvider('provider-6')
+        self.assertEqual(provider.getTemplates(), ['template-1'])
+
+        time.sleep(1.1)  # Fresh time is 1 second, so value is now stale
+
+        results, errors = runConcurrently(provider.getTemplates)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(provider.calls, 2)
+        # Only the caller that refreshes the value gets the new one
+        self.assertEqual(results.count(['template-2']), 1)
+        self.assertEqual(results.count(['template-1']), THREADS - 1)
+
+    def test_forced_calls_are_executed(self) -> None:
+        provider = SlowProvider('provider-7', delay=0)
+        provider.getMachines('pool')
+        provider.getMachines('pool', force=True)
+
+        self.assertEqual(provider.calls, 2)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from django.test import SimpleTestCase
+
+from uds.core.util import net
+
+
+class NetTest(SimpleTestCase):
+    def test_ip_in_network(self) -> None:
+        for ip, network, result in (
+            ('192.168.0.1', '192.168.0.0/24', True),
+            ('192.168.1.1', '192.168.0.0/24', False),
+            ('10.0.0.1', '10.*', True),
+            ('10.0.0.1', '192.168.0.0/24,10.0.0.0-10.0.0.10', True),
+            ('2001:db8::1', '2001:db8::/32', True),
+            ('2001:db9::1', '2001:db8::/32', False),
+            # IPv4 and IPv6 values overlap as integers, but never match each other
+            ('::1', '0.0.0.0-0.0.0.255', False),
+            ('0.0.0.1', '::/120', False),
+        ):
+            self.assertEqual(net.ipInNetwork(ip, network), result, '{} in {}'.format(ip, network))
+
+    def test_any_network(self) -> None:
+        for ip in ('0.0.0.0', '192.168.0.1', '255.255.255.255', '::1', '2001:db8::1', 'ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff'):
+            self.assertTrue(net.ipInNetwork(ip, '*'), ip)
+            self.assertTrue(net.ipInNetwork(ip, '192.168.0.0/24, *'), ip)
+
+        self.assertEqual(
+            net.versionedNetworksFromString('*'), ((4, 0, net.IPV4_MAX), (6, 0, net.IPV6_MAX))
+        )
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from django.test import TestCase
+
+from uds import models
+from uds.core.util import permissions, ot
+
+from tests import fixtures
+
+
+class PermissionsResolverTest(TestCase):
+    def setUp(self) -> None:
+        self.pools = fixtures.createServicePools(30)
+        self.auths = [fixtures.createAuthenticator('Authenticator {}'.format(i)) for i in range(3)]
+
+        auth = self.auths[0]
+        self.user, self.other = fixtures.createUsers(auth, 2)
+        self.user.staff_member = True
+        self.user.save()
+        groups = fixtures.createGroups(auth, 3)
+        self.user.groups.add(groups[0], groups[1])
+        otherGroup = groups[2]
+
+        for i, pool in enumerate(self.pools):
+            if i % 3 == 0:
+                permissions.addUserPermission(self.user, pool, permissions.PERMISSION_READ)
+            if i % 4 == 0:
+                permissions.addGroupPermission(groups[i % 2], pool, permissions.PERMISSION_MANAGEMENT)
+            if i % 5 == 0:
+                permissions.addGroupPermission(otherGroup, pool, permissions.PERMISSION_ALL)
+                permissions.addUserPermission(self.other, pool, permissions.PERMISSION_ALL)
+
+        # Type wide permission for authenticators
+        models.Permissions.addPermission(
+            group=groups[1], object_type=ot.getObjectType(auth), object_id=None, permission=permissions.PERMISSION_READ
+        )
+        permissions.addUserPermission(self.user, self.auths[1], permissions.PERMISSION_ALL)
+
+    def test_same_permissions_as_per_object_queries(self) -> None:
+        resolver = permissions.PermissionsResolver(self.user)
+        for obj in self.pools + self.auths:
+            for root in (False, True):
+                self.assertEqual(
+                    resolver.getEffectivePermission(obj, root),
+                    permissions.getEffectivePermission(self.user, obj, root),
+                    'Permission of {} (root={})'.format(obj, root),
+                )
+                for perm in (permissions.PERMISSION_READ, permissions.PERMISSION_MANAGEMENT, permissions.PERMISSION_ALL):
+                    self.assertEqual(
+                        resolver.checkPermissions(obj, perm, root), permissions.checkPermissions(self.user, obj, perm, root)
+                    )
+
+    def test_resolved_values(self) -> None:
+        resolver = permissions.PermissionsResolver(self.user)
+        self.assertEqual(resolver.getEffectivePermission(self.pools[0]), permissions.PERMISSION_MANAGEMENT)
+        self.assertEqual(resolver.getEffectivePermission(self.pools[3]), permissions.PERMISSION_READ)
+        self.assertEqual(resolver.getEffectivePermission(self.pools[5]), permissions.PERMISSION_NONE)
+        self.assertEqual(resolver.getEffectivePermission(self.pools[0], root=True), permissions.PERMISSION_NONE)
+        self.assertEqual(resolver.getEffectivePermission(self.auths[1]), permissions.PERMISSION_ALL)
+        self.assertEqual(resolver.getEffectivePermission(self.auths[2]), permissions.PERMISSION_READ)
+        self.assertEqual(resolver.getEffectivePermission(self.auths[2], root=True), permissions.PERMISSION_READ)
+
+    def test_one_query_per_object_type(self) -> None:
+        resolver = permissions.PermissionsResolver(self.user)
+        with self.assertNumQueries(1):
+            for pool in self.pools:
+                resolver.getEffectivePermission(pool)
+                resolver.getEffectivePermission(pool, root=True)
+
+        with self.assertNumQueries(1):
+            for auth in self.auths:
+                resolver.checkPermissions(auth, permissions.PERMISSION_READ)
+
+        with self.assertNumQueries(0):
+            for obj in self.pools + self.auths:
+                resolver.checkPermissions(obj, permissions.PERMISSION_READ)
+
+    def test_admin_and_non_staff_users(self) -> None:
+        self.other.is_admin = True
+        admin = permissions.PermissionsResolver(self.other)
+        nonStaff = permissions.PermissionsResolver(fixtures.createUsers(self.auths[1], 1)[0])
+        with self.assertNumQueries(0):
+            for pool in self.pools:
+                self.assertEqual(admin.getEffectivePermission(pool), permissions.PERMISSION_ALL)
+                self.assertEqual(nonStaff.getEffectivePermission(pool), permissions.PERMISSION_NONE)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+
+from django.test import TransactionTestCase
+
+from uds import models
+from uds.core import services
+from uds.core.environment import Environment
+from uds.core.util.config import GlobalConfig
+from uds.core.util.state import State
+from uds.core.workers.servicepools_cache_updater import ServiceCacheUpdater
+from uds.core.workers.userservice_batch_checker import UserServiceBatchChecker
+
+from tests import fixtures
+from tests.fake_services import FakeProvider, FakeService
+
+L1, L2 = services.UserDeployment.L1_CACHE, services.UserDeployment.L2_CACHE
+MAX_TICKS = 20
+
+
+class ServiceCacheUpdaterTest(TransactionTestCase):
+    """
+    Cache creation against the fake provider (that allows FakeProvider.maxPreparingServices at once).
+    Every "tick" runs the cache updater and then checks the state of the user services being prepared.
+    """
+
+    def setUp(self) -> None:
+        self.steps = GlobalConfig.CACHE_GROWTH_STEPS.getInt()
+        self.slots = FakeProvider.maxPreparingServices
+        FakeService.checksNeeded = 1
+
+    def pool(self, provider: typing.Optional[models.Provider] = None, **kwargs) -> models.ServicePool:
+        return fixtures.createFakeServicePool(provider, initial_srvs=0, max_srvs=100, **kwargs)
+
+    def count(self, servicePool: models.ServicePool, cacheLevel: int, state: str = State.USABLE) -> int:
+        return servicePool.cachedUserServices().filter(cache_level=cacheLevel, state=state).count()
+
+    def preparing(self) -> int:
+        return models.UserService.objects.filter(state=State.PREPARING).count()
+
+    def tick(self) -> None:
+        ServiceCacheUpdater(Environment.getTempEnv()).run()
+        self.assertLessEqual(self.preparing(), self.slots)
+        UserServiceBatchChecker(Environment.getTempEnv()).run()
+
+    def ticksToFill(self, *servicePools: models.ServicePool) -> int:
+        """
+        Runs ticks until all pools have their cache full, returning the number of ticks needed
+        """
+        for ticks in range(1, MAX_TICKS + 1):
+            self.tick()
+            if all(
+                self.count(sp, L1) == sp.cache_l1_srvs and self.count(sp, L2) == sp.cache_l2_srvs for sp in servicePools
+            ):
+                return ticks
+        self.fail('Cache not filled in {} ticks'.format(MAX_TICKS))
+
+    def test_time_to_full_cache(self) -> None:
+        servicePool = self.pool(cache_l1_srvs=20)
+        self.assertEqual(self.ticksToFill(servicePool), -(-20 // min(self.steps, self.slots)))
+        self.assertEqual(servicePool.userServices.count(), 20)
+
+    def test_provider_slots_are_shared(self) -> None:
+        first = self.pool(cache_l1_srvs=self.steps * 2)
+        second = self.pool(first.service.provider, cache_l1_srvs=self.steps * 2)
+
+        ServiceCacheUpdater(Environment.getTempEnv()).run()
+        # Every pool could create "steps" services, but provider only allows "slots" at once
+        self.assertEqual(self.preparing(), min(self.steps * 2, self.slots))
+
+        UserServiceBatchChecker(Environment.getTempEnv()).run()
+        self.assertEqual(self.ticksToFill(first, second) + 1, -(-self.steps * 4 // self.slots))
+
+    def test_slow_provider(self) -> None:
+        # Operations need 3 checks, so services keep their slots while preparing during 3 ticks
+        FakeService.checksNeeded = 3
+        servicePool = self.pool(cache_l1_srvs=12)
+        # Created 4 (ticks 1, 4) and 2 (ticks 2, 5) services, ready 2 ticks later
+        self.assertEqual(self.ticksToFill(servicePool), 7)
+
+    def test_moves_from_l2_use_provider_slots(self) -> None:
+        servicePool = self.pool(cache_l1_srvs=self.steps, cache_l2_srvs=self.steps)
+        fixtures.createUserServices(servicePool, self.steps, cacheLevel=L2, publication=servicePool.activePublication())
+        other = self.pool(servicePool.service.provider, cache_l1_srvs=self.steps)
+
+        ServiceCacheUpdater(Environment.getTempEnv()).run()
+        # Services in L2 are moved to L1 instead of creating new ones, being prepared again
+        self.assertEqual(self.count(servicePool, L1, State.PREPARING), self.steps)
+        self.assertEqual(servicePool.userServices.count(), self.steps)
+        # And left just the remaining slots for other pools of the provider
+        self.assertEqual(self.count(other, L1, State.PREPARING), self.slots - self.steps)
+
+        UserServiceBatchChecker(Environment.getTempEnv()).run()
+        self.assertEqual(self.count(servicePool, L1), self.steps)
+        # Remaining L1 of other pool and L2 of moved pool are created on next tick
+        self.assertEqual(self.ticksToFill(servicePool, other), 1)
+        self.assertEqual(servicePool.userServices.count(), self.steps * 2)
+
+    def test_batched_checks(self) -> None:
+        FakeProvider.checks.clear()
+        servicePool = self.pool(cache_l1_srvs=self.steps)
+        self.ticksToFill(servicePool)
+        # All services created at once are checked with just one provider call
+        self.assertEqual(FakeProvider.checks, [self.steps])
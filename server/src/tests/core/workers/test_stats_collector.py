@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from uds import models
+from uds.core.environment import Environment
+from uds.core.util.state import State
+from uds.core.util.stats import counters, events
+from uds.core.workers.stats_collector import DeployedServiceStatsCollector
+from uds.models.util import getSqlDatetime
+
+from tests import fixtures
+
+
+class DeployedServiceStatsCollectorTest(TestCase):
+    def setUp(self) -> None:
+        # Database clock reads database time just from time to time, ensure it is not done on counted runs
+        getSqlDatetime()
+
+    def populate(self, pools: int, auths: int) -> None:
+        """
+        Creates pools with assigned, in use, cached and removed user services, an inactive pool, and
+        authenticators whose users own some of those user services
+        """
+        servicePools = fixtures.createServicePools(pools)
+        fixtures.createUserServices(fixtures.createServicePools(1, State.REMOVED)[0], 3)
+        for n in range(auths):
+            auth = fixtures.createAuthenticator('Authenticator {}'.format(n))
+            users = fixtures.createUsers(auth, n + 2)
+            for i, servicePool in enumerate(servicePools):
+                user = users[(i + n) % len(users)]
+                fixtures.createUserServices(servicePool, i % 3 + 1, user=user)
+                fixtures.createUserServices(servicePool, i % 2, user=user, inUse=True)
+                fixtures.createUserServices(servicePool, 1, user=users[0], state=State.REMOVED)
+                fixtures.createUserServices(servicePool, 2, cacheLevel=1)
+
+    def runCollector(self) -> int:
+        models.StatsCounters.objects.all().delete()
+        with CaptureQueriesContext(connection) as queries:
+            DeployedServiceStatsCollector(Environment.getTempEnv()).run()
+        return len(queries)
+
+    def stored(self, ownerType: int, ownerId: int, counterType: int) -> int:
+        return models.StatsCounters.objects.get(owner_type=ownerType, owner_id=ownerId, counter_type=counterType).value
+
+    def checkCounters(self) -> None:
+        # Values are checked against the original per object queries
+        for servicePool in models.ServicePool.objects.all():
+            if servicePool.state != State.ACTIVE:
+                self.assertFalse(models.StatsCounters.objects.filter(owner_type=events.OT_DEPLOYED, owner_id=servicePool.id).exists())
+                continue
+            fltr = servicePool.assignedUserServices().exclude(state__in=State.INFO_STATES)
+            self.assertEqual(self.stored(events.OT_DEPLOYED, servicePool.id, counters.CT_ASSIGNED), fltr.count())
+            self.assertEqual(self.stored(events.OT_DEPLOYED, servicePool.id, counters.CT_INUSE), fltr.filter(in_use=True).count())
+
+        for auth in models.Authenticator.objects.all():
+            fltr = auth.users.filter(userServices__isnull=False).exclude(userServices__state__in=State.INFO_STATES)
+            self.assertEqual(self.stored(events.OT_AUTHENTICATOR, auth.id, counters.CT_AUTH_USERS), auth.users.count())
+            self.assertEqual(self.stored(events.OT_AUTHENTICATOR, auth.id, counters.CT_AUTH_SERVICES), fltr.count())
+            self.assertEqual(self.stored(events.OT_AUTHENTICATOR, auth.id, counters.CT_AUTH_USERS_WITH_SERVICES), fltr.distinct().count())
+
+    def test_counters(self) -> None:
+        self.populate(6, 3)
+        self.runCollector()
+        self.checkCounters()
+
+    def test_counters_without_user_services(self) -> None:
+        fixtures.createServicePools(2)
+        fixtures.createUsers(fixtures.createAuthenticator(), 3)
+        self.runCollector()
+        self.checkCounters()
+        self.assertEqual(
+            set(models.StatsCounters.objects.exclude(counter_type=counters.CT_AUTH_USERS).values_list('value', flat=True)), {0}
+        )
+
+    def test_queries_do_not_depend_on_number_of_objects(self) -> None:
+        self.populate(2, 1)
+        fewQueries = self.runCollector()
+
+        self.populate(40, 10)
+        manyQueries = self.runCollector()
+
+        self.assertEqual(fewQueries, manyQueries)
+        # Pools, their counters, authenticators, their users, users with services and counters insertion
+        self.assertLessEqual(manyQueries, 6)
+        self.checkCounters()
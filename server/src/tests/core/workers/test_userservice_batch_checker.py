@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+from unittest import mock
+
+from django.test import TestCase
+
+from uds import models
+from uds.core import services
+from uds.core.environment import Environment
+from uds.core.managers import userServiceManager
+from uds.core.managers.userservice.opchecker import USERSERVICE_TAG
+from uds.core.util import log
+from uds.core.util.state import State
+from uds.core.workers.userservice_batch_checker import UserServiceBatchChecker
+
+from tests import fixtures
+from tests.fake_services import FakeProvider, FakeService, FakeUserDeployment
+
+
+class UserServiceBatchCheckerTest(TestCase):
+    def setUp(self) -> None:
+        FakeProvider.checks.clear()
+        FakeUserDeployment.failing.clear()
+        FakeService.checksNeeded = 2
+        self.servicePool = fixtures.createFakeServicePool(initial_srvs=0, cache_l1_srvs=0, max_srvs=100)
+
+    def create(self, count: int, servicePool: typing.Optional[models.ServicePool] = None) -> typing.List[models.UserService]:
+        servicePool = servicePool or self.servicePool
+        return [
+            userServiceManager().createCacheFor(servicePool.activePublication(), services.UserDeployment.L1_CACHE)
+            for _ in range(count)
+        ]
+
+    def check(self) -> None:
+        UserServiceBatchChecker(Environment.getTempEnv()).run()
+
+    def states(self, userServices: typing.List[models.UserService]) -> typing.List[str]:
+        return [models.UserService.objects.get(id=us.id).state for us in userServices]
+
+    def test_preparing(self) -> None:
+        userServices = self.create(5)
+        # Batched providers are not checked using delayed tasks
+        self.assertFalse(models.DelayedTask.objects.exists())
+        self.assertEqual(self.states(userServices), [State.PREPARING] * 5)
+
+        self.check()
+        self.assertEqual(self.states(userServices), [State.PREPARING] * 5)
+        self.check()
+        self.assertEqual(self.states(userServices), [State.USABLE] * 5)
+        self.check()  # Nothing left to check
+        self.assertEqual(FakeProvider.checks, [5, 5])
+
+    def test_removing(self) -> None:
+        FakeService.checksNeeded = 0
+        userServices = self.create(3)
+        self.assertEqual(self.states(userServices), [State.USABLE] * 3)
+
+        FakeService.checksNeeded = 1
+        for userService in userServices[:2]:
+            userServiceManager().remove(userService)
+        self.assertEqual(self.states(userServices), [State.REMOVING, State.REMOVING, State.USABLE])
+        self.check()
+        self.assertEqual(self.states(userServices), [State.REMOVED, State.REMOVED, State.USABLE])
+
+    def test_error(self) -> None:
+        userServices = self.create(3)
+        failing = models.UserService.objects.get(id=userServices[1].id)
+        FakeUserDeployment.failing.add(failing.friendly_name)
+
+        self.check()
+        self.assertEqual(self.states(userServices), [State.PREPARING, State.ERROR, State.PREPARING])
+        self.assertIn(
+            'Failed operation on {}'.format(failing.friendly_name), [v['message'] for v in log.getLogs(failing)]
+        )
+        self.check()
+        self.assertEqual(self.states(userServices), [State.USABLE, State.ERROR, State.USABLE])
+
+    def test_failed_batch_keeps_states(self) -> None:
+        userServices = self.create(2)
+        with mock.patch.object(FakeProvider, 'checkStates', side_effect=Exception('Platform unavailable')):
+            self.check()
+        self.assertEqual(self.states(userServices), [State.PREPARING] * 2)
+        self.check()
+        self.check()
+        self.assertEqual(self.states(userServices), [State.USABLE] * 2)
+
+    def test_skipped(self) -> None:
+        userServices = self.create(2)
+        # Pending op checker tasks are left to them
+        now = models.getSqlDatetime()
+        models.DelayedTask.objects.create(
+            type='', tag=USERSERVICE_TAG + userServices[0].uuid, instance='', insert_date=now, execution_delay=60, execution_time=now
+        )
+        # And providers in maintenance are not checked
+        inMaintenance = fixtures.createFakeServicePool(initial_srvs=0, cache_l1_srvs=0, max_srvs=100)
+        maintenanceServices = self.create(2, inMaintenance)
+        inMaintenance.service.provider.maintenance_mode = True
+        inMaintenance.service.provider.save()
+
+        self.check()
+        self.check()
+        self.assertEqual(self.states(userServices), [State.PREPARING, State.USABLE])
+        self.assertEqual(self.states(maintenanceServices), [State.PREPARING] * 2)
+        self.assertEqual(FakeProvider.checks, [1, 1])
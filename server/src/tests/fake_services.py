@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+Fake service provider, so the service related workers can be tested without a real platform.
+
+User deployments operations (creation, move to other cache level, removal, ...) finish after
+FakeService.checksNeeded state checks, or fail if its name is in FakeUserDeployment.failing
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import itertools
+import typing
+
+from uds.core import services
+from uds.core.util.state import State
+
+_names = itertools.count()
+
+
+class FakeUserDeployment(services.UserDeployment):
+    suggestedTime = 1
+
+    # Names of user deployments whose operations fail
+    failing: typing.ClassVar[typing.Set[str]] = set()
+
+    _name: str
+    _pending: int  # State checks left until current operation finishes
+
+    def initialize(self) -> None:
+        self._name = ''
+        self._pending = 0
+
+    def marshal(self) -> bytes:
+        return '\t'.join((self._name, str(self._pending))).encode()
+
+    def unmarshal(self, data: bytes) -> None:
+        if data:
+            self._name, pending = data.decode().split('\t')
+            self._pending = int(pending)
+
+    def getName(self) -> str:
+        if not self._name:
+            self._name = 'fake{:06d}'.format(next(_names))
+        return self._name
+
+    def getUniqueId(self) -> str:
+        return self.getName()
+
+    def getIp(self) -> str:
+        return '10.0.0.1'
+
+    def _start(self) -> str:
+        self._pending = typing.cast('FakeService', self.service()).checksNeeded
+        return self.checkState() if self._pending == 0 else State.RUNNING
+
+    def deployForCache(self, cacheLevel: int) -> str:
+        return self._start()
+
+    def deployForUser(self, user: typing.Any) -> str:
+        return self._start()
+
+    def moveToCache(self, newLevel: int) -> str:
+        return self._start()
+
+    def checkState(self) -> str:
+        if self.getName() in FakeUserDeployment.failing:
+            return State.ERROR
+        self._pending = max(0, self._pending - 1)
+        return State.RUNNING if self._pending > 0 else State.FINISHED
+
+    def reasonOfError(self) -> str:
+        return 'Failed operation on {}'.format(self.getName())
+
+    def destroy(self) -> str:
+        return self._start()
+
+    def cancel(self) -> str:
+        return self._start()
+
+
+class FakePublication(services.Publication):
+    suggestedTime = 1
+
+    def marshal(self) -> bytes:
+        return b''
+
+    def unmarshal(self, data: bytes) -> None:
+        pass
+
+    def publish(self) -> str:
+        return State.FINISHED
+
+    def checkState(self) -> str:
+        return State.FINISHED
+
+    def destroy(self) -> str:
+        return State.FINISHED
+
+    def cancel(self) -> str:
+        return State.FINISHED
+
+
+class FakeService(services.Service):
+    typeName = 'Fake Service'
+    typeType = 'FakeService'
+    typeDescription = 'Fake Service'
+
+    usesCache = True
+    usesCache_L2 = True
+    publicationType = FakePublication
+    deployedType = FakeUserDeployment
+
+    # Number of state checks needed by user deployments operations to finish
+    checksNeeded: typing.ClassVar[int] = 1
+
+
+class FakeProvider(services.ServiceProvider):
+    typeName = 'Fake Provider'
+    typeType = 'FakeProvider'
+    typeDescription = 'Fake Provider'
+
+    offers = [FakeService]
+
+    maxPreparingServices = 6
+    ignoreLimits = False
+    batchStateChecks = True
+
+    # Number of user deployments of every checkStates call
+    checks: typing.ClassVar[typing.List[int]] = []
+
+    def checkStates(self, userDeployments: typing.List[services.UserDeployment]) -> typing.List[str]:
+        FakeProvider.checks.append(len(userDeployments))
+        return super().checkStates(userDeployments)
+
+
+services.factory().insert(FakeProvider)
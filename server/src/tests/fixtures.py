@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import typing
+
+from uds import models
+from uds.core.util.state import State
+from uds.models.util import getSqlDatetime
+
+from tests import fake_services
+
+
+def createServicePools(count: int, state: str = State.ACTIVE, **kwargs) -> typing.List[models.ServicePool]:
+    """
+    Creates count service pools, all of them on same (static ip machines) provider & service
+    kwargs are passed to pools creation
+    """
+    provider = models.Provider.objects.create(name='Provider', data_type='PhysicalMachinesServiceProvider', comments='')
+    service = provider.services.create(name='Service', data_type='IPMachinesService', comments='')
+    return [
+        models.ServicePool.objects.create(name='Pool {:04d}'.format(i), service=service, state=state, **kwargs)
+        for i in range(count)
+    ]
+
+
+def createFakeServicePool(provider: typing.Optional[models.Provider] = None, **kwargs) -> models.ServicePool:
+    """
+    Creates a service pool of the fake provider (see tests.fake_services), with an usable publication.
+    kwargs are passed to pool creation
+    """
+    if provider is None:
+        provider = models.Provider.objects.create(name='Fake provider', data_type=fake_services.FakeProvider.typeType, comments='')
+    service = provider.services.create(
+        name='Fake service {}'.format(provider.services.count()), data_type=fake_services.FakeService.typeType, comments=''
+    )
+    servicePool = models.ServicePool.objects.create(name=service.name, service=service, state=State.ACTIVE, **kwargs)
+    now = getSqlDatetime()
+    servicePool.publications.create(publish_date=now, state=State.USABLE, state_date=now)
+    return servicePool
+
+
+def createAuthenticator(name: str = 'Authenticator') -> models.Authenticator:
+    return models.Authenticator.objects.create(name=name, data_type='TestAuth', comments='')
+
+
+def createUsers(auth: models.Authenticator, count: int, prefix: str = 'user') -> typing.List[models.User]:
+    return [
+        auth.users.create(name='{}{:04d}'.format(prefix, i), real_name='', comments='', state=State.ACTIVE)
+        for i in range(count)
+    ]
+
+
+def createGroups(auth: models.Authenticator, count: int, prefix: str = 'group') -> typing.List[models.Group]:
+    return [auth.groups.create(name='{}{:04d}'.format(prefix, i)) for i in range(count)]
+
+
+def createUserServices(
+        servicePool: models.ServicePool,
+        count: int,
+        user: typing.Optional[models.User] = None,
+        state: str = State.USABLE,
+        inUse: bool = False,
+        cacheLevel: int = 0,
+        publication: typing.Optional[models.ServicePoolPublication] = None
+    ) -> typing.List[models.UserService]:
+    now = getSqlDatetime()
+    return [
+        servicePool.userServices.create(
+            unique_id='{}-{}'.format(servicePool.id, i),
+            state=state,
+            os_state=State.USABLE,
+            state_date=now,
+            creation_date=now,
+            user=user,
+            in_use=inUse,
+            cache_level=cacheLevel,
+            publication=publication,
+        )
+        for i in range(count)
+    ]
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from django.test import TestCase
+
+from uds import models
+
+
+class NetworkTest(TestCase):
+    def setUp(self) -> None:
+        self.any = models.Network.create('Any', '*')
+        self.lan = models.Network.create('Lan', '192.168.0.0/24')
+        self.v6 = models.Network.create('V6', '2001:db8::/32')
+
+    def transport(self, name: str, positive: bool, *networks: models.Network) -> models.Transport:
+        transport = models.Transport.objects.create(name=name, data_type='TestTransport', comments='', nets_positive=positive)
+        transport.networks.set(networks)
+        return transport
+
+    def test_networks_for_ip(self) -> None:
+        self.assertEqual(models.Network.idsFor('192.168.0.10'), {self.any.id, self.lan.id})
+        self.assertEqual(models.Network.idsFor('10.0.0.1'), {self.any.id})
+        self.assertEqual(models.Network.idsFor('::1'), {self.any.id})
+        self.assertEqual(models.Network.idsFor('2001:db8::1'), {self.any.id, self.v6.id})
+        self.assertEqual({n.name for n in models.Network.networksFor('::1')}, {'Any'})
+
+    def test_transport_on_any_network(self) -> None:
+        allowed = self.transport('Allowed', True, self.any)
+        denied = self.transport('Denied', False, self.any)
+        for ip in ('192.168.0.10', '10.0.0.1', '::1', '2001:db8::1'):
+            self.assertTrue(allowed.validForIp(ip), ip)
+            self.assertFalse(denied.validForIp(ip), ip)
+
+    def test_transport_on_networks(self) -> None:
+        lan = self.transport('Lan only', True, self.lan)
+        notV6 = self.transport('Not V6', False, self.v6)
+        self.assertTrue(lan.validForIp('192.168.0.10'))
+        self.assertFalse(lan.validForIp('::1'))
+        self.assertTrue(notV6.validForIp('::1'))
+        self.assertFalse(notV6.validForIp('2001:db8::1'))
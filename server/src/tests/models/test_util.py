@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import threading
+import typing
+from datetime import datetime, timedelta
+
+from django.test import SimpleTestCase
+
+from uds.models.util import DatabaseClock
+
+RESYNC = 60.0
+MAX_DRIFT = 0.5
+BASE = datetime(2020, 1, 1)
+
+
+class FakeClock:
+    """
+    Local monotonic clock and a database clock that runs "rate" times faster than the local one
+    """
+
+    def __init__(self, rate: float = 1.0) -> None:
+        self.local = 1000.0
+        self.database = BASE
+        self.rate = rate
+        self.queries = 0
+
+    def monotonic(self) -> float:
+        return self.local
+
+    def query(self) -> datetime:
+        self.queries += 1
+        return self.database
+
+    def advance(self, seconds: float) -> None:
+        self.local += seconds
+        self.database += timedelta(seconds=seconds * self.rate)
+
+    def clock(self) -> DatabaseClock:
+        return DatabaseClock(RESYNC, MAX_DRIFT, query=self.query, monotonic=self.monotonic)
+
+
+class DatabaseClockTest(SimpleTestCase):
+    def test_estimates_between_resyncs(self) -> None:
+        fake = FakeClock()
+        clock = fake.clock()
+        self.assertEqual(clock.now(), BASE)
+        for _ in range(5):
+            fake.advance(10)
+            self.assertEqual(clock.now(), fake.database)
+        self.assertEqual(fake.queries, 1)
+
+        fake.advance(10)  # 60 seconds since last sync
+        self.assertEqual(clock.now(), fake.database)
+        self.assertEqual(fake.queries, 2)
+
+    def test_resync_halves_interval_on_drift(self) -> None:
+        fake = FakeClock(rate=1.02)  # Drifts 1.2 seconds every 60 seconds
+        clock = fake.clock()
+        clock.now()
+
+        fake.advance(RESYNC)
+        # Returns database time, not estimated one
+        self.assertEqual(clock.now(), fake.database)
+        self.assertEqual(fake.queries, 2)
+        self.assertEqual(clock._interval, RESYNC / 2)
+
+        # Drift in 30 seconds (0.6) is still over max drift
+        fake.advance(RESYNC / 2)
+        clock.now()
+        self.assertEqual(fake.queries, 3)
+        self.assertEqual(clock._interval, RESYNC / 4)
+
+        # Drift in 15 seconds (0.3) is back in bounds, interval is restored until reaching resync
+        fake.advance(RESYNC / 4)
+        clock.now()
+        self.assertEqual(clock._interval, RESYNC / 2)
+        fake.advance(RESYNC / 2)
+        clock.now()
+        self.assertEqual(clock._interval, RESYNC / 4)  # 0.6 seconds drift again
+        self.assertEqual(fake.queries, 5)
+
+    def test_interval_is_bounded(self) -> None:
+        fake = FakeClock(rate=2)  # Always drifted
+        clock = fake.clock()
+        clock.now()
+        for _ in range(20):
+            fake.advance(clock._interval)
+            clock.now()
+        self.assertEqual(clock._interval, 1.0)
+
+        fake.rate = 1.0
+        for _ in range(20):
+            fake.advance(clock._interval)
+            clock.now()
+        self.assertEqual(clock._interval, RESYNC)
+
+    def test_disabled(self) -> None:
+        fake = FakeClock()
+        clock = DatabaseClock(0, MAX_DRIFT, query=fake.query, monotonic=fake.monotonic)
+        for _ in range(3):
+            clock.now()
+        self.assertEqual(fake.queries, 3)
+
+    def test_concurrent_resyncs_are_coalesced(self) -> None:
+        THREADS = 16
+        fake = FakeClock()
+        querying = threading.Event()
+        release = threading.Event()
+
+        def slowQuery() -> datetime:
+            querying.set()
+            release.wait(10)
+            return fake.query()
+
+        clock = DatabaseClock(RESYNC, MAX_DRIFT, query=slowQuery, monotonic=fake.monotonic)
+        release.set()
+        clock.now()
+        release.clear()
+        fake.advance(RESYNC)  # Resync is due for every thread
+
+        results: typing.List[datetime] = []
+        threads = [threading.Thread(target=lambda: results.append(clock.now())) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(querying.wait(10))
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(fake.queries, 2)
+        self.assertEqual(results, [fake.database] * THREADS)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import random
+import typing
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from uds import models
+from uds.core.util.stats import events
+from uds.reports.stats.pools_performance import PoolPerformanceReport
+
+from tests import fixtures
+
+START, END = '2020-01-01', '2020-01-09'
+USERS = ['user{}'.format(i) for i in range(6)]
+
+
+class PoolPerformanceReportTest(TestCase):
+    def setUp(self) -> None:
+        self.pools = fixtures.createServicePools(4)
+        # Last pool is not included on report, but has events on same range
+        self.selected = self.pools[:3]
+
+    def report(self, samplingPoints: int = 8) -> PoolPerformanceReport:
+        return PoolPerformanceReport(
+            {
+                'pools': [p.uuid for p in self.selected],
+                'startDate': START,
+                'endDate': END,
+                'samplingPoints': str(samplingPoints),
+            }
+        )
+
+    def intervals(self, report: PoolPerformanceReport) -> typing.List[typing.Tuple[int, int]]:
+        start, end = report.startDate.stamp(), report.endDate.stamp()
+        step = int((end - start) / (report.samplingPoints.num() + 1))
+        vals = list(range(start, end, step))
+        return list(zip(vals, vals[1:]))
+
+    def addEvents(self, report: PoolPerformanceReport) -> None:
+        """
+        Adds random access events to every pool, and also some at the boundaries of the intervals,
+        out of range and of other event types
+        """
+        rnd = random.Random(20200101)
+        intervals = self.intervals(report)
+        first, last = intervals[0][0], intervals[-1][1]
+        fld = events.statsManager().getEventFldFor('username')
+
+        evts: typing.List[models.StatsEvents] = []
+
+        def add(pool: models.ServicePool, stamp: int, eventType: int = events.ET_ACCESS) -> None:
+            evt = models.StatsEvents(owner_type=events.OT_DEPLOYED, owner_id=pool.id, event_type=eventType, stamp=stamp)
+            setattr(evt, fld, rnd.choice(USERS))
+            evts.append(evt)
+
+        for pool in self.pools:
+            for _ in range(400):
+                add(pool, rnd.randrange(first - 3600 * 24, last + 3600 * 24))
+            for a, b in intervals:
+                add(pool, a)
+                add(pool, b)
+                add(pool, b - 1)
+            for _ in range(20):
+                add(pool, rnd.randrange(first, last), events.ET_LOGIN)
+
+        models.StatsEvents.objects.bulk_create(evts)
+
+    def expected(self, report: PoolPerformanceReport) -> typing.Dict[int, typing.List[typing.Tuple[int, int]]]:
+        """
+        (users, accesses) of every interval of every pool, counted with one query per interval
+        """
+        fld = events.statsManager().getEventFldFor('username')
+        result: typing.Dict[int, typing.List[typing.Tuple[int, int]]] = {}
+        for pool in self.selected:
+            result[pool.id] = []
+            for a, b in self.intervals(report):
+                qs = events.statsManager().getEvents(events.OT_DEPLOYED, events.ET_ACCESS, since=a, to=b, owner_id=pool.id)
+                result[pool.id].append((qs.values(fld).distinct().count(), qs.count()))
+        return result
+
+    def checkRangeData(self, report: PoolPerformanceReport) -> None:
+        expected = self.expected(report)
+        intervals = self.intervals(report)
+        _, poolsData, reportData = report.getRangeData()
+
+        self.assertEqual(len(poolsData), len(self.selected))
+        self.assertEqual(len(reportData), len(self.selected) * len(intervals))
+        for poolData in poolsData:
+            values = expected[int(poolData['pool'])]
+            self.assertEqual([v[0] for v in poolData['dataUsers']], [(a + b) / 2 for a, b in intervals])
+            self.assertEqual([v[0] for v in poolData['dataAccesses']], [(a + b) / 2 for a, b in intervals])
+            self.assertEqual([v[1] for v in poolData['dataUsers']], [v[0] for v in values])
+            self.assertEqual([v[1] for v in poolData['dataAccesses']], [v[1] for v in values])
+            rows = [r for r in reportData if r['name'] == poolData['name']]
+            self.assertEqual([(r['users'], r['accesses']) for r in rows], values)
+
+    def test_range_data(self) -> None:
+        report = self.report()
+        self.addEvents(report)
+        self.checkRangeData(report)
+
+    def test_range_data_max_sampling_points(self) -> None:
+        report = self.report(32)
+        self.addEvents(report)
+        self.checkRangeData(report)
+
+    def test_range_data_without_events(self) -> None:
+        report = self.report()
+        _, poolsData, reportData = report.getRangeData()
+
+        self.assertEqual(len(poolsData), len(self.selected))
+        for poolData in poolsData:
+            self.assertEqual({v[1] for v in poolData['dataUsers']}, {0})
+            self.assertEqual({v[1] for v in poolData['dataAccesses']}, {0})
+        self.assertEqual({(r['users'], r['accesses']) for r in reportData}, {(0, 0)})
+
+    def test_queries_do_not_depend_on_intervals(self) -> None:
+        report = self.report(32)
+        self.addEvents(report)
+
+        with CaptureQueriesContext(connection) as queries:
+            report.getRangeData()
+
+        # Selected pools, and events of all of them
+        self.assertLessEqual(len(queries), 2)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import datetime
+import random
+import typing
+
+from django.test import TestCase
+
+from uds import models
+from uds.core.util.stats import events
+from uds.reports.stats.user_access import StatsReportLogin
+
+from tests import fixtures
+
+START, END = '2020-01-01', '2020-01-09'
+
+
+class UserAccessReportTest(TestCase):
+    def setUp(self) -> None:
+        self.auth = fixtures.createAuthenticator()
+
+    def report(self, samplingPoints: int = 64) -> StatsReportLogin:
+        return StatsReportLogin({'startDate': START, 'endDate': END, 'samplingPoints': str(samplingPoints)})
+
+    def intervals(self, report: StatsReportLogin) -> typing.List[typing.Tuple[int, int]]:
+        start, end = report.startDate.stamp(), report.endDate.stamp()
+        step = int((end - start) / (report.samplingPoints.num() + 1))
+        vals = list(range(start, end, step))
+        return list(zip(vals, vals[1:]))
+
+    def addEvents(self, report: StatsReportLogin) -> typing.List[int]:
+        """
+        Adds login events, including some at the boundaries of the intervals, out of range and of other
+        event types. Returns the stamps of the login events in report range
+        """
+        rnd = random.Random(20200101)
+        intervals = self.intervals(report)
+        first, last = intervals[0][0], intervals[-1][1]
+
+        stamps = [rnd.randrange(first - 3600 * 24, last + 3600 * 24) for _ in range(1000)]
+        for a, b in intervals:
+            stamps += [a, b, b - 1]
+
+        evts = [
+            models.StatsEvents(owner_type=events.OT_AUTHENTICATOR, owner_id=self.auth.id, event_type=events.ET_LOGIN, stamp=stamp)
+            for stamp in stamps
+        ] + [
+            models.StatsEvents(owner_type=events.OT_AUTHENTICATOR, owner_id=self.auth.id, event_type=events.ET_LOGOUT, stamp=rnd.randrange(first, last))
+            for _ in range(50)
+        ]
+        models.StatsEvents.objects.bulk_create(evts)
+
+        start, end = report.startDate.stamp(), report.endDate.stamp()
+        return [s for s in stamps if start <= s < end]
+
+    def test_range_data(self) -> None:
+        report = self.report()
+        self.addEvents(report)
+        intervals = self.intervals(report)
+
+        expected = [
+            events.statsManager().getEvents(events.OT_AUTHENTICATOR, events.ET_LOGIN, since=a, to=b).count()
+            for a, b in intervals
+        ]
+        _, data, reportData = report.getRangeData()
+
+        self.assertEqual(data, [((a + b) / 2, v) for (a, b), v in zip(intervals, expected)])
+        self.assertEqual([r['users'] for r in reportData], expected)
+
+    def test_range_data_without_events(self) -> None:
+        report = self.report(8)
+        _, data, reportData = report.getRangeData()
+
+        self.assertEqual(len(data), len(self.intervals(report)))
+        self.assertEqual({v[1] for v in data}, {0})
+        self.assertEqual({r['users'] for r in reportData}, {0})
+
+    def test_week_hourly_data(self) -> None:
+        report = self.report()
+        stamps = self.addEvents(report)
+
+        dataWeek = [0] * 7
+        dataHour = [0] * 24
+        dataWeekHour = [[0] * 24 for _ in range(7)]
+        for stamp in stamps:
+            s = datetime.datetime.fromtimestamp(stamp)
+            dataWeek[s.weekday()] += 1
+            dataHour[s.hour] += 1
+            dataWeekHour[s.weekday()][s.hour] += 1
+
+        self.assertEqual(report.getWeekHourlyData(), (dataWeek, dataHour, dataWeekHour))
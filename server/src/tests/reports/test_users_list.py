@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import csv
+import datetime
+import typing
+from unittest import mock
+
+from django import http
+from django.db.models.query import QuerySet
+from django.test import TestCase
+
+from uds import models
+from uds.core.util.state import State
+from uds.reports.lists import users
+from uds.REST.methods.reports import Reports
+
+from tests import fixtures
+from tests.REST.utils import createHandler
+
+USERS = 5000
+
+
+class UsersListReportTest(TestCase):
+    def setUp(self) -> None:
+        self.auth = fixtures.createAuthenticator()
+        start = datetime.datetime(2020, 1, 1)
+        models.User.objects.bulk_create([
+            models.User(
+                manager=self.auth,
+                name='user{:05d}'.format(i),
+                # Some names need quoting on csv
+                real_name='User, "{}"'.format(i) if i % 7 == 0 else 'User {}'.format(i),
+                comments='',
+                state=State.ACTIVE,
+                last_access=start + datetime.timedelta(minutes=i),
+            )
+            for i in range(USERS)
+        ])
+        # Users of other authenticators are not listed
+        fixtures.createUsers(fixtures.createAuthenticator('Other'), 10)
+        self.admin = fixtures.createAuthenticator('Admin').users.create(name='admin', real_name='', comments='', state=State.ACTIVE, is_admin=True)
+
+    def expected(self) -> typing.List[typing.List[str]]:
+        return [['User ID', 'Real Name', 'Last access']] + [
+            [name, realName, str(lastAccess)]
+            for name, realName, lastAccess in self.auth.users.order_by('name').values_list('name', 'real_name', 'last_access')
+        ]
+
+    def test_stream(self) -> None:
+        # Records the querysets evaluated at once (fetching all rows) and the ones iterated
+        fetchedAll: typing.List[typing.Type] = []
+        iterated: typing.List[typing.Tuple[typing.Type, int]] = []
+        fetchAll, iterator = QuerySet._fetch_all, QuerySet.iterator
+
+        def recordFetchAll(qs: QuerySet) -> None:
+            fetchedAll.append(qs.model)
+            fetchAll(qs)
+
+        def recordIterator(qs: QuerySet, chunk_size: int = 2000) -> typing.Iterator[typing.Any]:
+            iterated.append((qs.model, chunk_size))
+            return iterator(qs, chunk_size)
+
+        handler = createHandler(Reports, self.admin, users.ListReportsUsersCSV.uuid, 'stream', params={'authenticator': self.auth.uuid}, operation='put')
+        with mock.patch.object(QuerySet, '_fetch_all', recordFetchAll), mock.patch.object(QuerySet, 'iterator', recordIterator):
+            response = handler.put()
+            self.assertIsInstance(response, http.StreamingHttpResponse)
+            content = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="Authenticator.csv"')
+        self.assertIn((models.User, users.CHUNK_SIZE), iterated)
+        self.assertNotIn(models.User, fetchedAll)
+
+        self.assertEqual(list(csv.reader(content.splitlines())), self.expected())
+
+    def test_generate(self) -> None:
+        # Non streamed generation returns same contents
+        report = users.ListReportsUsersCSV({'authenticator': self.auth.uuid})
+        self.assertEqual(list(csv.reader(report.generate().decode().splitlines())), self.expected())
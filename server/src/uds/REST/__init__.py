@@ -152,7 +152,8 @@ class Dispatcher(View):
         try:
             response = operation()
 
-            if not handler.raw:  # Raw handlers will return an HttpResponse Object
+            # Raw handlers will return an HttpResponse Object (and others may do it for some requests, as streamed ones)
+            if not handler.raw and not isinstance(response, http.HttpResponseBase):
                 response = processor.getResponse(response)
             # Set response headers
             for k, val in handler.headers().items():
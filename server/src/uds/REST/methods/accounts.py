@@ -72,7 +72,7 @@ class Accounts(ModelHandler):
             'tags': [tag.tag for tag in item.tags.all()],
             'comments': item.comments,
             'time_mark': item.time_mark,
-            'permission': permissions.getEffectivePermission(self._user, item)
+            'permission': self.permissionsResolver().getEffectivePermission(item)
         }
 
     def getGui(self, type_: str) -> typing.List[typing.Any]:
@@ -37,7 +37,6 @@ from django.utils.translation import ugettext as _
 
 from uds.REST import RequestError
 from uds.REST.model import DetailHandler
-from uds.core.util import permissions
 from uds.core.util.model import processUuid
 
 # Not imported at runtime, just for type checking
@@ -77,7 +76,7 @@ class AccountsUsage(DetailHandler):  # pylint: disable=too-many-public-methods
 
     def getItems(self, parent: 'Account', item: typing.Optional[str]):
         # Check what kind of access do we have to parent provider
-        perm = permissions.getEffectivePermission(self._user, parent)
+        perm = self.permissionsResolver().getEffectivePermission(parent)
         try:
             if not item:
                 return [AccountsUsage.usageToDict(k, perm) for k in parent.usages.all()]
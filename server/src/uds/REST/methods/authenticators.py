@@ -133,7 +133,7 @@ class Authenticators(ModelHandler):
             'type': type_.type(),
             'type_name': type_.name(),
             'type_info': self.typeInfo(type_),
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.permissionsResolver().getEffectivePermission(item),
         }
 
     # Custom "search" method
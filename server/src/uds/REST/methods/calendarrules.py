@@ -41,7 +41,6 @@ from django.db import IntegrityError
 from uds.models.calendar_rule import freqs, CalendarRule
 from uds.models.util import getSqlDatetime
 
-from uds.core.util import permissions
 from uds.core.util.model import processUuid
 from uds.REST.model import DetailHandler
 from uds.REST import RequestError
@@ -82,7 +81,7 @@ class CalendarRules(DetailHandler):  # pylint: disable=too-many-public-methods
 
     def getItems(self, parent: 'Calendar', item: typing.Optional[str]):
         # Check what kind of access do we have to parent provider
-        perm = permissions.getEffectivePermission(self._user, parent)
+        perm = self.permissionsResolver().getEffectivePermission(parent)
         try:
             if item is None:
                 return [CalendarRules.ruleToDict(k, perm) for k in parent.rules.all()]
@@ -35,7 +35,6 @@ import typing
 
 from django.utils.translation import ugettext_lazy as _
 from uds.models import Calendar
-from uds.core.util import permissions
 
 from uds.REST.model import ModelHandler
 from .calendarrules import CalendarRules
@@ -70,7 +69,7 @@ class Calendars(ModelHandler):
             'tags': [tag.tag for tag in item.tags.all()],
             'comments': item.comments,
             'modified': item.modified,
-            'permission': permissions.getEffectivePermission(self._user, item)
+            'permission': self.permissionsResolver().getEffectivePermission(item)
         }
 
     def getGui(self, type_: str) -> typing.List[typing.Any]:
@@ -111,7 +111,7 @@ class MetaPools(ModelHandler):
             'visible': item.visible,
             'policy': item.policy,
             'fallbackAccess': item.fallbackAccess,
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.permissionsResolver().getEffectivePermission(item),
             'calendar_message': item.calendar_message,
         }
 
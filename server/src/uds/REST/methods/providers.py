@@ -110,7 +110,7 @@ class Providers(ModelHandler):
             'type': type_.type(),
             'type_name': type_.name(),
             'comments': item.comments,
-            'permission': permissions.getEffectivePermission(self._user, item),
+            'permission': self.permissionsResolver().getEffectivePermission(item),
         }
 
     def checkDelete(self, item: Provider) -> None:
@@ -136,7 +136,7 @@ class Providers(ModelHandler):
         """
         for s in Service.objects.all():
             try:
-                perm = permissions.getEffectivePermission(self._user, s)
+                perm = self.permissionsResolver().getEffectivePermission(s)
                 if perm >= permissions.PERMISSION_READ:
                     yield DetailServices.serviceToDict(s, perm, True)
             except Exception:
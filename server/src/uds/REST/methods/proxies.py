@@ -36,7 +36,6 @@ import typing
 from django.utils.translation import ugettext_lazy as _, ugettext
 from uds.models import Proxy
 from uds.core.ui import gui
-from uds.core.util import permissions
 
 from uds.REST.model import ModelHandler
 
@@ -74,7 +73,7 @@ class Proxies(ModelHandler):
             'port': item.port,
             'ssl': item.ssl,
             'check_cert': item.check_cert,
-            'permission': permissions.getEffectivePermission(self._user, item)
+            'permission': self.permissionsResolver().getEffectivePermission(item)
         }
 
     def getGui(self, type_: str) -> typing.List[typing.Any]:
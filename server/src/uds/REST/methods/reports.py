@@ -30,17 +30,28 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import datetime
 import logging
 import typing
 
+from django import http
 from django.utils.translation import ugettext_lazy as _
 
-from uds.REST import model
+from uds.REST import model, ResponseError
 from uds import reports
+from uds.core.ui import gui
+from uds.core.managers import reportManager
+
+if typing.TYPE_CHECKING:
+    from uds.core.reports import Report
 
 
 logger = logging.getLogger(__name__)
 
+ASYNC = 'async'
+STREAM = 'stream'
+RESULT = 'result'
+
 VALID_PARAMS = ('authId', 'authSmallName', 'auth', 'username', 'realname', 'password', 'groups', 'servicePool', 'transport')
 
 
@@ -90,6 +101,8 @@ class Reports(model.BaseModelHandler):
         if nArgs == 2:
             if self._args[0] == model.GUI:
                 return self.getGui(self._args[1])
+            if self._args[0] == RESULT:
+                return self.getResult(self._args[1])
 
         raise self.invalidRequestException()
 
@@ -99,6 +112,18 @@ class Reports(model.BaseModelHandler):
         """
         logger.debug('method PUT for %s, %s, %s', self.__class__.__name__, self._args, self._params)
 
+        if len(self._args) == 2 and self._args[1] == ASYNC:
+            # Validates report & parameters before queuing it
+            self._checkValues(self._findReport(self._args[0], self._params))
+            try:
+                return {'id': reportManager().queue(self._args[0], self._params)}
+            except Exception as e:
+                logger.error('Queuing report: %s', e)
+                raise ResponseError(str(e))
+
+        if len(self._args) == 2 and self._args[1] == STREAM:
+            return self.streamReport(self._findReport(self._args[0], self._params))
+
         if len(self._args) != 1:
             raise self.invalidRequestException()
 
@@ -120,6 +145,45 @@ class Reports(model.BaseModelHandler):
             logger.exception('Generating report')
             raise self.invalidRequestException(str(e))
 
+    def _checkValues(self, report: 'Report') -> None:
+        """
+        Checks that received values are valid for the report, so errors are returned
+        to client instead of being found later, while generating it in background
+        """
+        for field in report.guiDescription(report):
+            name, desc = field['name'], field['gui']
+            value = self._params.get(name)
+            if value is None or value == '':
+                if desc.get('required'):
+                    raise self.invalidRequestException('Missing value for {}'.format(name))
+                continue
+            try:
+                if desc['type'] == gui.InputField.NUMERIC_TYPE:
+                    int(value)
+                elif desc['type'] == gui.InputField.DATE_TYPE:
+                    datetime.datetime.strptime(value, '%Y-%m-%d')
+            except (TypeError, ValueError):
+                raise self.invalidRequestException('Invalid value for {}'.format(name))
+
+    def streamReport(self, report: 'Report') -> http.StreamingHttpResponse:
+        """
+        Returns the report contents (not encoded) as a streaming response, so big reports
+        are sent while being generated instead of being built in memory
+        """
+        response = http.StreamingHttpResponse(report.generateStream(), content_type=report.mime_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(report.filename)
+        return response
+
+    def getResult(self, jobId: str) -> typing.Dict[str, typing.Any]:
+        """
+        Returns the state of a report queued using PUT reports/<uuid>/async,
+        including the report data (as PUT reports/<uuid> does) once finished
+        """
+        result = reportManager().result(jobId)
+        if result is None:
+            raise self.invalidRequestException('Invalid or expired report job id!')
+        return result
+
     # Gui related
     def getGui(self, type_: str) -> typing.List[typing.Any]:
         report = self._findReport(type_)
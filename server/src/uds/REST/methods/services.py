@@ -120,7 +120,7 @@ class Services(DetailHandler):  # pylint: disable=too-many-public-methods
 
     def getItems(self, parent: 'Provider', item: typing.Optional[str]):
         # Check what kind of access do we have to parent provider
-        perm = permissions.getEffectivePermission(self._user, parent)
+        perm = self.permissionsResolver().getEffectivePermission(parent)
         try:
             if item is None:
                 return [Services.serviceToDict(k, perm) for k in parent.services.all()]
@@ -38,6 +38,7 @@ import typing
 
 from uds import models
 
+from uds.core.jobs.executor import TaskExecutor
 from uds.core.util.stats import counters
 from uds.core.util.cache import Cache
 from uds.core.util.state import State
@@ -125,6 +126,8 @@ class System(Handler):
                     'user_services': user_services,
                     'restrained_services_pools': restrained_services_pools,
                 }
+            if self._args[0] == 'tasks':  # Task executors counters, by task manager host
+                return TaskExecutor.publishedCounters()
 
         if len(self._args) == 2:
             if self._args[0] == 'stats':
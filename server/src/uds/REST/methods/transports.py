@@ -36,7 +36,6 @@ import typing
 from django.utils.translation import ugettext_lazy as _, ugettext
 from uds.models import Transport, Network, ServicePool
 from uds.core import transports
-from uds.core.util import permissions
 from uds.core.util import os_detector as OsDetector
 
 from uds.REST.model import ModelHandler
@@ -128,7 +127,7 @@ class Transports(ModelHandler):
             'type': type_.type(),
             'type_name': type_.name(),
             'protocol': type_.protocol,
-            'permission': permissions.getEffectivePermission(self._user, item)
+            'permission': self.permissionsResolver().getEffectivePermission(item)
         }
 
     def beforeSave(self, fields: typing.Dict[str, typing.Any]) -> None:
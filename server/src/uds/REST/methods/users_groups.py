@@ -92,7 +92,7 @@ class Users(DetailHandler):
         # Extract authenticator
         try:
             if item is None:
-                values = list(Users.uuid_to_id(parent.users.all().values('uuid', 'name', 'real_name', 'comments', 'state', 'staff_member', 'is_admin', 'last_access', 'parent')))
+                values = list(Users.uuid_to_id(self.pageQuery(parent.users.all()).values('uuid', 'name', 'real_name', 'comments', 'state', 'staff_member', 'is_admin', 'last_access', 'parent')))
                 for res in values:
                     res['role'] = res['staff_member'] and (res['is_admin'] and _('Admin') or _('Staff member')) or _('User')
                 return values
@@ -249,7 +249,7 @@ class Groups(DetailHandler):
             multi = False
             if item is None:
                 multi = True
-                q = parent.groups.all().order_by('name')
+                q = self.pageQuery(parent.groups.all().order_by('name'))
             else:
                 q = parent.groups.filter(uuid=processUuid(item))
             res = []
@@ -86,6 +86,17 @@ class BaseModelHandler(Handler):
     Base Handler for Master & Detail Handlers
     """
 
+    _permissionsResolver: typing.Optional['permissions.PermissionsResolver'] = None
+
+    def permissionsResolver(self) -> 'permissions.PermissionsResolver':
+        """
+        Returns the permissions resolver for this request, so permission rows
+        are read from database just once per object type
+        """
+        if self._permissionsResolver is None:
+            self._permissionsResolver = permissions.PermissionsResolver(self._user)
+        return self._permissionsResolver
+
     def addField(
         self, gui: typing.List[typing.Any], field: typing.Dict[str, typing.Any]
     ) -> typing.List[typing.Any]:
@@ -211,7 +222,7 @@ class BaseModelHandler(Handler):
     def ensureAccess(
         self, obj: models.Model, permission: int, root: bool = False
     ) -> int:
-        perm = permissions.getEffectivePermission(self._user, obj, root)
+        perm = self.permissionsResolver().getEffectivePermission(obj, root)
         if perm < permission:
             raise self.accessDenied()
         return perm
@@ -409,6 +420,14 @@ class DetailHandler(BaseModelHandler):
         self._kwargs = kwargs
         self._user = kwargs.get('user', None)
 
+    def pageQuery(self, query: typing.Any) -> typing.Any:
+        """
+        Filters, sorts and pages (as requested by client) a listing query on database, if possible
+        """
+        if self._parent is None:
+            return query
+        return self._parent.pageQuery(query)
+
     def __checkCustom(
         self, check: str, parent: models.Model, arg: typing.Any = None
     ) -> typing.Any:
@@ -664,6 +683,12 @@ class ModelHandler(BaseModelHandler):
 
     # By default, filter is empty
     fltr: typing.Optional[str] = None
+    # Sorting and paging requested by client, if any (order is "field" or "-field" for descending)
+    order: typing.Optional[str] = None
+    offset: int = 0
+    limit: typing.Optional[int] = None
+    # Set when filter, sort and paging has already been done by database
+    _paged: bool = False
 
     # This is an array of tuples of two items, where first is method and second inticates if method needs parent id (normal behavior is it needs it)
     # For example ('services', True) -- > .../id_parent/services
@@ -769,6 +794,157 @@ class ModelHandler(BaseModelHandler):
             del self._params['filter']  # Remove parameter
             logger.debug('Found a filter expression (%s)', self.fltr)
 
+        # Sorting and paging, only done if requested, so clients not asking for them gets everything as before
+        # Only listings are sorted and paged, other requests (i.e. custom methods) may use these parameters for their own
+        paging: typing.Dict[str, typing.Any] = {}
+        for param in ('order', 'offset', 'limit'):
+            if param in self._params and self.isListing():
+                paging[param] = self._params[param]
+                del self._params[param]  # Remove parameter
+
+        self.order = paging.get('order') or None
+        try:
+            self.offset = max(int(paging.get('offset', 0)), 0)
+            self.limit = (
+                max(int(paging['limit']), 0) if 'limit' in paging else None
+            )
+        except (TypeError, ValueError):
+            raise RequestError('Invalid paging parameters')
+
+    def isListing(self) -> bool:
+        """
+        Returns True if request is a listing of items (or of the items of a detail), with or without overview
+        """
+        args = self._args
+        if len(args) > 1 and self.detail is not None and args[1] in self.detail:
+            args = args[2:]
+        return len(args) == 0 or (len(args) == 1 and args[0] == OVERVIEW)
+
+    def isPaged(self) -> bool:
+        return self.offset > 0 or self.limit is not None
+
+    def setTotal(self, total: int) -> None:
+        """
+        Returns the total number of items (before paging) to client, on X-Total-Count header
+        """
+        self.addHeader('X-Total-Count', str(total))
+
+    @staticmethod
+    def _modelField(model: typing.Type[models.Model], name: str) -> typing.Optional[models.Field]:
+        """
+        Returns the concrete, non relational, field of model with this name (if any)
+        "id" is skipped, because on REST results "id" is the uuid of the item, not the database id
+        """
+        if name == 'id':
+            return None
+        try:
+            field = model._meta.get_field(name)  # pylint: disable=protected-access
+        except Exception:
+            return None
+        if not isinstance(field, models.Field) or not field.concrete or field.is_relation:
+            return None
+        return field
+
+    def filterLookup(self, model: typing.Type[models.Model]) -> typing.Optional[models.Q]:
+        """
+        Translates current filter to a database lookup, if possible.
+        Only simple patterns (abc, abc*, *abc and *abc*) over text fields of the model can be translated, that are
+        the ones used by the admin interface. For any other one, returns None, and filter is done by doFilter.
+        """
+        try:
+            fld, pattern = typing.cast(str, self.fltr).split('=')
+        except ValueError:
+            return None
+
+        field = self._modelField(model, fld)
+        if not isinstance(field, (models.CharField, models.TextField)):
+            return None
+
+        if pattern[:1] == '^':
+            pattern = pattern[1:]
+        if pattern[-1:] == '$':
+            pattern = pattern[:-1]
+        if '?' in pattern or '[' in pattern:
+            return None
+
+        parts = pattern.split('*')
+        if len(parts) == 1:
+            return models.Q(**{fld + '__iexact': pattern})
+        if len(parts) == 2:
+            if parts[1] == '':
+                return models.Q(**{fld + '__istartswith': parts[0]})
+            if parts[0] == '':
+                return models.Q(**{fld + '__iendswith': parts[1]})
+        elif len(parts) == 3 and parts[0] == '' and parts[2] == '':
+            return models.Q(**{fld + '__icontains': parts[1]})
+
+        return None
+
+    def pushDown(self, query: typing.Any) -> typing.Tuple[typing.Any, bool]:
+        """
+        Applies current filter and sort to the query, as far as database can do them.
+        Returns the query and if the database has done all of them (so paging can also be done there)
+        Python filter (doFilter) is still applied over results, so partially translated queries gives same results
+        """
+        complete = True
+        if self.fltr is not None:
+            lookup = self.filterLookup(query.model)
+            if lookup is None:
+                complete = False
+            else:
+                query = query.filter(lookup)
+
+        if self.order is not None:
+            if self._modelField(query.model, self.order.lstrip('-')) is None:
+                complete = False
+            else:
+                query = query.order_by(self.order)
+
+        if self.isPaged():
+            # Ties must be returned in the same order on every request, or items would repeat or be missing across pages
+            ordering = list(query.query.order_by or query.model._meta.ordering)  # pylint: disable=protected-access
+            query = query.order_by(*ordering, 'pk')
+
+        return query, complete
+
+    def pageQuery(self, query: typing.Any) -> typing.Any:
+        """
+        Filters, sorts and pages a query on database, if possible.
+        Used for listings with no per item permissions (details), else falls back to doPaging
+        """
+        query, complete = self.pushDown(query)
+        if complete:
+            self._paged = True
+            if self.isPaged():
+                self.setTotal(query.count())
+                query = query[self.offset : self.offset + self.limit if self.limit is not None else None]
+
+        return query
+
+    def doPaging(self, data: typing.Any) -> typing.Any:
+        """
+        Sorts and pages (in memory) the results of a listing, if not already done by database
+        """
+        if self._paged or not isinstance(data, list) or (self.order is None and not self.isPaged()):
+            return data
+
+        if self.order is not None:
+            fld = self.order.lstrip('-')
+            try:
+                data = sorted(
+                    data,
+                    key=lambda item: (item.get(fld) is None, item.get(fld)),
+                    reverse=self.order[0] == '-',
+                )
+            except Exception:  # Not a list of dicts or not sortable field
+                logger.info('Can\'t sort by %s', self.order)
+
+        if self.isPaged():
+            self.setTotal(len(data))
+            data = data[self.offset : self.offset + self.limit if self.limit is not None else None]
+
+        return data
+
     def doFilter(self, data: typing.Any) -> typing.Any:
         # Right now, filtering only supports a single filter, in a future
         # we may improve it
@@ -882,17 +1058,38 @@ class ModelHandler(BaseModelHandler):
                 *prefetch
             )
 
+        resolver = self.permissionsResolver()
+
+        # Filter, sort and page on database as far as possible
+        query, complete = self.pushDown(query)
+        window: typing.Optional[typing.Tuple[int, typing.Optional[int]]] = None
+        if complete:
+            self._paged = True
+            if self.isPaged():
+                if resolver.checkPermissions(
+                    self.model(), permissions.PERMISSION_READ, root=True
+                ):  # Every item can be read, so page directly on database
+                    self.setTotal(query.count())
+                    query = query[self.offset : self.offset + self.limit if self.limit is not None else None]
+                else:  # Page over readable items only, building just the requested ones
+                    window = (
+                        self.offset,
+                        self.offset + self.limit if self.limit is not None else None,
+                    )
+
+        count = 0
         for item in query:
             try:
                 if (
-                    permissions.checkPermissions(
-                        typing.cast('User', self._user),
-                        item,
-                        permissions.PERMISSION_READ,
-                    )
+                    resolver.checkPermissions(item, permissions.PERMISSION_READ)
                     is False
                 ):
                     continue
+                count += 1
+                if window and (
+                    count <= window[0] or (window[1] is not None and count > window[1])
+                ):
+                    continue
                 if kwargs.get('overview', True):
                     yield self.item_as_dict_overview(item)
                 else:
@@ -904,13 +1101,16 @@ class ModelHandler(BaseModelHandler):
                 # logger.exception('Exception getting item from {0}'.format(self.model))
                 pass
 
+        if window:
+            self.setTotal(count)
+
     def get(self) -> typing.Any:
         """
-        Wraps real get method so we can process filters if they exists
+        Wraps real get method so we can process filters, sorting and paging if they exists
         """
         # Extract filter from params if present
         self.extractFilter()
-        return self.doFilter(self.doGet())
+        return self.doPaging(self.doFilter(self.doGet()))
 
     def doGet(self) -> typing.Any:
         logger.debug('method GET for %s, %s', self.__class__.__name__, self._args)
@@ -94,4 +94,7 @@ def extend_sqlite(connection=None, **kwargs):
         cursor.execute('PRAGMA journal_mode=WAL')
         connection.connection.create_function("MIN", 2, min)
         connection.connection.create_function("MAX", 2, max)
-        connection.connection.create_function("CEIL", 1, math.ceil)
+        try:
+            connection.connection.create_function("CEIL", 1, math.ceil)
+        except Exception:  # Newer sqlite versions already have CEIL, and does not allow to replace it
+            pass
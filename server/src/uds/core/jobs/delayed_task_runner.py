@@ -43,21 +43,23 @@ from django.db.models import Q
 
 from uds.models import DelayedTask as DBDelayedTask
 from uds.models import getSqlDatetime
+from uds.models.util import getLockingOptions, hasRowLocking
+from uds.core.util.config import GlobalConfig
 from uds.core.environment import Environment
 
 from .delayed_task import DelayedTask
+from .executor import TaskExecutor
 
 logger = logging.getLogger(__name__)
 
 
-class DelayedTaskThread(threading.Thread):
+class DelayedTaskThread:
     """
-    Class responsible of executing a delayed task in its own thread
+    Class responsible of executing a delayed task (on a TaskExecutor worker)
     """
     _taskInstance: DelayedTask
 
     def __init__(self, taskInstance: DelayedTask) -> None:
-        super().__init__()
         self._taskInstance = taskInstance
 
     def run(self):
@@ -73,17 +75,23 @@ class DelayedTaskRunner:
     """
     Delayed task runner class
     """
-    # How often tasks are checked
+    # Max time between checks of tasks (when idle). Checks are done more often while tasks are being found
     granularity: int = 2
+    # Min time between checks, used as start of the back off while idle
+    minGranularity: float = 0.1
 
     # to keep singleton DelayedTaskRunner
     _runner: typing.ClassVar[typing.Optional['DelayedTaskRunner']] = None
     _hostname: str
     _keepRunning: bool
+    _condition: threading.Condition
+    _wakeUpAt: typing.Optional[float]  # monotonic time when a task inserted by this process will be due
 
     def __init__(self):
         self._hostname = gethostname()
         self._keepRunning = True
+        self._condition = threading.Condition()
+        self._wakeUpAt = None
         logger.debug("Initializing delayed task runner for host %s", self._hostname)
 
     def notifyTermination(self) -> None:
@@ -92,6 +100,8 @@ class DelayedTaskRunner:
         It will mark the thread to "stop" ASAP
         """
         self._keepRunning = False
+        with self._condition:
+            self._condition.notify_all()
 
     @staticmethod
     def runner() -> 'DelayedTaskRunner':
@@ -104,31 +114,99 @@ class DelayedTaskRunner:
             DelayedTaskRunner._runner = DelayedTaskRunner()
         return DelayedTaskRunner._runner
 
-    def executeOneDelayedTask(self) -> None:
-        now = getSqlDatetime()
+    def _claimTasks(self, now: typing.Any, count: int) -> typing.List[typing.Tuple[str, bytes]]:
+        """
+        Claims (removes from database) up to "count" due tasks, in just one transaction.
+        Returns a list of (type, instance dump) of the claimed tasks
+        """
         filt = Q(execution_time__lt=now) | Q(insert_date__gt=now + timedelta(seconds=30))
         # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
+        with transaction.atomic():  # Encloses
+            dueTasks: typing.List[DBDelayedTask] = list(
+                DBDelayedTask.objects.select_for_update(**getLockingOptions()).filter(filt).order_by('execution_time')[:count]  # @UndefinedVariable
+            )
+            if not dueTasks:
+                return []
+
+            if hasRowLocking():
+                # Rows are locked by us, so we can remove all of them at once
+                DBDelayedTask.objects.filter(id__in=[task.id for task in dueTasks]).delete()  # @UndefinedVariable
+                claimed = dueTasks
+            else:
+                # No row locking (i.e. sqlite), so only keep the tasks that we have been able to remove
+                claimed = [task for task in dueTasks if DBDelayedTask.objects.filter(id=task.id).delete()[0] > 0]  # @UndefinedVariable
+
+        result: typing.List[typing.Tuple[str, bytes]] = []
+        for task in claimed:
+            if task.insert_date > now + timedelta(seconds=30):
+                logger.warning('Executed %s due to insert_date being in the future!', task.type)
+            result.append((task.type, codecs.decode(task.instance.encode(), 'base64')))
+        return result
+
+    @staticmethod
+    def batchSize() -> int:
+        """
+        Max number of tasks claimed at once (configured DELAYED_TASKS_BATCH_SIZE, at least 1)
+        """
+        return max(1, GlobalConfig.DELAYED_TASKS_BATCH_SIZE.getInt())
+
+    def executeDelayedTasks(self, count: int) -> int:
+        """
+        Claims up to "count" due tasks and executes them.
+
+        Returns the number of tasks claimed
+        """
+        if count <= 0:
+            return 0  # Do not claim anything until there is room for it
+
         try:
-            with transaction.atomic():  # Encloses
-                # Throws exception if no delayed task is avilable
-                task = DBDelayedTask.objects.select_for_update().filter(filt).order_by('execution_time')[0]  # @UndefinedVariable
-                if task.insert_date > now + timedelta(seconds=30):
-                    logger.warning('Executed %s due to insert_date being in the future!', task.type)
-                taskInstanceDump = codecs.decode(task.instance.encode(), 'base64')
-                task.delete()
-            taskInstance = pickle.loads(taskInstanceDump)
-        except IndexError:
-            return  # No problem, there is no waiting delayed task
+            claimed = self._claimTasks(getSqlDatetime(), count)
         except Exception:
             # Transaction have been rolled back using the "with atomic", so here just return
-            # Note that is taskInstance can't be loaded, this task will not be run
-            logger.exception('Obtainint one task for execution')
-            return
+            logger.exception('Obtainint tasks for execution')
+            return 0
+
+        for taskType, taskInstanceDump in claimed:
+            try:
+                taskInstance: DelayedTask = pickle.loads(taskInstanceDump)
+            except Exception:
+                # Note that is taskInstance can't be loaded, this task will not be run
+                logger.exception('Loading task %s', taskType)
+                continue
+
+            if taskInstance:
+                logger.debug('Executing delayedTask:>%s<', taskType)
+                taskInstance.env = Environment.getEnvForType(taskInstance.__class__)
+                TaskExecutor.executor().submit(taskType, DelayedTaskThread(taskInstance).run)
+
+        return len(claimed)
 
-        if taskInstance:
-            logger.debug('Executing delayedTask:>%s<', task)
-            taskInstance.env = Environment.getEnvForType(taskInstance.__class__)
-            DelayedTaskThread(taskInstance).start()
+    def _wait(self, interval: float) -> None:
+        """
+        Waits up to "interval" seconds, or less if a task inserted by this process gets due before that
+        """
+        deadline = time.monotonic() + interval
+        with self._condition:
+            while self._keepRunning:
+                if self._wakeUpAt is not None and self._wakeUpAt < deadline:
+                    deadline = self._wakeUpAt
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            # This wake up is being attended by us
+            if self._wakeUpAt is not None and self._wakeUpAt <= time.monotonic():
+                self._wakeUpAt = None
+
+    def _notifyInserted(self, delay: int) -> None:
+        """
+        Wakes up waiting runners if the inserted task gets due before any of them would check again
+        """
+        dueAt = time.monotonic() + delay
+        with self._condition:
+            if self._wakeUpAt is None or dueAt < self._wakeUpAt:
+                self._wakeUpAt = dueAt
+                self._condition.notify_all()
 
     def __insert(self, instance: DelayedTask, delay: int, tag: str) -> None:
         now = getSqlDatetime()
@@ -148,7 +226,8 @@ class DelayedTaskRunner:
             retries -= 1
             try:
                 self.__insert(instance, delay, tag)
-                break
+                self._notifyInserted(delay)
+                return True
             except Exception as e:
                 logger.info('Exception inserting a delayed task %s: %s', e.__class__, e)
                 try:
@@ -156,11 +235,9 @@ class DelayedTaskRunner:
                 except Exception:
                     logger.exception('Closing db connection at insert')
                 time.sleep(1)  # Wait a bit before next try...
-        # If retries == 0, this is a big error
-        if retries == 0:
-            logger.error("Could not insert delayed task!!!! %s %s %s", instance, delay, tag)
-            return False
-        return True
+        # All retries failed, this is a big error
+        logger.error("Could not insert delayed task!!!! %s %s %s", instance, delay, tag)
+        return False
 
     def remove(self, tag: str) -> None:
         try:
@@ -183,12 +260,22 @@ class DelayedTaskRunner:
 
     def run(self) -> None:
         logger.debug("At loop")
+        interval: float = self.granularity
         while self._keepRunning:
             try:
-                time.sleep(self.granularity)
-                self.executeOneDelayedTask()
+                self._wait(interval)
+                # Batch is limited by executor free slots, so we do not claim tasks that can't be executed yet
+                count = min(DelayedTaskRunner.batchSize(), TaskExecutor.executor().freeSlots())
+                claimed = self.executeDelayedTasks(count)
+                if count > 0 and claimed >= count:
+                    interval = 0  # Got all requested tasks, there may be more tasks due right now
+                elif claimed > 0:
+                    interval = self.minGranularity
+                else:  # Idle (or executor saturated), back off
+                    interval = min(self.granularity, max(self.minGranularity, interval * 2))
             except Exception as e:
                 logger.error('Unexpected exception at run loop %s: %s', e.__class__, e)
+                interval = self.granularity
                 try:
                     connections['default'].close()
                 except Exception:
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import time
+import queue
+import platform
+import threading
+import logging
+import typing
+
+from django.db import connections
+
+from uds.core.util.cache import Cache
+from uds.core.util.config import GlobalConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TaskExecutor:
+    """
+    Fixed size pool of worker threads, shared by schedulers and delayed task runners.
+
+    Work is only accepted while there are free slots (idle workers plus queue room),
+    so claimers must check "freeSlots" before claiming work from database (backpressure).
+    """
+
+    # to keep singleton TaskExecutor
+    _executor: typing.ClassVar[typing.Optional['TaskExecutor']] = None
+
+    # Published counters (see publishCounters) are kept this seconds, so counters of stopped hosts vanish
+    COUNTERS_VALIDITY = 180
+
+    _numWorkers: int
+    _queue: 'queue.Queue[typing.Optional[typing.Tuple[str, typing.Callable[[], None]]]]'
+    _workers: typing.List[threading.Thread]
+    _lock: threading.Lock
+    _pending: int  # Queued + running tasks
+    _active: int  # Running tasks
+    _wallTimes: typing.Dict[str, typing.List[float]]  # name -> [count, total, max]
+
+    def __init__(self, numWorkers: int, queueSize: int) -> None:
+        self._numWorkers = max(1, numWorkers)
+        self._queue = queue.Queue(max(1, queueSize))
+        self._workers = []
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._wallTimes = {}
+
+    @staticmethod
+    def executor() -> 'TaskExecutor':
+        """
+        Returns a singleton to the TaskExecutor
+        """
+        if TaskExecutor._executor is None:
+            TaskExecutor._executor = TaskExecutor(
+                GlobalConfig.TASK_WORKERS.getInt(), GlobalConfig.TASK_QUEUE_SIZE.getInt()
+            )
+        return TaskExecutor._executor
+
+    def capacity(self) -> int:
+        return self._numWorkers + self._queue.maxsize
+
+    def freeSlots(self) -> int:
+        """
+        Number of tasks that can be submitted right now without blocking
+        """
+        with self._lock:
+            return max(0, self.capacity() - self._pending)
+
+    def isSaturated(self) -> bool:
+        return self.freeSlots() == 0
+
+    def submit(self, name: str, fnc: typing.Callable[[], None]) -> None:
+        """
+        Queues "fnc" for execution on one of the workers.
+        If the queue is full, blocks until there is room for it
+        """
+        with self._lock:
+            if not self._workers:
+                for i in range(self._numWorkers):
+                    worker = threading.Thread(target=self._work, name='TaskExecutor-{}'.format(i))
+                    worker.start()
+                    self._workers.append(worker)
+            self._pending += 1
+
+        self._queue.put((name, fnc))
+
+    def shutdown(self) -> None:
+        """
+        Waits for queued tasks to be done and stops workers
+        """
+        with self._lock:
+            workers, self._workers = self._workers, []
+
+        for _ in workers:
+            self._queue.put(None)
+
+        for worker in workers:
+            worker.join()
+
+    def counters(self) -> typing.Dict[str, typing.Any]:
+        """
+        Returns current counters of this executor:
+          * queued: tasks waiting for a free worker
+          * active: tasks being executed right now
+          * workers: size of the pool
+          * wallTime: per task name, a tuple (executions, total seconds, max seconds)
+        """
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'active': self._active,
+                'workers': self._numWorkers,
+                'wallTime': {k: tuple(v) for k, v in self._wallTimes.items()},
+            }
+
+    def publishCounters(self) -> None:
+        """
+        Stores current counters on cache, so they can be read from other processes (as the REST api, on system/tasks)
+        """
+        cache = Cache('TaskExecutor')
+        hostname = platform.node()
+        cache.put(hostname, self.counters(), TaskExecutor.COUNTERS_VALIDITY)
+        hosts: typing.List[str] = cache.get('hosts') or []
+        if hostname not in hosts:
+            hosts.append(hostname)
+        cache.put('hosts', hosts, 24 * 3600)
+
+    @staticmethod
+    def publishedCounters() -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+        """
+        Returns the last published counters of every host running a task manager
+        """
+        cache = Cache('TaskExecutor')
+        published = {host: cache.get(host) for host in cache.get('hosts') or []}
+        return {host: counters for host, counters in published.items() if counters is not None}
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:  # Stop requested
+                break
+
+            name, fnc = item
+            with self._lock:
+                self._active += 1
+            start = time.monotonic()
+            try:
+                fnc()
+            except Exception:
+                logger.exception('Executing task %s', name)
+            finally:
+                elapsed = time.monotonic() - start
+                with self._lock:
+                    self._active -= 1
+                    self._pending -= 1
+                    counter = self._wallTimes.setdefault(name, [0, 0.0, 0.0])
+                    counter[0] += 1
+                    counter[1] += elapsed
+                    counter[2] = max(counter[2], elapsed)
+                try:
+                    connections['default'].close()
+                except Exception:
+                    logger.exception('Closing db connection at task executor')
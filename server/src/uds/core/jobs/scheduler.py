@@ -32,7 +32,6 @@
 """
 import typing
 import platform
-import threading
 import time
 import logging
 from datetime import timedelta
@@ -41,8 +40,11 @@ from django.db import transaction, DatabaseError, connections
 from django.db.models import Q
 
 from uds.models import Scheduler as DBScheduler, getSqlDatetime
+from uds.models.util import getLockingOptions, hasRowLocking
 from uds.core.util.state import State
+from uds.core.util.config import GlobalConfig
 from .jobs_factory import JobsFactory
+from .executor import TaskExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -50,16 +52,15 @@ logger = logging.getLogger(__name__)
 if typing.TYPE_CHECKING:
     from .job import Job
 
-class JobThread(threading.Thread):
+class JobThread:
     """
-    Class responsible of executing one job.
+    Class responsible of executing one job (on a TaskExecutor worker).
     This class:
       Ensures that the job is executed in a controlled way (any exception will be catch & processed)
       Ensures that the scheduler db entry is released after run
     """
     _jobInstance: 'Job'
     def __init__(self, jobInstance, dbJob):
-        super(JobThread, self).__init__()
         self._jobInstance = jobInstance
         self._dbJobId = dbJob.id
 
@@ -134,36 +135,62 @@ class Scheduler:
         """
         self._keepRunning = False
 
-    def executeOneJob(self):
+    def _claimJobs(self, now: typing.Any, count: int) -> typing.List[DBScheduler]:
         """
-        Looks for the best waiting job and executes it
+        Claims (marks as running by this server) up to "count" due jobs, in just one transaction.
         """
-        jobInstance = None
-        try:
-            now = getSqlDatetime()  # Datetimes are based on database server times
-            fltr = Q(state=State.FOR_EXECUTE) & (Q(last_execution__gt=now) | Q(next_execution__lt=now))
-            with transaction.atomic():
-                # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
-                # This params are all set inside fltr (look at __init__)
-                job: DBScheduler = DBScheduler.objects.select_for_update().filter(fltr).order_by('next_execution')[0]  # @UndefinedVariable
-                if job.last_execution > now:
-                    logger.warning('EXecuted %s due to last_execution being in the future!', job.name)
-                job.state = State.RUNNING
-                job.owner_server = self._hostname
-                job.last_execution = now
-                job.save()
+        # If next execution is before now or last execution is in the future (clock changed on this server, we take that task as executable)
+        fltr = Q(state=State.FOR_EXECUTE) & (Q(last_execution__gt=now) | Q(next_execution__lt=now))
+        with transaction.atomic():
+            dueJobs: typing.List[DBScheduler] = list(
+                DBScheduler.objects.select_for_update(**getLockingOptions()).filter(fltr).order_by('next_execution')[:count]  # @UndefinedVariable
+            )
+            if not dueJobs:
+                return []
+
+            if hasRowLocking():
+                # Rows are locked by us, so we can update all of them at once
+                DBScheduler.objects.filter(id__in=[job.id for job in dueJobs]).update(  # @UndefinedVariable
+                    state=State.RUNNING, owner_server=self._hostname, last_execution=now
+                )
+                claimed = dueJobs
+            else:
+                # No row locking (i.e. sqlite), so only keep the jobs that are still waiting when we mark them as running
+                claimed = [
+                    job for job in dueJobs
+                    if DBScheduler.objects.filter(id=job.id, state=State.FOR_EXECUTE).update(  # @UndefinedVariable
+                        state=State.RUNNING, owner_server=self._hostname, last_execution=now
+                    ) == 1
+                ]
+
+        for job in claimed:
+            if job.last_execution > now:
+                logger.warning('EXecuted %s due to last_execution being in the future!', job.name)
+            job.state, job.owner_server, job.last_execution = State.RUNNING, self._hostname, now
+
+        return claimed
 
-            jobInstance = job.getInstance()
+    @staticmethod
+    def batchSize() -> int:
+        """
+        Max number of jobs claimed at once (configured SCHEDULER_BATCH_SIZE, at least 1)
+        """
+        return max(1, GlobalConfig.SCHEDULER_BATCH_SIZE.getInt())
 
-            if jobInstance is None:
-                logger.error('Job instance can\'t be resolved for %s, removing it', job)
-                job.delete()
-                return
-            logger.debug('Executing job:>%s<', job.name)
-            JobThread(jobInstance, job).start()  # Do not instatiate thread, just run it
-        except IndexError:
-            # Do nothing, there is no jobs for execution
-            return
+    def executeJobs(self) -> int:
+        """
+        Looks for the best waiting jobs (up to SCHEDULER_BATCH_SIZE, and no more than the executor free slots)
+        and executes them
+
+        Returns the number of jobs claimed
+        """
+        try:
+            # Do not claim more jobs than the executor can accept right now
+            count = min(Scheduler.batchSize(), TaskExecutor.executor().freeSlots())
+            if count <= 0:
+                return 0
+            now = getSqlDatetime()  # Datetimes are based on database server times
+            claimed = self._claimJobs(now, count)
         except DatabaseError as e:
             # Whis will happen whenever a connection error or a deadlock error happens
             # This in fact means that we have to retry operation, and retry will happen on main loop
@@ -172,6 +199,18 @@ class Scheduler:
             # logger.debug('Deadlock, no problem at all :-) (sounds hards, but really, no problem, will retry later :-) )')
             raise DatabaseError('Database access problems. Retrying connection ({})'.format(e))
 
+        for job in claimed:
+            jobInstance = job.getInstance()
+
+            if jobInstance is None:
+                logger.error('Job instance can\'t be resolved for %s, removing it', job)
+                job.delete()
+                continue
+            logger.debug('Executing job:>%s<', job.name)
+            TaskExecutor.executor().submit(job.name, JobThread(jobInstance, job).run)
+
+        return len(claimed)
+
     @staticmethod
     def releaseOwnShedules():
         """
@@ -192,10 +231,14 @@ class Scheduler:
         logger.debug('Run Scheduler thread')
         JobsFactory.factory().ensureJobsInDatabase()
         logger.debug("At loop")
+        claimed = 0
         while self._keepRunning:
             try:
-                time.sleep(self.granularity)
-                self.executeOneJob()
+                # If a full batch was claimed, there may be more due jobs waiting, so do not wait for them
+                if claimed < Scheduler.batchSize():
+                    time.sleep(self.granularity)
+                claimed = 0
+                claimed = self.executeJobs()
             except Exception as e:
                 # This can happen often on sqlite, and this is not problem at all as we recover it.
                 # The log is removed so we do not get increased workers.log file size with no information at all
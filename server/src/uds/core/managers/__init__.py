@@ -43,6 +43,7 @@ if typing.TYPE_CHECKING:
     from .stats import StatsManager
     from .user_service import UserServiceManager
     from .publication import PublicationManager
+    from .reports import ReportManager
 
 def cryptoManager() -> 'CryptoManager':
     from .crypto import CryptoManager  # pylint: disable=redefined-outer-name
@@ -76,3 +77,7 @@ def userServiceManager() -> 'UserServiceManager':
 def publicationManager() -> 'PublicationManager':
     from .publication import PublicationManager  # pylint: disable=redefined-outer-name
     return PublicationManager.manager()
+
+def reportManager() -> 'ReportManager':
+    from .reports import ReportManager  # pylint: disable=redefined-outer-name
+    return ReportManager.manager()
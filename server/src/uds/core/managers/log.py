@@ -29,9 +29,15 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import time
+import atexit
 import logging
+import threading
 import typing
 
+from django.db import connections
+from django.db.models import Q, Max
+
 from uds import models
 
 from uds.core.util import log
@@ -61,14 +67,34 @@ transDict: typing.Dict['Model', int] = {
 }
 
 
+class _LogEntry(typing.NamedTuple):
+    owner_type: int
+    owner_id: int
+    level: int
+    message: str
+    source: str
+    avoidDuplicates: bool
+    created: typing.Any
+
+
 class LogManager:
     """
     Manager for logging (at database) events
+
+    Log lines are buffered, and written to database in bulk every LOG_FLUSH_INTERVAL seconds
+    by a background thread (or immediately, if LOG_FLUSH_INTERVAL is 0)
     """
     _manager: typing.Optional['LogManager'] = None
 
+    _lock: threading.Lock
+    _pending: typing.List[_LogEntry]
+    _flusher: typing.Optional[threading.Thread]
+
     def __init__(self):
-        pass
+        self._lock = threading.Lock()
+        self._pending = []
+        self._flusher = None
+        atexit.register(self.flush)
 
     @staticmethod
     def manager() -> 'LogManager':
@@ -81,34 +107,120 @@ class LogManager:
         Logs a message associated to owner
         """
         # Ensure message fits on space
-        message = str(message)[:255]
+        entry = _LogEntry(owner_type, owner_id, level, str(message)[:255], source, avoidDuplicates, models.getSqlDatetime())
 
-        qs = models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type)
-        # First, ensure we do not have more than requested logs, and we can put one more log item
-        if qs.count() >= GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt():
-            for i in qs.order_by('-created',)[GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt() - 1:]:
-                i.delete()
+        interval = GlobalConfig.LOG_FLUSH_INTERVAL.getInt()
+        if interval <= 0:  # Not buffered
+            self.__write([entry])
+            return
 
-        if avoidDuplicates is True:
+        with self._lock:
+            self._pending.append(entry)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self.__flushLoop, args=(interval,), name='LogFlusher', daemon=True)
+                self._flusher.start()
+
+    def __flushLoop(self, interval: int) -> None:
+        while True:
+            time.sleep(interval)
             try:
-                lg = models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type, level=level, source=source).order_by('-created', '-id')[0]
-                if lg.data == message:
-                    # Do not log again, already logged
-                    return
-            except Exception:  # Do not exists log
-                pass
-
-        # now, we add new log
+                self.flush()
+            except Exception:
+                logger.exception('Flushing logs')
+            finally:
+                try:
+                    connections['default'].close()
+                except Exception:
+                    logger.exception('Closing db connection at log flusher')
+
+    def flush(self) -> None:
+        """
+        Writes to database all pending log lines
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self.__write(pending)
+
+    def __lastLogged(self, entries: typing.Iterable[_LogEntry]) -> typing.Dict[typing.Tuple[int, int, int, str], str]:
+        """
+        Returns the last logged message for each (owner_type, owner_id, level, source) of entries
+        """
+        keys = {(e.owner_type, e.owner_id, e.level, e.source) for e in entries}
+        if len(keys) == 1:  # i.e. not buffered, a direct lookup is cheaper than the grouped one
+            key = keys.pop()
+            owner_type, owner_id, level, source = key
+            last = models.Log.objects.filter(
+                owner_type=owner_type, owner_id=owner_id, level=level, source=source
+            ).order_by('-id').values_list('data', flat=True)[:1]
+            return {key: last[0]} if last else {}
+
+        owners: typing.Dict[int, typing.Set[int]] = {}
+        for owner_type, owner_id, _, _ in keys:
+            owners.setdefault(owner_type, set()).add(owner_id)
+        if not owners:
+            return {}
+
+        fltr = Q()
+        for owner_type, ids in owners.items():
+            fltr |= Q(owner_type=owner_type, owner_id__in=ids)
+
+        lastIds = models.Log.objects.filter(fltr).values('owner_type', 'owner_id', 'level', 'source').annotate(last=Max('id')).values_list('last', flat=True)
+        return {
+            (v.owner_type, v.owner_id, v.level, v.source): v.data
+            for v in models.Log.objects.filter(id__in=list(lastIds)).only('owner_type', 'owner_id', 'level', 'source', 'data')
+        }
+
+    def __write(self, entries: typing.List[_LogEntry]) -> None:
+        """
+        Writes log entries to database, skipping duplicates if requested and trimming owners history to MAX_LOGS_PER_ELEMENT
+        """
+        lastLogged = self.__lastLogged(e for e in entries if e.avoidDuplicates)
+
+        toCreate: typing.List[models.Log] = []
+        for e in entries:
+            key = (e.owner_type, e.owner_id, e.level, e.source)
+            if e.avoidDuplicates and lastLogged.get(key) == e.message:
+                # Do not log again, already logged
+                continue
+            lastLogged[key] = e.message
+            toCreate.append(
+                models.Log(owner_type=e.owner_type, owner_id=e.owner_id, created=e.created, source=e.source, level=e.level, data=e.message)
+            )
+
+        if not toCreate:
+            return
+
+        # now, we add new logs (a single one is saved directly, without the transaction of bulk_create)
         try:
-            models.Log.objects.create(owner_type=owner_type, owner_id=owner_id, created=models.getSqlDatetime(), source=source, level=level, data=message)
+            if len(toCreate) == 1:
+                toCreate[0].save()
+            else:
+                models.Log.objects.bulk_create(toCreate)
         except Exception:
-            # Some objects will not get logged, such as System administrator objects, but this is fine
-            pass
+            # Retry one by one, so only failed ones are lost
+            for lg in toCreate:
+                try:
+                    lg.save()
+                except Exception:
+                    # Some objects will not get logged, such as System administrator objects, but this is fine
+                    pass
+
+        # Ensure we do not have more than requested logs
+        maxLogs = GlobalConfig.MAX_LOGS_PER_ELEMENT.getInt()
+        for owner_type, owner_id in {(lg.owner_type, lg.owner_id) for lg in toCreate}:
+            qs = models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type)
+            # First log entry that must be removed (and all older than it)
+            first = qs.order_by('-created', '-id').values_list('created', 'id')[maxLogs:maxLogs + 1]
+            if first:
+                created, id_ = first[0]
+                qs.filter(Q(created__lt=created) | Q(created=created, id__lte=id_)).delete()
 
     def __getLogs(self, owner_type: int, owner_id: int, limit: int) -> typing.List[typing.Dict]:
         """
         Get all logs associated with an user service, ordered by date
         """
+        self.flush()  # So pending log lines are also returned
         qs = models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type)
         return [{'date': x.created, 'level': x.level, 'source': x.source, 'message': x.data} for x in reversed(qs.order_by('-created', '-id')[:limit])]
 
@@ -116,6 +228,8 @@ class LogManager:
         """
         Clears all logs related to user service
         """
+        with self._lock:
+            self._pending = [e for e in self._pending if e.owner_type != owner_type or e.owner_id != owner_id]
         models.Log.objects.filter(owner_id=owner_id, owner_type=owner_type).delete()
 
     def doLog(self, wichObject: 'Model', level: int, message: str, source: str, avoidDuplicates: bool = True):
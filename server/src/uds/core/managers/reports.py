@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import uuid
+import logging
+import typing
+
+from uds.core.jobs.delayed_task import DelayedTask
+from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.util.config import GlobalConfig
+from uds.core.util.cache import Cache
+
+logger = logging.getLogger(__name__)
+
+REPORTTAG = 'rp-'
+
+# Report job states
+RUNNING, FINISHED, ERROR = 'running', 'finished', 'error'
+
+
+class ReportGenerator(DelayedTask):
+    """
+    This delayed task generates a report in background, storing the result
+    """
+
+    def __init__(self, jobId: str, reportUuid: str, values: typing.Dict[str, typing.Any]):
+        super().__init__()
+        self._jobId = jobId
+        self._reportUuid = reportUuid
+        self._values = values
+
+    def run(self):
+        from uds import reports  # pylint: disable=import-outside-toplevel
+
+        logger.debug('Generating report %s for job %s', self._reportUuid, self._jobId)
+        try:
+            for reportCls in reports.availableReports:
+                if reportCls.getUuid() == self._reportUuid:
+                    break
+            else:
+                raise Exception('Invalid report uuid!')
+
+            report = reportCls(self._values)
+            stored = ReportManager.manager().storeResult(
+                self._jobId,
+                {
+                    'state': FINISHED,
+                    'mime_type': report.mime_type,
+                    'encoded': report.encoded,
+                    'filename': report.filename,
+                    'data': report.generateEncoded(),
+                },
+            )
+            if not stored:
+                raise Exception('Report is too big to be stored, use streamed generation instead')
+        except Exception as e:
+            logger.exception('Generating report')
+            ReportManager.manager().storeResult(self._jobId, {'state': ERROR, 'error': str(e)})
+
+
+class ReportManager:
+    """
+    Manager for reports generated in background by the task manager.
+    Results (or errors) are kept for REPORT_RESULT_VALIDITY seconds
+    """
+
+    _manager: typing.Optional['ReportManager'] = None
+
+    def __init__(self):
+        self._results = Cache('reportResults')
+
+    @staticmethod
+    def manager() -> 'ReportManager':
+        if not ReportManager._manager:
+            ReportManager._manager = ReportManager()
+        return ReportManager._manager
+
+    def storeResult(self, jobId: str, result: typing.Dict[str, typing.Any]) -> bool:
+        """
+        Stores the state of a job. Returns False if it could not be stored
+        """
+        return self._results.put(jobId, result, GlobalConfig.REPORT_RESULT_VALIDITY.getInt())
+
+    def queue(self, reportUuid: str, values: typing.Dict[str, typing.Any]) -> str:
+        """
+        Queues the generation of a report, and returns the job id used to get its result.
+        If the job can't be queued, its result is an error (so clients polling it do not wait forever)
+        Raises an exception if the state of the job can't be stored
+        """
+        jobId = str(uuid.uuid4())
+        if not self.storeResult(jobId, {'state': RUNNING}):
+            raise Exception('Could not store report job state')
+        if not DelayedTaskRunner.runner().insert(ReportGenerator(jobId, reportUuid, values), 0, REPORTTAG + jobId):
+            logger.error('Could not queue generation of report %s', reportUuid)
+            if not self.storeResult(jobId, {'state': ERROR, 'error': 'Could not queue report generation'}):
+                raise Exception('Could not store report job state')
+        return jobId
+
+    def result(self, jobId: str) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        """
+        Returns the state of the job (and the report data once finished), or None if unknown or expired
+        """
+        return self._results.get(jobId)
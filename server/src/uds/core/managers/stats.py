@@ -35,7 +35,7 @@ import logging
 import typing
 
 from uds.core.util.config import GlobalConfig
-from uds.models import StatsCounters
+from uds.models import StatsCounters, StatsCountersAccum
 from uds.models import getSqlDatetime, getSqlDatetimeAsUnix
 from uds.models import StatsEvents
 
@@ -52,6 +52,12 @@ class StatsManager:
     """
     _manager: typing.Optional['StatsManager'] = None
 
+    # Max number of intervals accumulated on every accumulateCounters run, for every interval type
+    ACCUMULATE_MAX_INTERVALS = 168
+    # Seconds an interval must have ended before being accumulated, so counters stored late are not left out
+    # (once an interval is accumulated, raw counters inside it are not read anymore)
+    ACCUMULATE_MARGIN = 600
+
     def __init__(self):
         pass
 
@@ -96,6 +102,38 @@ class StatsManager:
             logger.error('Exception handling counter stats saving (maybe database is full?)')
         return False
 
+    def addCounters(self, counters: typing.Iterable[typing.Tuple[int, int, int, int]], stamp: typing.Optional[datetime.datetime] = None) -> bool:
+        """
+        Adds several counter stats to database at once.
+
+        Args:
+
+            counters: iterable of (owner_type, owner_id, counterType, counterValue) tuples
+            stamp: if not None, this will be used as date for all counters, else current date/time will be get
+
+        Returns:
+
+            True if the counters were stored
+        """
+        if stamp is None:
+            stamp = typing.cast(datetime.datetime, getSqlDatetime())
+
+        # To Unix epoch
+        stampInt = int(time.mktime(stamp.timetuple()))  # pylint: disable=maybe-no-member
+
+        try:
+            StatsCounters.objects.bulk_create(
+                [
+                    StatsCounters(owner_type=owner_type, owner_id=owner_id, counter_type=counterType, value=counterValue, stamp=stampInt)
+                    for owner_type, owner_id, counterType, counterValue in counters
+                ],
+                batch_size=1000
+            )
+            return True
+        except Exception:
+            logger.error('Exception handling counter stats saving (maybe database is full?)')
+        return False
+
     def getCounters(
         self,
         ownerType: int,
@@ -127,6 +165,21 @@ class StatsManager:
         sinceInt = int(time.mktime(since.timetuple()))
         toInt = int(time.mktime(to.timetuple()))
 
+        intervalType = self.__accumulatedIntervalFor(sinceInt, toInt, interval, max_intervals)
+        if intervalType:
+            return StatsCountersAccum.get_grouped(
+                intervalType,
+                ownerType,
+                counterType,
+                owner_id=ownerIds,
+                since=sinceInt,
+                to=toInt,
+                interval=interval,
+                max_intervals=max_intervals,
+                limit=limit,
+                use_max=use_max
+            )
+
         return StatsCounters.get_grouped(
             ownerType,
             counterType,
@@ -139,11 +192,36 @@ class StatsManager:
             use_max=use_max
         )
 
+    def __accumulatedIntervalFor(self, since: int, to: int, interval: typing.Optional[int], max_intervals: typing.Optional[int]) -> int:
+        """
+        Returns the coarsest accumulated interval type that can be used to resolve the requested grouping,
+        or 0 if raw counters must be used
+        """
+        if not interval and max_intervals and int(max_intervals) > 1 and since > 0:
+            interval = (to - since) // (int(max_intervals) - 1)
+        if not interval:
+            return 0
+        for intervalType in reversed(StatsCountersAccum.INTERVALS):
+            # Exact multiples are exact, and much bigger intervals are almost exact
+            if interval % intervalType == 0 or interval >= intervalType * 10:
+                return intervalType
+        return 0
+
+    def accumulateCounters(self) -> None:
+        """
+        Rolls up the completed intervals of raw counters into the hourly and daily accumulated counters
+        """
+        until = getSqlDatetimeAsUnix() - self.ACCUMULATE_MARGIN
+        for intervalType in StatsCountersAccum.INTERVALS:
+            created = StatsCountersAccum.accumulate(intervalType, until, self.ACCUMULATE_MAX_INTERVALS)
+            logger.debug('Accumulated %s counters of %s seconds', created, intervalType)
+
     def cleanupCounters(self):
         """
         Removes all counters previous to configured max keep time for stat information from database.
         """
         self.__doCleanup(StatsCounters)
+        self.__doCleanup(StatsCountersAccum)
 
     def getEventFldFor(self, fld: str) -> str:
         '''
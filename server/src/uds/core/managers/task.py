@@ -39,11 +39,15 @@ import typing
 from django.db import connection
 from uds.core.jobs.scheduler import Scheduler
 from uds.core.jobs.delayed_task_runner import DelayedTaskRunner
+from uds.core.jobs.executor import TaskExecutor
 from uds.core import jobs
 from uds.core.util.config import GlobalConfig
 
 logger = logging.getLogger(__name__)
 
+# Seconds between publications of task executor counters
+COUNTERS_PUBLISH_INTERVAL = 60
+
 class BaseThread(threading.Thread):
     def notifyTermination(self):
         raise NotImplementedError
@@ -109,7 +113,10 @@ class TaskManager:
         noSchedulers: int = GlobalConfig.SCHEDULER_THREADS.getInt()
         noDelayedTasks: int = GlobalConfig.DELAYED_TASKS_THREADS.getInt()
 
-        logger.info('Starting %s schedulers and %s task executors', noSchedulers, noDelayedTasks)
+        logger.info(
+            'Starting %s schedulers and %s delayed task runners, sharing %s workers',
+            noSchedulers, noDelayedTasks, TaskExecutor.executor().counters()['workers']
+        )
 
         threads: typing.List[BaseThread] = []
         thread: BaseThread
@@ -135,10 +142,21 @@ class TaskManager:
         # Remote.on()
 
         # gc.set_debug(gc.DEBUG_LEAK)
+        nextPublish = 0.0
         while TaskManager.keepRunning:
             time.sleep(1)
+            if time.monotonic() >= nextPublish:
+                nextPublish = time.monotonic() + COUNTERS_PUBLISH_INTERVAL
+                try:
+                    TaskExecutor.executor().publishCounters()
+                except Exception:
+                    logger.exception('Publishing task executor counters')
 
         for thread in threads:
             thread.notifyTermination()
 
-        # The join of threads will happen before termination, so its fine to just return here
+        for thread in threads:
+            thread.join()
+
+        # Claimers are stopped, so let the executor finish already queued work
+        TaskExecutor.executor().shutdown()
@@ -229,6 +229,9 @@ class UserServiceOpChecker(DelayedTask):
         @param dps: Database object for ServicePoolPublication
         @param pi: Instance of Publication manager for the object
         """
+        # Providers with batched state checks are checked by UserServiceBatchChecker job
+        if ci.service().parent().batchStateChecks:
+            return
         # Do not add task if already exists one that updates this service
         if DelayedTaskRunner.runner().checkExists(USERSERVICE_TAG + userService.uuid):
             return
@@ -31,6 +31,7 @@
 .. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import codecs
+import csv
 import datetime
 import logging
 import typing
@@ -171,6 +172,29 @@ class Report(UserInterface):
         """
         raise NotImplementedError()
 
+    def generateStream(self) -> typing.Iterator[typing.Union[str, bytes]]:
+        """
+        Generates the report as a sequence of chunks, so it can be sent using a streaming response.
+
+        Default implementation just yields the result of generate. Reports that can build their
+        output incrementally (as csv lists) should override this, so the whole report is never
+        kept in memory
+        """
+        yield self.generate()
+
+    @staticmethod
+    def csvStream(rows: typing.Iterable[typing.Iterable[typing.Any]]) -> typing.Iterator[str]:
+        """
+        Yields every row received formatted as a csv line
+        """
+        class Echo:  # Pseudo buffer, so csv.writer returns the formatted line instead of writing it
+            def write(self, value: str) -> str:
+                return value
+
+        writer = csv.writer(Echo())
+        for row in rows:
+            yield writer.writerow(row)
+
     def generateEncoded(self) -> str:
         """
         Generated base 64 encoded report.
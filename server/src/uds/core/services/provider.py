@@ -43,6 +43,7 @@ from uds.core.ui import gui
 # Not imported at runtime, just for type checking
 if typing.TYPE_CHECKING:
     from .service import Service
+    from .user_deployment import UserDeployment
 
 logger = logging.getLogger(__name__)
 
@@ -125,6 +126,11 @@ class ServiceProvider(Module):
     # : Note: this variable can be either a fixed value (integer, string) or a Gui text field (with a .value)
     ignoreLimits: typing.Any = None
 
+    # : If True, the state of the user deployments of this provider with an operation in progress (being
+    # : created, removed, ...) is checked periodically for all of them at once, invoking :py:meth:`.checkStates`,
+    # : instead of using a delayed task for every user deployment
+    batchStateChecks: typing.ClassVar[bool] = False
+
     @classmethod
     def getServicesTypes(cls) -> typing.List[typing.Type['Service']]:
         """
@@ -198,6 +204,21 @@ class ServiceProvider(Module):
         val = getattr(val, 'value', val)
         return val is True or val == gui.TRUE
 
+    def checkStates(self, userDeployments: typing.List['UserDeployment']) -> typing.List[str]:
+        """
+        Checks the state of several user deployments of this provider with an operation in progress.
+        Only invoked if :py:attr:`.batchStateChecks` is True.
+
+        Providers can override this so the state of all involved machines or tasks is obtained with
+        just one request to the platform.
+
+        Returns:
+            A list with the state of every user deployment (as returned by its checkState), in same order
+
+        Default implementation just invokes checkState of every user deployment
+        """
+        return [userDeployment.checkState() for userDeployment in userDeployments]
+
     def doLog(self, level: int, message: str) -> None:
         """
         Logs a message with requested level associated with this service
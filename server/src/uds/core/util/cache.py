@@ -29,27 +29,170 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import time
 import datetime
 import hashlib
-import codecs
 import pickle
+import threading
+import collections
 import typing
 import logging
 
-from django.db import transaction
-from uds.models.cache import Cache as DBCache
+from django.conf import settings
+
+from uds.models.cache_invalidation import CacheInvalidation
 from uds.models.util import getSqlDatetime
 
+from .cache_backends import CacheBackend
+
 logger = logging.getLogger(__name__)
 
+# Extra seconds logged changes are read again, in case they were committed late
+INVALIDATION_MARGIN = 10
 
-class Cache:
-    # Simple hits vs missses counters
-    hits = 0
-    misses = 0
 
+class _LocalCache:
+    """
+    Bounded, in process, LRU of cached values (stored pickled, so every get returns a fresh copy).
+
+    Every change of a key (put, remove, clean) on any server is logged on database (see CacheInvalidation),
+    and the changes logged since last check are read at most every "checkInterval" seconds,
+    discarding just the local entries of the changed keys.
+    """
+    _size: int
+    _checkInterval: float
+    _lock: threading.Lock
+    _syncLock: threading.Lock
+    _entries: 'collections.OrderedDict[str, typing.Tuple[float, str, bytes]]'  # key -> (expires, owner, pickled value)
+    _lastSync: typing.Optional[typing.Tuple[datetime.datetime, float]]  # database time, monotonic time of last check
+    # Recently invalidated keys, owners and full cache (monotonic time of invalidation), so values read
+    # from backend before an invalidation are not stored locally after it
+    _invalidated: typing.Dict[typing.Tuple[str, str], float]
+
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(self, size: int, checkInterval: float) -> None:
+        self._size = size
+        self._checkInterval = checkInterval
+        self._lock = threading.Lock()
+        self._syncLock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._lastSync = None
+        self._invalidated = {}
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._size > 0
+
+    def sync(self) -> None:
+        """
+        Discards the local entries changed by any server since last check, if not checked recently
+        """
+        now = time.monotonic()
+        if self._lastSync is not None and now - self._lastSync[1] < self._checkInterval:
+            return
+        if not self._syncLock.acquire(blocking=False):
+            return  # Other thread is already doing it
+        try:
+            dbNow = getSqlDatetime()
+            if self._lastSync is None or now - self._lastSync[1] > CacheInvalidation.KEEP_TIME / 2:
+                # First check, or changes may have been already removed from log
+                self.clear()
+            else:
+                # Changes are read again for a while, in case they were committed late
+                since = self._lastSync[0] - datetime.timedelta(seconds=self._checkInterval + INVALIDATION_MARGIN)
+                self.invalidate(CacheInvalidation.since(since))
+            self._lastSync = (dbNow, now)
+        except Exception as e:
+            logger.debug('Could not check cache changes: %s', e)
+        finally:
+            self._syncLock.release()
+
+    def invalidate(self, changes: typing.Iterable[typing.Tuple[str, str]]) -> None:
+        """
+        Discards local entries of changed (owner, key) pairs.
+        Key ALL means all keys of the owner, and owner and key ALL all of them
+        """
+        now = time.monotonic()
+        with self._lock:
+            for owner, key in changes:
+                self._invalidated[(owner, key)] = now
+                if key != CacheInvalidation.ALL:
+                    self._entries.pop(key, None)
+                elif owner == CacheInvalidation.ALL:
+                    self._entries.clear()
+                else:
+                    for k in [k for k, v in self._entries.items() if v[1] == owner]:
+                        del self._entries[k]
+            # Forget old invalidations
+            for k in [k for k, at in self._invalidated.items() if now - at > self._checkInterval * 2]:
+                del self._invalidated[k]
+
+    def get(self, key: str) -> typing.Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires, _, data = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, owner: str, key: str, data: bytes, validity: float, readAt: typing.Optional[float] = None) -> None:
+        """
+        Stores a value locally. If readAt is provided (monotonic time of the read from backend), value
+        is not stored if the key has been invalidated after that
+        """
+        if validity <= 0:
+            return
+        with self._lock:
+            if readAt is not None:
+                for k in ((owner, key), (owner, CacheInvalidation.ALL), (CacheInvalidation.ALL, CacheInvalidation.ALL)):
+                    if self._invalidated.get(k, -1.0) >= readAt:
+                        return
+            self._entries[key] = (time.monotonic() + validity, owner, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def changed(self, owner: str, keys: typing.Iterable[str]) -> None:
+        """
+        Logs the change of keys of owner (made by this server), so other servers discard their local entries
+        """
+        try:
+            CacheInvalidation.add(owner, keys)
+        except Exception:
+            # Could not log the change, so other servers may keep their old values until they expire
+            logger.warning('Could not log cache change of %s', owner)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidated[(CacheInvalidation.ALL, CacheInvalidation.ALL)] = time.monotonic()
+
+
+class Cache:
     DEFAULT_VALIDITY = 60
 
+    # In process cache tier, shared by all Cache instances. Disabled if LOCAL_CACHE_SIZE is 0.
+    # If enabled, it must be enabled on every server sharing the database, so all of them log their changes
+    _local: typing.ClassVar[_LocalCache] = _LocalCache(
+        getattr(settings, 'LOCAL_CACHE_SIZE', 0), getattr(settings, 'LOCAL_CACHE_CHECK', 2)
+    )
+
     _owner: str
     _bowner: bytes
 
@@ -57,6 +200,10 @@ class Cache:
         self._owner = owner.decode('utf-8') if isinstance(owner, bytes) else owner
         self._bowner = self._owner.encode('utf8')
 
+    @property
+    def owner(self) -> str:
+        return self._owner
+
     def __getKey(self, key: typing.Union[str, bytes]) -> str:
         h = hashlib.md5()
         if isinstance(key, str):
@@ -67,34 +214,32 @@ class Cache:
     def get(
         self, skey: typing.Union[str, bytes], defValue: typing.Any = None
     ) -> typing.Any:
-        now = getSqlDatetime()
         # logger.debug('Requesting key "%s" for cache "%s"', skey, self._owner)
         try:
             key = self.__getKey(skey)
-            # logger.debug('Key: %s', key)
-            c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
-            # If expired
-            if now > c.created + datetime.timedelta(seconds=c.validity):
+            readAt = time.monotonic()
+            if Cache._local.enabled:
+                Cache._local.sync()
+                data = Cache._local.get(key)
+                if data is not None:
+                    return pickle.loads(data)
+
+            stored = CacheBackend.backend().get(self._owner, key)
+            if stored is None:  # Not found or expired
                 return defValue
+            data, remaining = stored
 
             try:
-                # logger.debug('value: %s', c.value)
-                val = pickle.loads(
-                    typing.cast(bytes, codecs.decode(c.value.encode(), 'base64'))
-                )
+                val = pickle.loads(data)
             except Exception:  # If invalid, simple do no tuse it
                 logger.exception('Invalid pickle from cache. Removing it.')
-                c.delete()
+                CacheBackend.backend().remove(self._owner, key)
                 return defValue
 
-            Cache.hits += 1
+            if Cache._local.enabled:
+                Cache._local.put(self._owner, key, data, remaining, readAt)
             return val
-        except DBCache.DoesNotExist:  # @UndefinedVariable
-            Cache.misses += 1
-            # logger.debug('key not found: %s', skey)
-            return defValue
         except Exception:
-            Cache.misses += 1
             # logger.debug('Cache inaccesible: %s:%s', skey, e)
             return defValue
 
@@ -104,13 +249,14 @@ class Cache:
         If cached item does not exists, nothing happens (no exception thrown)
         """
         # logger.debug('Removing key "%s" for uService "%s"' % (skey, self._owner))
-        try:
-            key = self.__getKey(skey)
-            DBCache.objects.get(pk=key).delete()  # @UndefinedVariable
-            return True
-        except DBCache.DoesNotExist:  # @UndefinedVariable
+        key = self.__getKey(skey)
+        Cache._local.remove(key)
+        if not CacheBackend.backend().remove(self._owner, key):
             logger.debug('key not found')
             return False
+        if Cache._local.enabled:
+            Cache._local.changed(self._owner, [key])
+        return True
 
     def clean(self) -> None:
         Cache.delete(self._owner)
@@ -120,54 +266,120 @@ class Cache:
         skey: typing.Union[str, bytes],
         value: typing.Any,
         validity: typing.Optional[int] = None,
-    ) -> None:
+    ) -> bool:
+        """
+        Stores a value. Returns False if the value could not be stored (i.e. too big for the backend)
+        """
         # logger.debug('Saving key "%s" for cache "%s"' % (skey, self._owner,))
         if validity is None:
             validity = Cache.DEFAULT_VALIDITY
         key = self.__getKey(skey)
-        strValue: str = codecs.encode(pickle.dumps(value), 'base64').decode()
-        now = getSqlDatetime()
-        try:
-            DBCache.objects.create(
-                owner=self._owner, key=key, value=strValue, created=now, validity=validity
-            )  # @UndefinedVariable
-        except Exception:
-            try:
-                # Already exists, modify it
-                c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
-                c.owner = self._owner
-                c.key = key
-                c.value = strValue
-                c.created = now
-                c.validity = validity
-                c.save()
-            except transaction.TransactionManagementError:
-                logger.debug('Transaction in course, cannot store value')
+        data = pickle.dumps(value)
+        if not CacheBackend.backend().put(self._owner, key, data, validity):
+            Cache._local.remove(key)
+            return False
+
+        if Cache._local.enabled:
+            Cache._local.changed(self._owner, [key])
+            Cache._local.put(self._owner, key, data, validity)
+        return True
 
     def refresh(self, skey: typing.Union[str, bytes]) -> None:
         # logger.debug('Refreshing key "%s" for cache "%s"' % (skey, self._owner,))
+        key = self.__getKey(skey)
+        Cache._local.remove(key)  # Will get the new validity on next get
+        CacheBackend.backend().refresh(self._owner, key)
+
+    def getMany(
+        self, skeys: typing.Iterable[typing.Union[str, bytes]], defValue: typing.Any = None
+    ) -> typing.Dict[typing.Union[str, bytes], typing.Any]:
+        """
+        Same as get, but for several keys at once (just one backend access for all of them)
+        Returns a dictionary with the requested keys, with "defValue" for the not found ones
+        """
+        keys = {self.__getKey(skey): skey for skey in skeys}
+        result: typing.Dict[typing.Union[str, bytes], typing.Any] = {skey: defValue for skey in keys.values()}
         try:
-            key = self.__getKey(skey)
-            c = DBCache.objects.get(pk=key)  # @UndefinedVariable
-            c.created = getSqlDatetime()
-            c.save()
-        except DBCache.DoesNotExist:  # @UndefinedVariable
-            logger.debug('Can\'t refresh cache key %s because it doesn\'t exists', skey)
+            pending: typing.List[str] = []
+            readAt = time.monotonic()
+            if Cache._local.enabled:
+                Cache._local.sync()
+            for key, skey in keys.items():
+                data = Cache._local.get(key) if Cache._local.enabled else None
+                if data is not None:
+                    result[skey] = pickle.loads(data)
+                else:
+                    pending.append(key)
+
+            if not pending:
+                return result
+
+            invalid: typing.List[str] = []
+            for key, (data, remaining) in CacheBackend.backend().getMany(self._owner, pending).items():
+                try:
+                    result[keys[key]] = pickle.loads(data)
+                except Exception:
+                    logger.exception('Invalid pickle from cache. Removing it.')
+                    invalid.append(key)
+                    continue
+                if Cache._local.enabled:
+                    Cache._local.put(self._owner, key, data, remaining, readAt)
+
+            if invalid:
+                CacheBackend.backend().removeMany(self._owner, invalid)
+        except Exception:
+            # logger.debug('Cache inaccesible: %s', e)
+            pass
+        return result
+
+    def putMany(
+        self,
+        values: typing.Mapping[typing.Union[str, bytes], typing.Any],
+        validity: typing.Optional[int] = None,
+    ) -> None:
+        """
+        Same as put, but for several keys at once (just one backend access for all of them)
+        """
+        if not values:
             return
+        if validity is None:
+            validity = Cache.DEFAULT_VALIDITY
+        data = {self.__getKey(skey): pickle.dumps(value) for skey, value in values.items()}
+        if not CacheBackend.backend().putMany(self._owner, data, validity):
+            for key in data:
+                Cache._local.remove(key)
+            return
+
+        if Cache._local.enabled:
+            Cache._local.changed(self._owner, data.keys())
+            for key, value in data.items():
+                Cache._local.put(self._owner, key, value, validity)
+
+    @staticmethod
+    def counters() -> typing.Dict[str, int]:
+        """
+        Returns hits, misses and evictions of the in process cache tier
+        """
+        return {
+            'hits': Cache._local.hits,
+            'misses': Cache._local.misses,
+            'evictions': Cache._local.evictions,
+        }
 
     @staticmethod
     def purge() -> None:
-        DBCache.objects.all().delete()  # @UndefinedVariable
+        Cache.delete(None)
 
     @staticmethod
     def cleanUp() -> None:
-        DBCache.cleanUp()  # @UndefinedVariable
+        CacheBackend.backend().cleanUp()
+        CacheInvalidation.cleanUp()
 
     @staticmethod
     def delete(owner: typing.Optional[str] = None) -> None:
         # logger.info("Deleting cache items")
-        if owner is None:
-            objects = DBCache.objects.all()  # @UndefinedVariable
-        else:
-            objects = DBCache.objects.filter(owner=owner)  # @UndefinedVariable
-        objects.delete()
+        CacheBackend.backend().delete(owner)
+        if Cache._local.enabled:
+            changed = (owner or CacheInvalidation.ALL, CacheInvalidation.ALL)
+            Cache._local.invalidate([changed])
+            Cache._local.changed(changed[0], [changed[1]])
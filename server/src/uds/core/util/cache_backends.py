@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Storage backends for uds.core.util.cache.Cache
+
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import time
+import uuid
+import codecs
+import hashlib
+import datetime
+import threading
+import typing
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from uds.models.cache import Cache as DBCache
+from uds.models.util import getSqlDatetime
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Base class for cache storage backends.
+
+    Keys received are already hashed (unique for owner + key). Values are already serialized (bytes).
+    """
+    # to keep singleton configured backend
+    _backend: typing.ClassVar[typing.Optional['CacheBackend']] = None
+
+    @staticmethod
+    def backend() -> 'CacheBackend':
+        """
+        Returns the backend configured by UTILITY_CACHE setting (singleton).
+        Empty (default) means database, any other value is the name of the django cache to use (i.e. 'memory')
+        """
+        if CacheBackend._backend is None:
+            cacheName: str = getattr(settings, 'UTILITY_CACHE', '')
+            if cacheName:
+                try:
+                    CacheBackend._backend = DjangoCacheBackend(cacheName)
+                except Exception:
+                    logger.error('Cache %s for UTILITY_CACHE is not available, using database', cacheName)
+                    CacheBackend._backend = DBCacheBackend()
+            else:
+                CacheBackend._backend = DBCacheBackend()
+        return CacheBackend._backend
+
+    def get(self, owner: str, key: str) -> typing.Optional[typing.Tuple[bytes, float]]:
+        """
+        Returns a tuple (value, remaining validity in seconds), or None if key is not found or has expired
+        """
+        raise NotImplementedError
+
+    def put(self, owner: str, key: str, value: bytes, validity: int) -> bool:
+        """
+        Stores value for key, valid for "validity" seconds. Returns True if value could be stored
+        """
+        raise NotImplementedError
+
+    def remove(self, owner: str, key: str) -> bool:
+        """
+        Removes key. Returns False if key does not exists
+        """
+        raise NotImplementedError
+
+    def refresh(self, owner: str, key: str) -> None:
+        """
+        Restarts validity of key (as if it was stored right now)
+        """
+        raise NotImplementedError
+
+    def getMany(self, owner: str, keys: typing.Iterable[str]) -> typing.Dict[str, typing.Tuple[bytes, float]]:
+        """
+        Same as get, for several keys at once. Keys not found or expired are not included on result
+        Override this if backend can retrieve several keys at once
+        """
+        result: typing.Dict[str, typing.Tuple[bytes, float]] = {}
+        for key in keys:
+            stored = self.get(owner, key)
+            if stored is not None:
+                result[key] = stored
+        return result
+
+    def putMany(self, owner: str, values: typing.Mapping[str, bytes], validity: int) -> bool:
+        """
+        Same as put, for several keys at once.
+        Override this if backend can store several keys at once
+        """
+        return all([self.put(owner, key, value, validity) for key, value in values.items()])
+
+    def removeMany(self, owner: str, keys: typing.Iterable[str]) -> None:
+        """
+        Same as remove, for several keys at once.
+        Override this if backend can remove several keys at once
+        """
+        for key in keys:
+            self.remove(owner, key)
+
+    def delete(self, owner: typing.Optional[str]) -> None:
+        """
+        Removes all keys of owner, or all keys if owner is None
+        """
+        raise NotImplementedError
+
+    def cleanUp(self) -> None:
+        """
+        Removes expired keys, if backend needs it
+        """
+
+
+class DBCacheBackend(CacheBackend):
+    """
+    Stores cached values on uds_utility_cache table (default backend)
+    """
+
+    def get(self, owner: str, key: str) -> typing.Optional[typing.Tuple[bytes, float]]:
+        now = getSqlDatetime()
+        try:
+            c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
+        except DBCache.DoesNotExist:  # @UndefinedVariable
+            return None
+
+        remaining = (c.expires - now).total_seconds()
+        # If expired
+        if remaining < 0:
+            return None
+        return typing.cast(bytes, codecs.decode(c.value.encode(), 'base64')), remaining
+
+    def put(self, owner: str, key: str, value: bytes, validity: int) -> bool:
+        strValue: str = codecs.encode(value, 'base64').decode()
+        now = getSqlDatetime()
+        try:
+            # On its own savepoint, so a duplicated key does not break the transaction in course (if any)
+            with transaction.atomic():
+                DBCache.objects.create(
+                    owner=owner, key=key, value=strValue, created=now, validity=validity
+                )  # @UndefinedVariable
+        except Exception:
+            try:
+                # Already exists, modify it
+                c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
+                c.owner = owner
+                c.key = key
+                c.value = strValue
+                c.created = now
+                c.validity = validity
+                c.save()
+            except transaction.TransactionManagementError:
+                logger.debug('Transaction in course, cannot store value')
+                return False
+        return True
+
+    def remove(self, owner: str, key: str) -> bool:
+        try:
+            DBCache.objects.get(pk=key).delete()  # @UndefinedVariable
+            return True
+        except DBCache.DoesNotExist:  # @UndefinedVariable
+            return False
+
+    def refresh(self, owner: str, key: str) -> None:
+        try:
+            c: DBCache = DBCache.objects.get(pk=key)  # @UndefinedVariable
+            c.created = getSqlDatetime()
+            c.save(update_fields=['created'])
+        except DBCache.DoesNotExist:  # @UndefinedVariable
+            pass
+
+    def getMany(self, owner: str, keys: typing.Iterable[str]) -> typing.Dict[str, typing.Tuple[bytes, float]]:
+        now = getSqlDatetime()
+        result: typing.Dict[str, typing.Tuple[bytes, float]] = {}
+        for c in DBCache.objects.filter(pk__in=list(keys), expires__gte=now):  # @UndefinedVariable
+            result[c.key] = (typing.cast(bytes, codecs.decode(c.value.encode(), 'base64')), (c.expires - now).total_seconds())
+        return result
+
+    def putMany(self, owner: str, values: typing.Mapping[str, bytes], validity: int) -> bool:
+        now = getSqlDatetime()
+        expires = now + datetime.timedelta(seconds=validity)  # bulk operations does not invoke save, so set it here
+        rows = {
+            key: DBCache(
+                owner=owner, key=key, value=codecs.encode(value, 'base64').decode(), created=now, validity=validity, expires=expires
+            )
+            for key, value in values.items()
+        }
+        try:
+            with transaction.atomic():
+                existing = set(DBCache.objects.filter(pk__in=list(rows.keys())).values_list('key', flat=True))  # @UndefinedVariable
+                DBCache.objects.bulk_create([c for k, c in rows.items() if k not in existing])  # @UndefinedVariable
+                DBCache.objects.bulk_update(  # @UndefinedVariable
+                    [c for k, c in rows.items() if k in existing], ['owner', 'value', 'created', 'validity', 'expires']
+                )
+        except Exception as e:
+            # i.e. a concurrent insertion of any of the keys
+            logger.debug('Could not store cache values: %s', e)
+            return False
+        return True
+
+    def removeMany(self, owner: str, keys: typing.Iterable[str]) -> None:
+        DBCache.objects.filter(pk__in=list(keys)).delete()  # @UndefinedVariable
+
+    def delete(self, owner: typing.Optional[str]) -> None:
+        if owner is None:
+            objects = DBCache.objects.all()  # @UndefinedVariable
+        else:
+            objects = DBCache.objects.filter(owner=owner)  # @UndefinedVariable
+        objects.delete()
+
+    def cleanUp(self) -> None:
+        DBCache.cleanUp()  # @UndefinedVariable
+
+
+class DjangoCacheBackend(CacheBackend):
+    """
+    Stores cached values on a django cache, i.e. the memcached configured as "memory" on settings.
+
+    As memcached can't enumerate keys, keys are namespaced with a version per owner (and a global one),
+    and deleting an owner simply replaces its version (old keys expire by themselves).
+    Versions are random values, never reused, so if a version key is evicted, the values stored
+    under the evicted version can't be valid again.
+
+    Versions are kept in process for VERSIONS_TTL seconds, so most operations are a single cache request.
+    Because of this, deletions done by other servers are seen by this one up to VERSIONS_TTL seconds later.
+    """
+    VERSIONS_TTL = 5
+
+    _cache: typing.Any
+    _versions: typing.Dict[str, typing.Tuple[str, float]]  # version key -> (version, monotonic time it was read)
+    _lock: threading.Lock
+
+    def __init__(self, cacheName: str) -> None:
+        from django.core.cache import caches  # pylint: disable=import-outside-toplevel
+
+        self._cache = caches[cacheName]
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _nsKey(owner: typing.Optional[str]) -> str:
+        if owner is None:
+            return 'udsc-ns'
+        return 'udsc-ns-' + hashlib.md5(owner.encode('utf8')).hexdigest()
+
+    def _key(self, owner: str, key: str) -> str:
+        nsKeys = (self._nsKey(None), self._nsKey(owner))
+        now = time.monotonic()
+        with self._lock:
+            known = {nsKey: self._versions.get(nsKey) for nsKey in nsKeys}
+        versions = {nsKey: v[0] for nsKey, v in known.items() if v is not None and now - v[1] < self.VERSIONS_TTL}
+
+        missing = [nsKey for nsKey in nsKeys if nsKey not in versions]
+        if missing:
+            stored = self._cache.get_many(missing)
+            for nsKey in missing:
+                if nsKey not in stored:  # Never created or evicted, start a new one (or use the one added by other server)
+                    self._cache.add(nsKey, uuid.uuid4().hex, None)
+                    stored[nsKey] = self._cache.get(nsKey)
+            with self._lock:
+                self._versions.update({nsKey: (stored[nsKey], now) for nsKey in missing})
+            versions.update(stored)
+        return 'udsc-{}-{}-{}'.format(versions[nsKeys[0]], versions[nsKeys[1]], key)
+
+    def get(self, owner: str, key: str) -> typing.Optional[typing.Tuple[bytes, float]]:
+        stored = self._cache.get(self._key(owner, key))
+        if stored is None:
+            return None
+        value, expires, _ = stored
+        remaining = expires - time.time()
+        if remaining < 0:
+            return None
+        return value, remaining
+
+    def put(self, owner: str, key: str, value: bytes, validity: int) -> bool:
+        # Values refused by memcached (bigger than its max item size) are simply not found later, as an expired one
+        self._cache.set(self._key(owner, key), (value, time.time() + validity, validity), validity)
+        return True
+
+    def remove(self, owner: str, key: str) -> bool:
+        realKey = self._key(owner, key)
+        if self._cache.get(realKey) is None:
+            return False
+        self._cache.delete(realKey)
+        return True
+
+    def refresh(self, owner: str, key: str) -> None:
+        realKey = self._key(owner, key)
+        stored = self._cache.get(realKey)
+        if stored is not None:
+            value, _, validity = stored
+            self._cache.set(realKey, (value, time.time() + validity, validity), validity)
+
+    def getMany(self, owner: str, keys: typing.Iterable[str]) -> typing.Dict[str, typing.Tuple[bytes, float]]:
+        prefix = self._key(owner, '')
+        now = time.time()
+        result: typing.Dict[str, typing.Tuple[bytes, float]] = {}
+        for realKey, (value, expires, _) in self._cache.get_many([prefix + key for key in keys]).items():
+            if expires >= now:
+                result[realKey[len(prefix):]] = (value, expires - now)
+        return result
+
+    def putMany(self, owner: str, values: typing.Mapping[str, bytes], validity: int) -> bool:
+        prefix = self._key(owner, '')
+        expires = time.time() + validity
+        # set_many returns the list of keys that could not be stored
+        return not self._cache.set_many({prefix + key: (value, expires, validity) for key, value in values.items()}, validity)
+
+    def removeMany(self, owner: str, keys: typing.Iterable[str]) -> None:
+        prefix = self._key(owner, '')
+        self._cache.delete_many([prefix + key for key in keys])
+
+    def delete(self, owner: typing.Optional[str]) -> None:
+        # Version keys never expires
+        nsKey, version = self._nsKey(owner), uuid.uuid4().hex
+        self._cache.set(nsKey, version, None)
+        with self._lock:
+            self._versions[nsKey] = (version, time.monotonic())
@@ -30,61 +30,78 @@
 """
 .. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import bisect
 import datetime
-import time
 import logging
+import typing
 
-import bitarray
-
-from django.core.cache import caches
-
-from uds.models.util import NEVER
 from uds.models.util import getSqlDatetime
 
 from uds.models.calendar import Calendar
 
-from uds.core.util.cache import Cache
-
 
 logger = logging.getLogger(__name__)
 
 ONE_DAY = 3600 * 24
 
 
+class CalendarTimeline(typing.NamedTuple):
+    """
+    Compiled view of a calendar for a time window: the instants where the calendar becomes
+    active or inactive (sorted, alternating), and the start and end instants of all rules events
+    """
+
+    modified: datetime.datetime
+    since: datetime.datetime
+    until: datetime.datetime
+    transitions: typing.List[datetime.datetime]
+    starts: typing.List[datetime.datetime]
+    ends: typing.List[datetime.datetime]
+
+    def covers(self, dtime: datetime.datetime) -> bool:
+        return self.since <= dtime < self.until
+
+    def isActive(self, dtime: datetime.datetime) -> bool:
+        # Granularity is minute, as calendar rules
+        return bisect.bisect_right(self.transitions, dtime.replace(second=0, microsecond=0)) % 2 == 1
+
+    def nextEvent(self, dtime: datetime.datetime, startEvent: bool) -> typing.Optional[datetime.datetime]:
+        events = self.starts if startEvent else self.ends
+        pos = bisect.bisect_right(events, dtime)
+        return events[pos] if pos < len(events) else None
+
+
 class CalendarChecker:
     calendar: Calendar
 
+    # Days covered by compiled timelines
+    TIMELINE_DAYS = 7
+
     # For performance checking
     updates: int = 0
     cache_hit: int = 0
     hits: int = 0
 
-    cache = Cache('calChecker')
+    # Compiled timelines, by calendar uuid
+    timelines: typing.ClassVar[typing.Dict[str, CalendarTimeline]] = {}
 
     def __init__(self, calendar: Calendar):
         self.calendar = calendar
 
-    def _updateData(self, dtime: datetime.datetime):
-        logger.debug('Updating %s', dtime)
-        # Else, update the array
+    def _compileTimeline(self, dtime: datetime.datetime) -> CalendarTimeline:
+        logger.debug('Compiling timeline of %s for %s', self.calendar.name, dtime)
         CalendarChecker.updates += 1
 
-        data = bitarray.bitarray(60 * 24)  # Granurality is minute
-        data.setall(False)
-
-        data_date = dtime.date()
-
-        start = datetime.datetime.combine(data_date, datetime.datetime.min.time())
-        end = datetime.datetime.combine(data_date, datetime.datetime.max.time())
+        since = datetime.datetime.combine(dtime.date(), datetime.datetime.min.time())
+        until = since + datetime.timedelta(days=CalendarChecker.TIMELINE_DAYS)
 
+        intervals: typing.List[typing.Tuple[datetime.datetime, datetime.datetime]] = []
+        starts: typing.List[datetime.datetime] = []
+        ends: typing.List[datetime.datetime] = []
         for rule in self.calendar.rules.all():
             rr = rule.as_rrule()
-
-            r_end = (
-                datetime.datetime.combine(rule.end, datetime.datetime.max.time())
-                if rule.end is not None
-                else None
-            )
+            starts += rr.between(since, until, inc=True)
+            ends += rule.as_rrule_end().between(since, until, inc=True)
 
             ruleDurationMinutes = rule.duration_as_minutes
             ruleFrequencyMinutes = rule.frequency_as_minutes
@@ -93,35 +110,43 @@ class CalendarChecker:
             if ruleDurationMinutes == 0 or ruleFrequencyMinutes == 0:
                 continue
 
-            # ruleDurationMinutes = ruleDurationMinutes
-            # Relative start, rrule can "spawn" the days, so we get the start at least the ruleDurationMinutes of rule to see if it "matches"
-            # This means, we need the previous matching day to be "executed" so we can get the "actives" correctly
-            diff = (
-                ruleFrequencyMinutes
-                if ruleFrequencyMinutes > ruleDurationMinutes
-                else ruleDurationMinutes
-            )
-            _start = (start if start > rule.start else rule.start) - datetime.timedelta(
-                minutes=diff
-            )
-
-            _end = end if r_end is None or end < r_end else r_end
-
-            for val in rr.between(_start, _end, inc=True):
-                if val.date() != data_date:
-                    diff = int((start - val).total_seconds() / 60)
-                    pos = 0
-                    posdur = ruleDurationMinutes - diff
-                    if posdur <= 0:
-                        continue
-                else:
-                    pos = val.hour * 60 + val.minute
-                    posdur = pos + ruleDurationMinutes
-                if posdur > 60 * 24:
-                    posdur = 60 * 24
-                data[pos:posdur] = True
-
-        return data
+            # Events started before the window can still be active on it
+            diff = max(ruleFrequencyMinutes, ruleDurationMinutes)
+            duration = datetime.timedelta(minutes=ruleDurationMinutes)
+            intervals += [
+                (val, val + duration)
+                for val in rr.between(since - datetime.timedelta(minutes=diff), until, inc=True)
+            ]
+
+        # Merge intervals, so transitions alternates between active & inactive
+        transitions: typing.List[datetime.datetime] = []
+        for begin, end in sorted(intervals):
+            if transitions and begin <= transitions[-1]:
+                transitions[-1] = max(transitions[-1], end)
+            else:
+                transitions += [begin, end]
+
+        return CalendarTimeline(
+            modified=self.calendar.modified,
+            since=since,
+            until=until,
+            transitions=transitions,
+            starts=sorted(starts),
+            ends=sorted(ends),
+        )
+
+    def timeline(self, dtime: datetime.datetime) -> CalendarTimeline:
+        """
+        Returns the compiled timeline of the calendar covering dtime, compiling it if needed
+        (not compiled yet, calendar modified or dtime out of compiled window)
+        """
+        timeline = CalendarChecker.timelines.get(self.calendar.uuid)
+        if timeline is None or timeline.modified != self.calendar.modified or not timeline.covers(dtime):
+            timeline = self._compileTimeline(dtime)
+            CalendarChecker.timelines[self.calendar.uuid] = timeline
+        else:
+            CalendarChecker.cache_hit += 1
+        return timeline
 
     def _updateEvents(self, checkFrom, startEvent=True):
 
@@ -149,36 +174,7 @@ class CalendarChecker:
         if dtime is None:
             dtime = getSqlDatetime()
 
-        # memcached access
-        memCache = caches['memory']
-
-        # First, try to get data from cache if it is valid
-        cacheKey = (
-            str(self.calendar.modified.toordinal())
-            + str(dtime.date().toordinal())
-            + self.calendar.uuid
-            + 'checker'
-        )
-        # First, check "local memory cache", and if not found, from DB cache
-        cached = memCache.get(cacheKey)
-        if not cached:
-            cached = CalendarChecker.cache.get(cacheKey, None)
-            if cached:
-                memCache.set(cacheKey, cached, ONE_DAY)
-
-        if cached:
-            data = bitarray.bitarray()  # Empty bitarray
-            data.frombytes(cached)
-            CalendarChecker.cache_hit += 1
-        else:
-            data = self._updateData(dtime)
-
-            # Now data can be accessed as an array of booleans.
-            # Store data on persistent cache
-            CalendarChecker.cache.put(cacheKey, data.tobytes(), ONE_DAY)
-            memCache.set(cacheKey, data.tobytes(), ONE_DAY)
-
-        return data[dtime.hour * 60 + dtime.minute]
+        return self.timeline(dtime).isActive(dtime)
 
     def nextEvent(self, checkFrom=None, startEvent=True, offset=None):
         """
@@ -192,27 +188,18 @@ class CalendarChecker:
         if offset is None:
             offset = datetime.timedelta(minutes=0)
 
-        cacheKey = (
-            str(hash(self.calendar.modified))
-            + self.calendar.uuid
-            + str(offset.seconds)
-            + str(int(time.mktime(checkFrom.timetuple())))
-            + 'event'
-            + ('x' if startEvent is True else '_')
-        )
-        next_event = CalendarChecker.cache.get(cacheKey, None)
-        if next_event is None:
-            logger.debug('Regenerating cached nextEvent')
-            next_event = self._updateEvents(
-                checkFrom + offset, startEvent
-            )  # We substract on checkin, so we can take into account for next execution the "offset" on start & end (just the inverse of current, so we substract it)
-            if next_event is not None:
-                next_event += offset
-            CalendarChecker.cache.put(cacheKey, next_event, 3600)
+        # We substract on checkin, so we can take into account for next execution the "offset" on start & end (just the inverse of current, so we substract it)
+        checkFrom += offset
+        next_event = self.timeline(checkFrom).nextEvent(checkFrom, startEvent)
+        if next_event is None:  # Not in compiled window, look for it on rules
+            logger.debug('Next event out of timeline')
+            next_event = self._updateEvents(checkFrom, startEvent)
         else:
-            logger.debug('nextEvent cache hit')
             CalendarChecker.hits += 1
 
+        if next_event is not None:
+            next_event += offset
+
         return next_event
 
     def debug(self):
@@ -237,10 +237,22 @@ class GlobalConfig:
     SESSION_EXPIRE_TIME: Config.Value = Config.section(GLOBAL_SECTION).value('sessionExpireTime', '24', type=Config.NUMERIC_FIELD)  # Max session duration (in use) after a new publishment has been made
     # Delay between cache checks. reducing this number will increase cache generation speed but also will load service providers
     CACHE_CHECK_DELAY: Config.Value = Config.section(GLOBAL_SECTION).value('cacheCheckDelay', '19', type=Config.NUMERIC_FIELD)
+    # Max number of user services created for every service pool on each cache check (created concurrently, honoring the max preparing services of its provider)
+    CACHE_GROWTH_STEPS: Config.Value = Config.section(GLOBAL_SECTION).value('cacheGrowthSteps', '4', type=Config.NUMERIC_FIELD)
+    # If cache L1 size of service pools is raised ahead of time using the cache usage of the same weekday and hour of previous weeks, and max number of elements it can be raised
+    CACHE_PREDICTION: Config.Value = Config.section(GLOBAL_SECTION).value('cachePrediction', '0', type=Config.BOOLEAN_FIELD)
+    CACHE_PREDICTION_MAX: Config.Value = Config.section(GLOBAL_SECTION).value('cachePredictionMax', '20', type=Config.NUMERIC_FIELD)
     # Delayed task number of threads PER SERVER, with higher number of threads, deplayed task will complete sooner, but it will give more load to overall system
     DELAYED_TASKS_THREADS: Config.Value = Config.section(GLOBAL_SECTION).value('delayedTasksThreads', '4', type=Config.NUMERIC_FIELD)
+    # Max number of due delayed tasks a delayed task thread claims on each check (tasks are claimed in just one transaction)
+    DELAYED_TASKS_BATCH_SIZE: Config.Value = Config.section(GLOBAL_SECTION).value('delayedTasksBatchSize', '8', type=Config.NUMERIC_FIELD)
     # Number of scheduler threads running PER SERVER, with higher number of threads, deplayed task will complete sooner, but it will give more load to overall system
     SCHEDULER_THREADS: Config.Value = Config.section(GLOBAL_SECTION).value('schedulerThreads', '3', type=Config.NUMERIC_FIELD)
+    # Max number of due jobs a scheduler thread claims on each check (jobs are claimed in just one transaction)
+    SCHEDULER_BATCH_SIZE: Config.Value = Config.section(GLOBAL_SECTION).value('schedulerBatchSize', '4', type=Config.NUMERIC_FIELD)
+    # Number of worker threads PER SERVER that executes scheduled jobs and delayed tasks, and max number of them waiting for a free worker
+    TASK_WORKERS: Config.Value = Config.section(GLOBAL_SECTION).value('taskWorkers', '16', type=Config.NUMERIC_FIELD)
+    TASK_QUEUE_SIZE: Config.Value = Config.section(GLOBAL_SECTION).value('taskQueueSize', '16', type=Config.NUMERIC_FIELD)
     # Waiting time before removing "errored" and "removed" publications, cache, and user assigned machines. Time is in seconds
     CLEANUP_CHECK: Config.Value = Config.section(GLOBAL_SECTION).value('cleanupCheck', '3607', type=Config.NUMERIC_FIELD)
     # Time to maintaing "info state" items before removing it, in seconds
@@ -289,6 +301,8 @@ class GlobalConfig:
     MAX_INITIALIZING_TIME: Config.Value = Config.section(GLOBAL_SECTION).value('maxInitTime', '3601', type=Config.NUMERIC_FIELD)
     # Maximum logs per user service
     MAX_LOGS_PER_ELEMENT: Config.Value = Config.section(GLOBAL_SECTION).value('maxLogPerElement', '100', type=Config.NUMERIC_FIELD)
+    # Seconds between writes of buffered log lines to database (0 writes them immediately)
+    LOG_FLUSH_INTERVAL: Config.Value = Config.section(GLOBAL_SECTION).value('logFlushInterval', '2', type=Config.NUMERIC_FIELD)
     # Time to restrain a deployed service in case it gives some errors at some point
     RESTRAINT_TIME: Config.Value = Config.section(GLOBAL_SECTION).value('restrainTime', '600', type=Config.NUMERIC_FIELD)
     # Number of errors that must occurr in RESTRAIN_TIME to restrain deployed service
@@ -296,6 +310,8 @@ class GlobalConfig:
 
     # Statistics duration, in days
     STATS_DURATION: Config.Value = Config.section(GLOBAL_SECTION).value('statsDuration', '365', type=Config.NUMERIC_FIELD)
+    # Seconds that the results of reports generated in background are kept
+    REPORT_RESULT_VALIDITY: Config.Value = Config.section(GLOBAL_SECTION).value('reportResultValidity', '3600', type=Config.NUMERIC_FIELD)
     # If disallow login using /login url, and must go to an authenticator
     DISALLOW_GLOBAL_LOGIN: Config.Value = Config.section(GLOBAL_SECTION).value('disallowGlobalLogin', '0', type=Config.BOOLEAN_FIELD)
 
@@ -31,8 +31,10 @@
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 from functools import wraps
+import time
 import logging
 import inspect
+import threading
 import typing
 
 from uds.core.util.html import checkBrowser
@@ -103,6 +105,59 @@ def ensureConected(func: typing.Callable[..., RT]) -> typing.Callable[..., RT]:
 
     
 
+class _StaleableValue(typing.NamedTuple):
+    """
+    Value stored by allowCache when stale values are allowed
+    """
+    freshUntil: float
+    value: typing.Any
+
+
+class _InFlightCall:
+    """
+    A call being executed by allowCache, that other callers of same key can wait for
+    """
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: typing.Any = None
+        self.error: typing.Optional[Exception] = None
+
+
+_inFlight: typing.Dict[typing.Tuple[str, str], _InFlightCall] = {}
+_inFlightLock = threading.Lock()
+
+
+def _singleFlight(key: typing.Tuple[str, str], fnc: typing.Callable[[], RT], stale: typing.Optional[_StaleableValue] = None) -> RT:
+    """
+    Executes fnc, unless there is already a call in course (in this process) for the same key.
+    In that case, waits for that call and returns its result (or the stale value if provided, without waiting)
+    """
+    with _inFlightLock:
+        call = _inFlight.get(key)
+        isOwner = call is None
+        if call is None:
+            call = _inFlight[key] = _InFlightCall()
+
+    if not isOwner:
+        if stale is not None:
+            return stale.value
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fnc()
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _inFlightLock:
+            del _inFlight[key]
+        call.done.set()
+    return call.result
+
+
 # Decorator that allows us a "fast&clean" caching system on service providers
 #
 # Decorator for caching
@@ -112,16 +167,22 @@ def allowCache(
         cacheTimeout: int,
         cachingArgs: typing.Optional[typing.Union[typing.List[int], typing.Tuple[int], int]] = None,
         cachingKWArgs: typing.Optional[typing.Union[typing.List[str], typing.Tuple[str], str]] = None,
-        cachingKeyFnc: typing.Optional[typing.Callable[[typing.Any], str]] = None
+        cachingKeyFnc: typing.Optional[typing.Callable[[typing.Any], str]] = None,
+        staleTimeout: int = 0
     ) -> typing.Callable[[typing.Callable[..., RT]], typing.Callable[..., RT]]:
     """Decorator that give us a "quick& clean" caching feature on service providers.
 
     Note: This decorator is intended ONLY for service providers
 
+    Concurrent misses of the same key on same process are coalesced, so only one of them executes the
+    wrapped function and the rest wait for its result.
+
     :param cachePrefix: the cache key "prefix" (prepended on generated key from args)
     :param cacheTimeout: The cache timeout in seconds
     :param cachingArgs: The caching args. Can be a single integer or a list.
                         First arg (self) is 0, so normally cachingArgs are 1, or [1,2,..]
+    :param staleTimeout: If not 0, seconds that an expired value can still be returned while it is being refreshed
+                         (only the caller that refreshes it waits for the wrapped function)
     """
     keyFnc = cachingKeyFnc or (lambda x: '')
 
@@ -142,22 +203,37 @@ def allowCache(
             else:
                 cacheKey = '{}-{}.gen'.format(cachePrefix, keyFnc(args[0]))
 
-            data: typing.Any = None
-            if kwargs.get('force', False) is False and args[0].cache:
-                data = args[0].cache.get(cacheKey)
-
-            if 'force' in kwargs:
-                # Remove force key
-                del kwargs['force']
+            force = kwargs.pop('force', False)  # Remove force key
+            cache = args[0].cache
 
-            if data is None and args[0].cache:  # Not in cache and object can cache it
-                data = fnc(*args, **kwargs)
+            data: typing.Any = None
+            stale: typing.Optional[_StaleableValue] = None
+            if force is False and cache:
+                data = cache.get(cacheKey)
+                if isinstance(data, _StaleableValue):
+                    if data.freshUntil >= time.time():
+                        return data.value
+                    stale, data = data, None
+
+            if data is not None or not cache:  # In cache, or object can't cache it
+                return data
+
+            def execute() -> RT:
+                result = fnc(*args, **kwargs)
                 try:
                     # Maybe returned data is not serializable. In that case, cache will fail but no harm is done with this
-                    args[0].cache.put(cacheKey, data, cacheTimeout)
+                    if staleTimeout:
+                        cache.put(cacheKey, _StaleableValue(time.time() + cacheTimeout, result), cacheTimeout + staleTimeout)
+                    else:
+                        cache.put(cacheKey, result, cacheTimeout)
                 except Exception as e:
-                    logger.debug('Data for %s is not serializable on call to %s, not cached. %s (%s)', cacheKey, fnc.__name__, data, e)
-            return data
+                    logger.debug('Data for %s is not serializable on call to %s, not cached. %s (%s)', cacheKey, fnc.__name__, result, e)
+                return result
+
+            if force:  # Forced calls are not coalesced with (maybe older) calls in course
+                return execute()
+
+            return _singleFlight((cache.owner, cacheKey), execute, stale)
 
         return wrapper
 
@@ -31,6 +31,8 @@
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
 import re
+import functools
+import ipaddress
 import logging
 import typing
 
@@ -39,6 +41,9 @@ NetworklistType = typing.List[NetworkType]
 
 logger = logging.getLogger(__name__)
 
+IPV4_MAX = 2 ** 32 - 1
+IPV6_MAX = 2 ** 128 - 1
+
 # Test patters for networks
 reCIDR = re.compile(r'^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})/([0-9]{1,2})$')
 reMask = re.compile(r'^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})netmask([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})$')
@@ -49,11 +54,21 @@ reRange = re.compile(r'^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})-(
 reHost = re.compile(r'^([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})$')
 
 
+def ipVersion(ip: str) -> int:
+    """
+    Returns the version of the ip (or network) string, 6 for IPv6 and 4 for anything else
+    """
+    return 6 if ':' in ip else 4
+
+
 def ipToLong(ip: str) -> int:
     """
-    convert decimal dotted quad string to long integer
+    convert decimal dotted quad string (or IPv6 address string) to long integer
+    Note that IPv4 and IPv6 values overlap, so the version (see ipVersion) must also be taken into account
     """
     try:
+        if ipVersion(ip) == 6:
+            return int(ipaddress.IPv6Address(ip.strip('[]')))
         hexn = int(''.join(["%02X" % int(i) for i in ip.split('.')]), 16)
         logger.debug('IP %s is %s', ip, hexn)
         return hexn
@@ -62,11 +77,13 @@ def ipToLong(ip: str) -> int:
         return 0  # Invalid values will map to "0.0.0.0" --> 0
 
 
-def longToIp(n: int) -> str:
+def longToIp(n: int, version: int = 4) -> str:
     """
-    convert long int to dotted quad string
+    convert long int to dotted quad string (or IPv6 address string if version is 6)
     """
     try:
+        if version == 6:
+            return str(ipaddress.IPv6Address(n))
         d = 1 << 24
         q = []
         while d > 0:
@@ -92,6 +109,7 @@ def networksFromString(strNets: str, allowMultipleNetworks: bool = True) -> typi
       - A.B.C.D netmask X.X.X.X (i.e. 192.168.0.0 netmask 255.255.255.0)
       - A.B.C.D - E.F.G.D (i.e. 192-168.0.0-192.168.0.255)
       - A.B.C.D
+      - IPv6 networks, as X:X::X/N, X:X::X - Y:Y::Y or X:X::X (values are IPv6 addresses as integers)
     If allowMultipleNetworks is True, it allows ',' and ';' separators (and, ofc, more than 1 network)
     Returns a list of networks tuples in the form [(start1, end1), (start2, end2) ...]
     """
@@ -128,7 +146,20 @@ def networksFromString(strNets: str, allowMultipleNetworks: bool = True) -> typi
     strNets = strNets.replace(' ', '')
 
     if strNets == '*':
-        return 0, 4294967295
+        return 0, IPV4_MAX
+
+    if ipVersion(strNets) == 6:
+        try:
+            if '-' in strNets:
+                start, end = (int(ipaddress.IPv6Address(v)) for v in strNets.split('-'))
+                if end < start:
+                    raise Exception()
+                return start, end
+            network = ipaddress.IPv6Network(strNets, strict=False)
+            return int(network.network_address), int(network.broadcast_address)
+        except Exception as e:
+            logger.error('Invalid network found: %s %s', strNets, e)
+            raise ValueError(inputString)
 
     try:
         # Test patterns
@@ -186,11 +217,32 @@ def networksFromString(strNets: str, allowMultipleNetworks: bool = True) -> typi
         raise ValueError(inputString)
 
 
+@functools.lru_cache(maxsize=256)
+def versionedNetworksFromString(strNets: str) -> typing.Tuple[typing.Tuple[int, int, int], ...]:
+    """
+    Parses (and keeps parsed, as the same network strings are checked over and over) the networks
+    of strNets, as networksFromString does, but returning (version, start, end) tuples.
+    "*" means any ip, so it is expanded to the full IPv4 and IPv6 ranges
+    """
+    result: typing.List[typing.Tuple[int, int, int]] = []
+    for strNet in re.split('[;,]', strNets):
+        if strNet.replace(' ', '') == '*':
+            result += [(4, 0, IPV4_MAX), (6, 0, IPV6_MAX)]
+        elif strNet != '':
+            result.append((ipVersion(strNet), *typing.cast(NetworkType, networksFromString(strNet, False))))
+    return tuple(result)
+
+
 def ipInNetwork(ip: typing.Union[str, int], network: typing.Union[str, NetworklistType]) -> bool:
+    version = 4
     if isinstance(ip, str):
+        version = ipVersion(ip)
         ip = ipToLong(ip)
     if isinstance(network, str):
-        network = typing.cast(NetworklistType, networksFromString(network))
+        return any(
+            v == version and start <= ip <= end
+            for v, start, end in versionedNetworksFromString(network)
+        )
 
     for net in typing.cast(NetworklistType, network):
         if net[0] <= ip <= net[1]:
@@ -32,7 +32,8 @@
 """
 import logging
 import typing
-from uds.REST.methods.permissions import Permissions
+
+from django.db.models import Q
 
 from uds import models
 from uds.core.util import ot
@@ -73,6 +74,62 @@ def getEffectivePermission(user: 'models.User', obj: 'Model', root: bool = False
         return PERMISSION_NONE
 
 
+class PermissionsResolver:
+    """
+    Resolves effective permissions of an user over many objects of the same type.
+
+    All permission rows of the user (and his groups) for an object type are read with just one query,
+    and kept in memory, so checking a full listing of objects does not hits the database once per object.
+    Instances are intended to live just for one request, so changes on permissions are seen on next one.
+    """
+
+    _user: 'models.User'
+    _byType: typing.Dict[int, typing.Tuple[int, typing.Dict[int, int]]]
+
+    def __init__(self, user: 'models.User') -> None:
+        self._user = user
+        self._byType = {}
+
+    def _load(self, objectType: int) -> typing.Tuple[int, typing.Dict[int, int]]:
+        """
+        Returns the "type wide" permission (the one with object_id == None) and a dictionary
+        object_id -> max permission for the given object type
+        """
+        if objectType not in self._byType:
+            rootPerm = PERMISSION_NONE
+            perms: typing.Dict[int, int] = {}
+            for objectId, permission in models.Permissions.objects.filter(
+                Q(user=self._user) | Q(group__in=self._user.groups.all()),
+                object_type=objectType,
+            ).values_list('object_id', 'permission'):
+                if objectId is None:
+                    rootPerm = max(rootPerm, permission)
+                else:
+                    perms[objectId] = max(perms.get(objectId, PERMISSION_NONE), permission)
+            self._byType[objectType] = (rootPerm, perms)
+
+        return self._byType[objectType]
+
+    def getEffectivePermission(self, obj: 'Model', root: bool = False) -> int:
+        try:
+            if self._user.is_admin is True:
+                return PERMISSION_ALL
+
+            if self._user.staff_member is False:
+                return PERMISSION_NONE
+
+            rootPerm, perms = self._load(ot.getObjectType(obj))
+            if root is False:
+                return max(rootPerm, perms.get(obj.pk, PERMISSION_NONE))
+
+            return rootPerm
+        except Exception:
+            return PERMISSION_NONE
+
+    def checkPermissions(self, obj: 'Model', permission: int = PERMISSION_ALL, root: bool = False) -> bool:
+        return self.getEffectivePermission(obj, root) >= permission
+
+
 def addUserPermission(user: 'models.User', obj: 'Model', permission: int = PERMISSION_READ):
     # Some permissions added to some object types needs at least READ_PERMISSION on parent
     models.Permissions.addPermission(user=user, object_type=ot.getObjectType(obj), object_id=obj.pk, permission=permission)
@@ -74,6 +74,23 @@ def addCounter(obj: CounterClass, counterType: int, counterValue: int, stamp: ty
     return statsManager().addCounter(__transDict[type(obj)], obj.id, counterType, counterValue, stamp)
 
 
+def addCounters(counters: typing.Iterable[typing.Tuple[CounterClass, int, int]], stamp: typing.Optional[datetime.datetime] = None) -> bool:
+    """
+    Adds several counter stats at once, as (obj, counterType, counterValue) tuples, all of them with the same stamp.
+
+    Counters not supported by the type of its object are not inserted (and logged), as in addCounter
+    """
+    values = []
+    for obj, counterType, counterValue in counters:
+        type_ = type(obj)
+        if type_ not in __caWrite.get(counterType, ()):
+            logger.error('Type %s does not accepts counter of type %s', type_, counterValue)
+            continue
+        values.append((__transDict[type_], obj.id, counterType, counterValue))
+
+    return statsManager().addCounters(values, stamp)
+
+
 def getCounters(obj: CounterClass, counterType: int, **kwargs) -> typing.Generator[typing.Tuple[datetime.datetime, int], None, None]:
     """
     Get counters
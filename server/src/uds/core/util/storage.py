@@ -303,6 +303,27 @@ class Storage:
     ) -> typing.Optional[typing.Union[str, bytes]]:
         return self.readData(skey)
 
+    def getMany(
+        self, skeys: typing.Iterable[typing.Union[str, bytes]], fromPickle: bool = False
+    ) -> typing.Dict[typing.Union[str, bytes], typing.Optional[typing.Union[str, bytes]]]:
+        """
+        Same as readData, but for several keys at once (just one query for all of them)
+        Returns a dictionary with the requested keys, with None for the not found ones
+        """
+        keys = {self.getKey(skey): skey for skey in skeys}
+        result: typing.Dict[typing.Union[str, bytes], typing.Optional[typing.Union[str, bytes]]] = {
+            skey: None for skey in keys.values()
+        }
+        for c in DBStorage.objects.filter(pk__in=list(keys.keys())):  # @UndefinedVariable
+            val = codecs.decode(c.data.encode(), 'base64')
+            if not fromPickle:
+                try:
+                    val = val.decode('utf-8')  # Tries to encode in utf-8
+                except Exception:
+                    pass
+            result[keys[c.key]] = val
+        return result
+
     def getPickle(self, skey: typing.Union[str, bytes]) -> typing.Any:
         v = self.readData(skey, True)
         if v:
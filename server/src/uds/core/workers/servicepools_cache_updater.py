@@ -29,20 +29,34 @@
 """
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import datetime
+import functools
 import logging
 import typing
+from concurrent import futures
 
-from django.db import transaction
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import Q, Count
 from uds.core.util.config import GlobalConfig
 from uds.core.util.state import State
 from uds.core.managers import userServiceManager
 from uds.core.services.exceptions import MaxServicesReachedError
-from uds.models import ServicePool, ServicePoolPublication, UserService
+from uds.models import (
+    ServicePool,
+    ServicePoolPublication,
+    UserService,
+    StatsEvents,
+    getSqlDatetime,
+    getSqlDatetimeAsUnix,
+)
 from uds.core import services
 from uds.core.util import log
+from uds.core.util.stats import events
 from uds.core.jobs import Job
 
+if typing.TYPE_CHECKING:
+    from django.db import models
+
 logger = logging.getLogger(__name__)
 
 
@@ -60,6 +74,14 @@ class ServiceCacheUpdater(Job):
     )  # Request run cache manager every configured seconds (defaults to 20 seconds).
     friendly_name = 'Service Cache Updater'
 
+    # Max number of threads used to create new cache elements on every run
+    GROWTH_WORKERS = 8
+    # Cache prediction: weeks of history used, and seconds ahead forecasted
+    PREDICTION_WEEKS = 4
+    PREDICTION_WINDOW = 3600
+
+    _predictedDemand: typing.Dict[int, int] = {}
+
     @staticmethod
     def calcProportion(max_, actual) -> int:
         return actual * 10000 // (max_ or 1)
@@ -74,31 +96,133 @@ class ServiceCacheUpdater(Job):
         )
         logger.info('%s is restrained, will check this later', servicePool.name)
 
+    @staticmethod
+    def __countBy(
+        queryset: 'models.QuerySet', *fields: str
+    ) -> typing.Dict[typing.Any, int]:
+        """
+        Counts, using just one grouped query, the elements of queryset by the values of fields
+        """
+        return {
+            tuple(v[f] for f in fields) if len(fields) > 1 else v[fields[0]]: v['count']
+            for v in queryset.values(*fields).annotate(count=Count('id')).order_by()
+        }
+
+    def predictedCacheDemand(
+        self, servicePools: typing.Iterable[ServicePool]
+    ) -> typing.Dict[int, int]:
+        """
+        Forecasts, for every pool, the number of cache elements that will be requested in the next
+        PREDICTION_WINDOW seconds, as the average of the cache hits and misses of the same window
+        (same weekday and hour) of the previous PREDICTION_WEEKS weeks
+        """
+        now = getSqlDatetimeAsUnix()
+        week = 7 * 24 * 3600
+        windows = Q()
+        for n in range(1, ServiceCacheUpdater.PREDICTION_WEEKS + 1):
+            windows |= Q(
+                stamp__gte=now - n * week,
+                stamp__lt=now - n * week + ServiceCacheUpdater.PREDICTION_WINDOW,
+            )
+        demand = self.__countBy(
+            StatsEvents.objects.filter(
+                windows,
+                owner_type=events.OT_DEPLOYED,
+                owner_id__in=[servicePool.id for servicePool in servicePools],
+                event_type__in=(events.ET_CACHE_HIT, events.ET_CACHE_MISS),
+            ),
+            'owner_id',
+        )
+        return {
+            poolId: -(-count // ServiceCacheUpdater.PREDICTION_WEEKS)  # Ceil
+            for poolId, count in demand.items()
+        }
+
+    def cacheL1Target(self, servicePool: ServicePool) -> int:
+        """
+        Returns the L1 cache size to keep for this pool. This is cache_l1_srvs, unless cache prediction
+        is enabled and more demand is expected (up to cachePredictionMax more elements)
+        """
+        predicted = self._predictedDemand.get(servicePool.id, 0)
+        if predicted <= servicePool.cache_l1_srvs:
+            return servicePool.cache_l1_srvs
+        return min(
+            predicted,
+            servicePool.cache_l1_srvs + GlobalConfig.CACHE_PREDICTION_MAX.getInt(),
+        )
+
     def servicesPoolsNeedingCacheUpdate(
         self,
     ) -> typing.List[typing.Tuple[ServicePool, int, int, int]]:
         # State filter for cached and inAssigned objects
         # First we get all deployed services that could need cache generation
         # We start filtering out the deployed services that do not need caching at all.
-        servicePoolsNeedingCaching: typing.Iterable[ServicePool] = (
+        servicePoolsNeedingCaching: typing.List[ServicePool] = list(
             ServicePool.objects.filter(Q(initial_srvs__gte=0) | Q(cache_l1_srvs__gte=0))
             .filter(
                 max_srvs__gt=0,
                 state=State.ACTIVE,
                 service__provider__maintenance_mode=False,
             )
-            .iterator()
+            .select_related('service__provider')
+        )
+
+        self._predictedDemand = (
+            self.predictedCacheDemand(servicePoolsNeedingCaching)
+            if GlobalConfig.CACHE_PREDICTION.getBool()
+            else {}
         )
 
+        # Snapshot of the state of all pools, using grouped queries instead of several counts per pool
+        poolIds = [servicePool.id for servicePool in servicePoolsNeedingCaching]
+        userServices = UserService.objects.filter(deployed_service_id__in=poolIds)
+        # (pool, cache level) -> count. Includes L2 cache & assigned
+        inCache = self.__countBy(
+            userServices.filter(userServiceManager().getStateFilter()),
+            'deployed_service_id',
+            'cache_level',
+        )
+        # L1 cache must not include user services marked to be destroyed after use
+        inCacheL1ByPool = self.__countBy(
+            userServices.filter(
+                userServiceManager().getCacheStateFilter(
+                    services.UserDeployment.L1_CACHE
+                )
+            ).exclude(Q(properties__name='destroy_after') & Q(properties__value='y')),
+            'deployed_service_id',
+        )
+        # (pool, publication state) -> count
+        publications = self.__countBy(
+            ServicePoolPublication.objects.filter(
+                deployed_service_id__in=poolIds,
+                state__in=(State.USABLE, State.PREPARING),
+            ),
+            'deployed_service_id',
+            'state',
+        )
+        # pool -> recent errors, as in ServicePool.isRestrained
+        errors: typing.Dict[typing.Any, int] = {}
+        if GlobalConfig.RESTRAINT_TIME.getInt() > 0:
+            errors = self.__countBy(
+                userServices.filter(
+                    state=State.ERROR,
+                    state_date__gt=getSqlDatetime()
+                    - datetime.timedelta(seconds=GlobalConfig.RESTRAINT_TIME.getInt()),
+                ),
+                'deployed_service_id',
+            )
+        restraintCount = GlobalConfig.RESTRAINT_COUNT.getInt()
+        # provider -> can initiate new services. Nothing is started while deciding, so it's the same for all its pools
+        canInitiate: typing.Dict[int, bool] = {}
+
         # We will get the one that proportionally needs more cache
         servicesPools: typing.List[typing.Tuple[ServicePool, int, int, int]] = []
         for servicePool in servicePoolsNeedingCaching:
-            servicePool.userServices.update()  # Cleans cached queries
             # If this deployedService don't have a publication active and needs it, ignore it
             spServiceInstance = servicePool.service.getInstance()
 
             if (
-                servicePool.activePublication() is None
+                not publications.get((servicePool.id, State.USABLE))
                 and spServiceInstance.publicationType is not None
             ):
                 logger.debug(
@@ -107,14 +231,14 @@ class ServiceCacheUpdater(Job):
                 )
                 continue
             # If it has any running publication, do not generate cache anymore
-            if servicePool.publications.filter(state=State.PREPARING).count() > 0:
+            if publications.get((servicePool.id, State.PREPARING), 0) > 0:
                 logger.debug(
                     'Skipping cache generation for service pool with publication running: %s',
                     servicePool.name,
                 )
                 continue
 
-            if servicePool.isRestrained():
+            if errors.get(servicePool.id, 0) >= restraintCount:
                 logger.debug(
                     'StopSkippingped cache generation for restrained service pool: %s',
                     servicePool.name,
@@ -123,30 +247,11 @@ class ServiceCacheUpdater(Job):
                 continue
 
             # Get data related to actual state of cache
-            inCacheL1: int = (
-                servicePool.cachedUserServices()
-                .filter(
-                    userServiceManager().getCacheStateFilter(
-                        services.UserDeployment.L1_CACHE
-                    )
-                )
-                .exclude(Q(properties__name='destroy_after') & Q(properties__value='y'))
-                .count()
-            )
-            inCacheL2: int = (
-                servicePool.cachedUserServices()
-                .filter(
-                    userServiceManager().getCacheStateFilter(
-                        services.UserDeployment.L2_CACHE
-                    )
-                )
-                .count()
-            )
-            inAssigned: int = (
-                servicePool.assignedUserServices()
-                .filter(userServiceManager().getStateFilter())
-                .count()
+            inCacheL1: int = inCacheL1ByPool.get(servicePool.id, 0)
+            inCacheL2: int = inCache.get(
+                (servicePool.id, services.UserDeployment.L2_CACHE), 0
             )
+            inAssigned: int = inCache.get((servicePool.id, 0), 0)
             # if we bypasses max cache, we will reduce it in first place. This is so because this will free resources on service provider
             logger.debug(
                 "Examining %s with %s in cache L1 and %s in cache L2, %s inAssigned",
@@ -165,7 +270,7 @@ class ServiceCacheUpdater(Job):
             # We have more in L1 cache than needed
             if (
                 totalL1Assigned > servicePool.initial_srvs
-                and inCacheL1 > servicePool.cache_l1_srvs
+                and inCacheL1 > self.cacheL1Target(servicePool)
             ):
                 logger.debug(
                     'We have more services in cache L1 than configured, appending'
@@ -183,10 +288,10 @@ class ServiceCacheUpdater(Job):
                 continue
 
             # If this service don't allows more starting user services, continue
-            if (
-                userServiceManager().canInitiateServiceFromDeployedService(servicePool)
-                is False
-            ):
+            providerId = servicePool.service.provider_id
+            if providerId not in canInitiate:
+                canInitiate[providerId] = userServiceManager().canInitiateServiceFromDeployedService(servicePool)
+            if canInitiate[providerId] is False:
                 logger.debug(
                     'This provider has the max allowed starting services running: %s',
                     servicePool,
@@ -207,7 +312,7 @@ class ServiceCacheUpdater(Job):
 
             if (
                 totalL1Assigned < servicePool.initial_srvs
-                or inCacheL1 < servicePool.cache_l1_srvs
+                or inCacheL1 < self.cacheL1Target(servicePool)
             ):
                 logger.debug('Needs to grow L1 cache for %s', servicePool)
                 servicesPools.append((servicePool, inCacheL1, inCacheL2, inAssigned))
@@ -360,10 +465,92 @@ class ServiceCacheUpdater(Job):
             cache = cacheItems[0]
             cache.removeOrCancel()
 
+    def growthSteps(
+        self,
+        servicePool: ServicePool,
+        cacheL1: int,
+        cacheL2: int,
+        assigned: int,
+        providerSlots: typing.Dict[int, int],
+    ) -> typing.Tuple[int, int]:
+        """
+        Returns how many L1 and L2 cache elements should be created for this pool on this run,
+        reserving the needed preparing slots of its provider (providerSlots is updated)
+        """
+        totalL1Assigned = cacheL1 + assigned
+        l1 = max(
+            servicePool.initial_srvs - totalL1Assigned,
+            self.cacheL1Target(servicePool) - cacheL1,
+        )
+        l1 = max(0, min(l1, servicePool.max_srvs - totalL1Assigned))
+        l2 = 0 if l1 else max(0, servicePool.cache_l2_srvs - cacheL2)
+        maxSteps = max(1, GlobalConfig.CACHE_GROWTH_STEPS.getInt())
+        steps = min(
+            l1 or l2,
+            maxSteps,
+            # Providers ignoring limits are not in providerSlots
+            providerSlots.get(servicePool.service.provider_id, maxSteps),
+        )
+        if servicePool.service.provider_id in providerSlots:
+            providerSlots[servicePool.service.provider_id] -= steps
+        return (steps, 0) if l1 else (0, steps)
+
+    def providerSlots(
+        self, servicePools: typing.Iterable[ServicePool]
+    ) -> typing.Dict[int, int]:
+        """
+        Returns the number of services that can still be prepared by every provider of the pools
+        (providers that ignore limits are not included)
+        """
+        maxPreparing: typing.Dict[int, int] = {}
+        for servicePool in servicePools:
+            provider = servicePool.service.getInstance().parent()
+            if provider.getIgnoreLimits() is False:
+                maxPreparing[servicePool.service.provider_id] = provider.getMaxPreparingServices()
+
+        preparing = self.__countBy(
+            UserService.objects.filter(
+                deployed_service__service__provider_id__in=list(maxPreparing.keys()),
+                state=State.PREPARING,
+            ),
+            'deployed_service__service__provider_id',
+        )
+        return {
+            providerId: max(0, value - preparing.get(providerId, 0))
+            for providerId, value in maxPreparing.items()
+        }
+
+    @staticmethod
+    def runConcurrently(actions: typing.List[typing.Callable[[], None]]) -> None:
+        """
+        Runs the actions (user services creation) concurrently, so slow providers calls are overlapped
+        """
+
+        def execute(action: typing.Callable[[], None]) -> None:
+            try:
+                action()
+            except Exception:
+                logger.exception('Creating cache element')
+            finally:
+                connection.close()  # Threads must release their own database connection
+
+        if len(actions) == 1:  # No need of threads
+            actions[0]()
+            return
+
+        with futures.ThreadPoolExecutor(
+            max_workers=min(len(actions), ServiceCacheUpdater.GROWTH_WORKERS)
+        ) as executor:
+            for action in actions:
+                executor.submit(execute, action)
+
     def run(self):
         logger.debug('Starting cache checking')
         # We need to get
         servicesThatNeedsUpdate = self.servicesPoolsNeedingCacheUpdate()
+        providerSlots = self.providerSlots(v[0] for v in servicesThatNeedsUpdate)
+        # Creations of new cache elements, that will be done at once
+        creations: typing.List[typing.Callable[[], None]] = []
         for servicePool, cacheL1, cacheL2, assigned in servicesThatNeedsUpdate:
             # We have cache to update??
             logger.debug("Updating cache for %s", servicePool)
@@ -379,19 +566,34 @@ class ServiceCacheUpdater(Job):
                 self.reduceL1Cache(servicePool, cacheL1, cacheL2, assigned)
             elif (
                 totalL1Assigned > servicePool.initial_srvs
-                and cacheL1 > servicePool.cache_l1_srvs
+                and cacheL1 > self.cacheL1Target(servicePool)
             ):
                 self.reduceL1Cache(servicePool, cacheL1, cacheL2, assigned)
             elif cacheL2 > servicePool.cache_l2_srvs:  # We have excesives L2 items
                 self.reduceL2Cache(servicePool, cacheL1, cacheL2, assigned)
             elif totalL1Assigned < servicePool.max_srvs and (
                 totalL1Assigned < servicePool.initial_srvs
-                or cacheL1 < servicePool.cache_l1_srvs
+                or cacheL1 < self.cacheL1Target(servicePool)
             ):  # We need more services
-                self.growL1Cache(servicePool, cacheL1, cacheL2, assigned)
+                l1, _ = self.growthSteps(servicePool, cacheL1, cacheL2, assigned, providerSlots)
+                # Elements moved from L2 cache are not created, so they are moved right now
+                moved = min(l1, cacheL2)
+                for _ in range(moved):
+                    self.growL1Cache(servicePool, cacheL1, cacheL2, assigned)
+                    cacheL1, cacheL2 = cacheL1 + 1, cacheL2 - 1
+                creations += [
+                    functools.partial(self.growL1Cache, servicePool, cacheL1, 0, assigned)
+                ] * (l1 - moved)
             elif cacheL2 < servicePool.cache_l2_srvs:  # We need more L2 items
-                self.growL2Cache(servicePool, cacheL1, cacheL2, assigned)
+                _, l2 = self.growthSteps(servicePool, cacheL1, cacheL2, assigned, providerSlots)
+                creations += [
+                    functools.partial(self.growL2Cache, servicePool, cacheL1, cacheL2, assigned)
+                ] * l2
             else:
                 logger.warning(
                     "We have more services than max requested for %s", servicePool.name
                 )
+
+        if creations:
+            logger.debug('Creating %s new cache elements', len(creations))
+            self.runConcurrently(creations)
@@ -32,7 +32,9 @@
 import logging
 import typing
 
-from uds.models import ServicePool, Authenticator
+from django.db.models import Count, Q
+
+from uds.models import ServicePool, Authenticator, User, UserService
 from uds.core.util.state import State
 from uds.core.util.stats import counters
 from uds.core.managers import statsManager
@@ -53,41 +55,80 @@ class DeployedServiceStatsCollector(Job):
     def run(self):
         logger.debug('Starting Deployed service stats collector')
 
-        servicePoolsToCheck: typing.Iterable[ServicePool] = ServicePool.objects.filter(
-            state=State.ACTIVE
-        ).iterator()
-        for servicePool in servicePoolsToCheck:
-            try:
-                fltr = servicePool.assignedUserServices().exclude(
-                    state__in=State.INFO_STATES
+        values: typing.List[typing.Tuple[typing.Any, int, int]] = []
+
+        servicePools: typing.List[ServicePool] = list(
+            ServicePool.objects.filter(state=State.ACTIVE)
+        )
+        try:
+            # Assigned & in use user services of all pools, counted at once
+            poolCounters = {
+                v['deployed_service_id']: v
+                for v in UserService.objects.filter(
+                    deployed_service__state=State.ACTIVE, cache_level=0
                 )
-                assigned = fltr.count()
-                inUse = fltr.filter(in_use=True).count()
-                counters.addCounter(servicePool, counters.CT_ASSIGNED, assigned)
-                counters.addCounter(servicePool, counters.CT_INUSE, inUse)
-            except Exception:
-                logger.exception(
-                    'Getting counters for service pool %s', servicePool.name
+                .exclude(state__in=State.INFO_STATES)
+                .values('deployed_service_id')
+                .annotate(
+                    assigned=Count('id'), inUse=Count('id', filter=Q(in_use=True))
                 )
-
-        for auth in Authenticator.objects.all():
-            fltr = auth.users.filter(userServices__isnull=False).exclude(
-                userServices__state__in=State.INFO_STATES
-            )
-            users = auth.users.all().count()
-            users_with_service = fltr.distinct().count()
-            number_assigned_services = fltr.count()
-            counters.addCounter(auth, counters.CT_AUTH_USERS, users)
-            counters.addCounter(
-                auth, counters.CT_AUTH_SERVICES, number_assigned_services
-            )
-            counters.addCounter(
-                auth, counters.CT_AUTH_USERS_WITH_SERVICES, users_with_service
+                .order_by()
+            }
+            for servicePool in servicePools:
+                v = poolCounters.get(servicePool.id, {})
+                values.append((servicePool, counters.CT_ASSIGNED, v.get('assigned', 0)))
+                values.append((servicePool, counters.CT_INUSE, v.get('inUse', 0)))
+        except Exception:
+            logger.exception('Getting counters for service pools')
+
+        authenticators: typing.List[Authenticator] = list(Authenticator.objects.all())
+        users = {
+            v['manager_id']: v['count']
+            for v in User.objects.values('manager_id')
+            .annotate(count=Count('id'))
+            .order_by()
+        }
+        # Users with services, and number of services assigned, of all authenticators at once
+        withServices = {
+            v['manager_id']: v
+            for v in User.objects.filter(userServices__isnull=False)
+            .exclude(userServices__state__in=State.INFO_STATES)
+            .values('manager_id')
+            .annotate(services=Count('id'), users=Count('id', distinct=True))
+            .order_by()
+        }
+        for auth in authenticators:
+            v = withServices.get(auth.id, {})
+            values.append((auth, counters.CT_AUTH_USERS, users.get(auth.id, 0)))
+            values.append((auth, counters.CT_AUTH_SERVICES, v.get('services', 0)))
+            values.append(
+                (auth, counters.CT_AUTH_USERS_WITH_SERVICES, v.get('users', 0))
             )
 
+        counters.addCounters(values)
+
         logger.debug('Done Deployed service stats collector')
 
 
+class StatsAccumulator(Job):
+    """
+    This Job is responsible of rolling up the stats counters into the hourly and daily
+    accumulated counters, used for long range stats queries
+    """
+
+    frecuency = 1801  # Twice every hour, 1801 is prime
+    friendly_name = 'Statistic accumulator'
+
+    def run(self):
+        logger.debug('Starting statistics accumulation')
+        try:
+            statsManager().accumulateCounters()
+        except Exception:
+            logger.exception('Accumulating counters')
+
+        logger.debug('Done statistics accumulation')
+
+
 class StatsCleaner(Job):
     """
     This Job is responsible of housekeeping of stats tables.
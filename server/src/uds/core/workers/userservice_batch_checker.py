@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+@author: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import logging
+import typing
+
+from uds.core import services
+from uds.core.util.state import State
+from uds.core.jobs import Job
+from uds.core.managers.userservice.opchecker import UserServiceOpChecker, USERSERVICE_TAG
+from uds.models import UserService, DelayedTask
+
+logger = logging.getLogger(__name__)
+
+
+class UserServiceBatchChecker(Job):
+    """
+    Checks the state of the user services with an operation in progress of the providers
+    that support batched state checks, all user services of a provider at once
+    """
+
+    frecuency = 13
+    friendly_name = 'User Services batched state checker'
+
+    def run(self) -> None:
+        # Only providers whose type supports batched checks, nothing to do (nor to query) if none does
+        # (factory keys are lowercased, data_type is stored as the type declares it)
+        batchTypes = [
+            type_.type()
+            for type_ in services.factory().providers().values()
+            if type_.batchStateChecks
+        ]
+        if not batchTypes:
+            return
+
+        inProgress = UserService.objects.filter(
+            state__in=(State.PREPARING, State.REMOVING, State.CANCELING),
+            deployed_service__service__provider__maintenance_mode=False,
+            deployed_service__service__provider__data_type__in=batchTypes,
+        ).select_related(
+            # Everything needed to instantiate user services (including its publication) without further queries
+            'deployed_service__service__provider',
+            'deployed_service__osmanager',
+            'publication__deployed_service__service__provider',
+            'publication__deployed_service__osmanager',
+        )
+
+        # Group user services by provider
+        byProvider: typing.Dict[int, typing.List[UserService]] = {}
+        for userService in inProgress:
+            byProvider.setdefault(userService.deployed_service.service.provider_id, []).append(userService)
+
+        for userServices in byProvider.values():
+            provider = userServices[0].deployed_service.service.provider
+            try:
+                providerInstance = provider.getInstance()
+                if not providerInstance.batchStateChecks:
+                    continue
+                # User services with a pending op checker task (i.e. from before enabling batch checks) are checked by it
+                pending = set(
+                    DelayedTask.objects.filter(
+                        tag__in=[USERSERVICE_TAG + userService.uuid for userService in userServices]
+                    ).values_list('tag', flat=True)
+                )
+                userServices = [us for us in userServices if USERSERVICE_TAG + us.uuid not in pending]
+                if not userServices:
+                    continue
+
+                instances = [userService.getInstance() for userService in userServices]
+                states = providerInstance.checkStates(instances)
+            except Exception:
+                logger.exception('Checking states of user services of provider %s', provider.name)
+                continue
+
+            logger.debug('Checked %s user services of provider %s', len(userServices), provider.name)
+            for userService, instance, state in zip(userServices, instances, states):
+                UserServiceOpChecker.checkAndUpdateState(userService, instance, state)
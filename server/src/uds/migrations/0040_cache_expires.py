@@ -0,0 +1,29 @@
+# Generated by Django 3.1.2 on 2026-10-18 19:30
+
+import datetime
+
+from django.db import migrations, models
+
+
+def removeCached(apps, schema_editor) -> None:
+    # Cached values are disposable, and existing rows do not have a valid "expires", so simply remove them
+    apps.get_model('uds', 'Cache').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uds', '0039_auto_20201111_1329'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cache',
+            name='expires',
+            field=models.DateTimeField(db_index=True, default=datetime.datetime(1972, 7, 1, 0, 0)),
+        ),
+        migrations.RunPython(
+            removeCached,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.1.2 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uds', '0040_cache_expires'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsCountersAccum',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner_id', models.IntegerField(default=0)),
+                ('owner_type', models.SmallIntegerField(default=0)),
+                ('counter_type', models.SmallIntegerField(default=0)),
+                ('interval_type', models.IntegerField(default=3600)),
+                ('stamp', models.IntegerField(default=0)),
+                ('v_count', models.IntegerField(default=0)),
+                ('v_sum', models.BigIntegerField(default=0)),
+                ('v_max', models.IntegerField(default=0)),
+                ('v_min', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'uds_stats_c_accum',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='statscountersaccum',
+            index=models.Index(fields=['interval_type', 'stamp'], name='uds_stats_c_interva_4d0ea0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statscountersaccum',
+            index=models.Index(fields=['interval_type', 'owner_type', 'counter_type', 'stamp'], name='uds_stats_c_interva_616a0d_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.1.2 on 2026-10-18 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uds', '0041_stats_counters_accum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheInvalidation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(default='', max_length=128)),
+                ('key', models.CharField(default='', max_length=64)),
+                ('stamp', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'uds_utility_cache_inv',
+            },
+        ),
+    ]
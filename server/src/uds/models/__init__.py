@@ -72,10 +72,12 @@ from .log import Log
 # Stats
 from .stats_counters import StatsCounters
 from .stats_events import StatsEvents
+from .stats_counters_accum import StatsCountersAccum
 
 # General utility models, such as a database cache (for caching remote content of slow connections to external services providers for example)
 # We could use django cache (and maybe we do it in a near future), but we need to clean up things when objecs owning them are deleted
 from .cache import Cache
+from .cache_invalidation import CacheInvalidation
 from .config import Config
 from .storage import Storage
 from .unique_id import UniqueId
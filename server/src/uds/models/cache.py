@@ -32,10 +32,11 @@
 """
 from datetime import timedelta
 import logging
+import typing
 
 from django.db import models, transaction
 
-from .util import getSqlDatetime
+from .util import getSqlDatetime, NEVER
 
 
 logger = logging.getLogger(__name__)
@@ -53,6 +54,12 @@ class Cache(models.Model):
         models.DateTimeField()
     )  # Date creation or validation of this entry. Set at write time
     validity = models.IntegerField(default=60)  # Validity of this entry, in seconds
+    expires = models.DateTimeField(
+        default=NEVER, db_index=True
+    )  # created + validity, so expired entries can be located using the index
+
+    # Max number of rows removed by each delete on cleanUp, to keep lock times low
+    CLEANUP_CHUNK_SIZE = 1000
 
     # "fake" relations declarations for type checking
     objects: 'models.BaseManager[Cache]'
@@ -71,13 +78,33 @@ class Cache(models.Model):
         Purges the cache items that are no longer vaild.
         """
         now = getSqlDatetime()
-        with transaction.atomic():
-            for v in Cache.objects.all():
-                if now > v.created + timedelta(seconds=v.validity):
-                    v.delete()
+        while True:
+            with transaction.atomic():
+                keys = list(
+                    Cache.objects.filter(expires__lt=now).values_list('key', flat=True)[: Cache.CLEANUP_CHUNK_SIZE]
+                )
+                if keys:
+                    Cache.objects.filter(key__in=keys).delete()
+            if len(keys) < Cache.CLEANUP_CHUNK_SIZE:
+                break
+
+    def save(
+        self,
+        force_insert: bool = False,
+        force_update: bool = False,
+        using: bool = None,
+        update_fields: typing.Optional[typing.Iterable[str]] = None,
+    ):
+        """
+        Keeps expires in sync with created & validity
+        """
+        self.expires = self.created + timedelta(seconds=self.validity)
+        if update_fields is not None:
+            update_fields = set(update_fields) | {'expires'}
+        return super().save(force_insert, force_update, using, update_fields)
 
     def __str__(self):
-        if getSqlDatetime() > (self.created + timedelta(seconds=self.validity)):
+        if getSqlDatetime() > self.expires:
             expired = "Expired"
         else:
             expired = "Active"
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+.. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+from datetime import timedelta
+import logging
+import typing
+
+from django.db import models
+
+from .util import getSqlDatetime
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidation(models.Model):
+    """
+    Log of changed cache keys, used to keep the in process tier of uds.core.util.cache.Cache of every server coherent.
+
+    Every change of a cached key (or of a whole owner, or of all the cache) adds a row, and every server
+    reads the rows added since its last check, discarding just the local entries affected
+    """
+
+    # Key that invalidates every key of the owner, or every cached value if owner is also ALL
+    ALL = ''
+    # Rows are kept this time, so servers not checking for longer than this discard all its local entries
+    KEEP_TIME = 3600
+
+    owner = models.CharField(max_length=128, default=ALL)
+    key = models.CharField(max_length=64, default=ALL)
+    stamp = models.DateTimeField(db_index=True)
+
+    # "fake" declarations for type checking
+    objects: 'models.BaseManager[CacheInvalidation]'
+
+    class Meta:
+        """
+        Meta class to declare the name of the table at database
+        """
+
+        db_table = 'uds_utility_cache_inv'
+        app_label = 'uds'
+
+    @staticmethod
+    def add(owner: str, keys: typing.Iterable[str]) -> None:
+        """
+        Logs the change of keys of owner (ALL as key for all keys of the owner)
+        """
+        now = getSqlDatetime()
+        CacheInvalidation.objects.bulk_create(
+            [CacheInvalidation(owner=owner, key=key, stamp=now) for key in keys]
+        )
+
+    @staticmethod
+    def since(stamp: typing.Any) -> typing.List[typing.Tuple[str, str]]:
+        """
+        Returns the (owner, key) of changes logged since stamp
+        """
+        return list(CacheInvalidation.objects.filter(stamp__gte=stamp).values_list('owner', 'key'))
+
+    @staticmethod
+    def cleanUp() -> None:
+        CacheInvalidation.objects.filter(
+            stamp__lt=getSqlDatetime() - timedelta(seconds=CacheInvalidation.KEEP_TIME)
+        ).delete()
+
+    def __str__(self):
+        return 'Invalidation of {} {} at {}'.format(self.owner, self.key, self.stamp)
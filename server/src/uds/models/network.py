@@ -30,6 +30,10 @@
 """
 .. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import bisect
+import threading
+import time
+import uuid
 import logging
 import typing
 
@@ -41,10 +45,139 @@ from .transport import Transport
 from .uuid_model import UUIDModel
 from .tag import TaggingMixin
 
+if typing.TYPE_CHECKING:
+    from uds.core.util.cache import Cache
+
 
 logger = logging.getLogger(__name__)
 
 
+class _IndexData(typing.NamedTuple):
+    # ip version -> sorted range starts, and the networks of each range
+    bounds: typing.Dict[int, typing.List[int]]
+    networks: typing.Dict[int, typing.List[typing.FrozenSet[int]]]
+    # transport id -> networks of the transport
+    transports: typing.Dict[int, typing.FrozenSet[int]]
+
+
+class _NetworksIndex:
+    """
+    In memory index of all networks, so ip lookups do not need database access.
+
+    For every ip version, networks are converted to sorted disjoint ranges (delimited by "bounds"),
+    each one with the set of networks that contains it, so a lookup is just a bisect.
+    The index is rebuilt only when networks or transports change, using a version
+    stored in cache (checked at most every CHECK_INTERVAL seconds)
+    """
+
+    CHECK_INTERVAL: typing.ClassVar[float] = 2
+    _instance: typing.ClassVar[typing.Optional['_NetworksIndex']] = None
+
+    _lock: threading.Lock
+    _cache: 'Cache'
+    _version: typing.Any
+    _checked: float
+    # Replaced as a whole on rebuilds, so readers (not locked) always see a consistent index
+    _data: _IndexData
+
+    def __init__(self):
+        from uds.core.util.cache import Cache  # pylint: disable=import-outside-toplevel
+
+        self._lock = threading.Lock()
+        self._cache = Cache('networksIndex')
+        self._version = None
+        self._checked = 0.0
+        self._data = _IndexData({}, {}, {})
+
+    @staticmethod
+    def index() -> '_NetworksIndex':
+        if not _NetworksIndex._instance:
+            _NetworksIndex._instance = _NetworksIndex()
+        return _NetworksIndex._instance
+
+    def invalidate(self) -> None:
+        self._cache.put('version', uuid.uuid4().hex, 365 * 24 * 3600)
+        self._checked = 0.0
+
+    def _check(self) -> None:
+        now = time.monotonic()
+        if now - self._checked < _NetworksIndex.CHECK_INTERVAL:
+            return
+        with self._lock:
+            if now - self._checked < _NetworksIndex.CHECK_INTERVAL:
+                return
+            version = self._cache.get('version')
+            if version is None:  # Never set (or purged from cache), current index is valid for a new one
+                version = uuid.uuid4().hex
+                self._cache.put('version', version, 365 * 24 * 3600)
+                if self._version is not None:
+                    self._version = version
+            if version != self._version:
+                self._data = self._build()
+                self._version = version
+            self._checked = now
+
+    def _build(self) -> _IndexData:
+        # ip version -> [(position, network id, True if network starts here)]
+        changes: typing.Dict[int, typing.List[typing.Tuple[int, int, bool]]] = {4: [], 6: []}
+        for netId, start, end, netString in Network.objects.values_list('id', 'net_start', 'net_end', 'net_string'):
+            ranges: typing.Iterable[typing.Tuple[int, int, int]] = ((4, start, end),)
+            # IPv6 ranges are not stored on database, and "*" also contains all IPv6 ips
+            if net.ipVersion(netString) == 6 or netString.replace(' ', '') == '*':
+                ranges = net.versionedNetworksFromString(netString)
+            for version, start, end in ranges:
+                changes[version].append((start, netId, True))
+                changes[version].append((end + 1, netId, False))
+
+        data = _IndexData({}, {}, {})
+        for version, versionChanges in changes.items():
+            bounds: typing.List[int] = []
+            networks: typing.List[typing.FrozenSet[int]] = []
+            active: typing.Set[int] = set()
+            versionChanges.sort()
+            for n, (position, netId, starts) in enumerate(versionChanges):
+                if starts:
+                    active.add(netId)
+                else:
+                    active.discard(netId)
+                if n + 1 == len(versionChanges) or versionChanges[n + 1][0] != position:
+                    bounds.append(position)
+                    networks.append(frozenset(active))
+            data.bounds[version] = bounds
+            data.networks[version] = networks
+
+        transports: typing.Dict[int, typing.Set[int]] = {}
+        for transportId, netId in Network.transports.through.objects.values_list('transport_id', 'network_id'):
+            transports.setdefault(transportId, set()).add(netId)
+        data.transports.update((k, frozenset(v)) for k, v in transports.items())
+        return data
+
+    def version(self) -> typing.Any:
+        """
+        Returns current version of the index, that changes when networks or transports change
+        """
+        self._check()
+        return self._version
+
+    def networksFor(self, ip: str) -> typing.FrozenSet[int]:
+        """
+        Returns the ids of the networks that contains this ip
+        """
+        self._check()
+        data = self._data
+        version = net.ipVersion(ip)
+        bounds = data.bounds.get(version, [])
+        pos = bisect.bisect_right(bounds, net.ipToLong(ip)) - 1
+        return data.networks[version][pos] if pos >= 0 else frozenset()
+
+    def transportNetworks(self, transportId: int) -> typing.FrozenSet[int]:
+        """
+        Returns the ids of the networks of a transport
+        """
+        self._check()
+        return self._data.transports.get(transportId, frozenset())
+
+
 class Network(UUIDModel, TaggingMixin):  # type: ignore
     """
     This model is used for keeping information of networks associated with transports (right now, just transports..)
@@ -72,10 +205,42 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
     @staticmethod
     def networksFor(ip: str) -> typing.Iterable['Network']:
         """
-        Returns the networks that are valid for specified ip in dotted quad (xxx.xxx.xxx.xxx)
+        Returns the networks that are valid for specified ip in dotted quad (xxx.xxx.xxx.xxx) or IPv6 format
+        """
+        return Network.objects.filter(id__in=_NetworksIndex.index().networksFor(ip))
+
+    @staticmethod
+    def idsFor(ip: str) -> typing.FrozenSet[int]:
+        """
+        Returns the ids of the networks that are valid for specified ip, without accessing database
         """
-        ipInt = net.ipToLong(ip)
-        return Network.objects.filter(net_start__lte=ipInt, net_end__gte=ipInt)
+        return _NetworksIndex.index().networksFor(ip)
+
+    @staticmethod
+    def idsForTransport(transportId: int) -> typing.FrozenSet[int]:
+        """
+        Returns the ids of the networks of the transport, without accessing database
+        """
+        return _NetworksIndex.index().transportNetworks(transportId)
+
+    @staticmethod
+    def indexVersion() -> typing.Any:
+        """
+        Returns a value that changes every time networks, transports or its relations change,
+        so data derived from them can be cached
+        """
+        return _NetworksIndex.index().version()
+
+    @staticmethod
+    def dbRange(netRange: str) -> typing.Tuple[int, int]:
+        """
+        Returns the net_start, net_end values stored for the network string.
+        IPv6 networks do not fit on them, so (-1, -1) is stored (they never match on database)
+        """
+        if net.ipVersion(netRange) == 6:
+            net.networkFromString(netRange)  # Raises ValueError if not valid
+            return -1, -1
+        return net.networkFromString(netRange)
 
     @staticmethod
     def create(name: str, netRange: str) -> 'Network':
@@ -87,7 +252,7 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
 
             netEnd: Network end
         """
-        nr = net.networkFromString(netRange)
+        nr = Network.dbRange(netRange)
         return Network.objects.create(
             name=name, net_start=nr[0], net_end=nr[1], net_string=netRange
         )
@@ -100,6 +265,8 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
         Returns:
             string representing the dotted quad of this network start
         """
+        if net.ipVersion(self.net_string) == 6:
+            return net.longToIp(net.networkFromString(self.net_string)[0], 6)
         return net.longToIp(self.net_start)
 
     @property
@@ -110,6 +277,8 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
         Returns:
             string representing the dotted quad of this network end
         """
+        if net.ipVersion(self.net_string) == 6:
+            return net.longToIp(net.networkFromString(self.net_string)[1], 6)
         return net.longToIp(self.net_end)
 
     def update(self, name: str, netRange: str):
@@ -124,7 +293,7 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
             netEnd: new Network end (quad dotted)
         """
         self.name = name
-        nr = net.networkFromString(netRange)
+        nr = Network.dbRange(netRange)
         self.net_start = nr[0]
         self.net_end = nr[1]
         self.net_string = netRange
@@ -134,8 +303,8 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
         return u'Network {} ({}) from {} to {}'.format(
             self.name,
             self.net_string,
-            net.longToIp(self.net_start),
-            net.longToIp(self.net_end),
+            self.netStart,
+            self.netEnd,
         )
 
     @staticmethod
@@ -149,6 +318,18 @@ class Network(UUIDModel, TaggingMixin):  # type: ignore
         # Clears related permissions
         clean(toDelete)
 
+    @staticmethod
+    def networksChanged(sender, **kwargs) -> None:
+        # Relations changes are notified before and after the change, only the later is needed
+        if kwargs.get('action', 'post_').startswith('post_'):
+            _NetworksIndex.index().invalidate()
+
 
 # Connects a pre deletion signal to Authenticator
 models.signals.pre_delete.connect(Network.beforeDelete, sender=Network)
+# Networks index (and data cached using its version) must be rebuilt when networks or transports change
+models.signals.post_save.connect(Network.networksChanged, sender=Network)
+models.signals.post_delete.connect(Network.networksChanged, sender=Network)
+models.signals.m2m_changed.connect(Network.networksChanged, sender=Network.transports.through)
+models.signals.post_save.connect(Network.networksChanged, sender=Transport)
+models.signals.post_delete.connect(Network.networksChanged, sender=Transport)
@@ -50,6 +50,7 @@ from .tag import TaggingMixin
 from .os_manager import OSManager
 from .service import Service
 from .transport import Transport
+from .network import Network
 from .group import Group
 from .image import Image
 from .service_pool_group import ServicePoolGroup
@@ -570,7 +571,6 @@ class ServicePool(UUIDModel, TaggingMixin):  #  type: ignore
             )
             .prefetch_related(
                 'transports',
-                'transports__networks',
                 'memberOfMeta',
                 'osmanager',
                 'publications',
@@ -722,3 +722,5 @@ class ServicePool(UUIDModel, TaggingMixin):  #  type: ignore
 
 # Connects a pre deletion signal to Authenticator
 models.signals.pre_delete.connect(ServicePool.beforeDelete, sender=ServicePool)
+# Transports of pools are cached using networks index version
+models.signals.m2m_changed.connect(Network.networksChanged, sender=ServicePool.transports.through)
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012-2020 Virtual Cable S.L.U.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without modification,
+# are permitted provided that the following conditions are met:
+#
+#    * Redistributions of source code must retain the above copyright notice,
+#      this list of conditions and the following disclaimer.
+#    * Redistributions in binary form must reproduce the above copyright notice,
+#      this list of conditions and the following disclaimer in the documentation
+#      and/or other materials provided with the distribution.
+#    * Neither the name of Virtual Cable S.L. nor the names of its contributors
+#      may be used to endorse or promote products derived from this software
+#      without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE
+# FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL
+# DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY,
+# OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+.. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
+"""
+import math
+import typing
+import types
+import logging
+
+from django.db import models, transaction
+from django.db.models import F, Q, Sum, Count, Max, Min
+from django.db.models.functions import Floor
+
+from .stats_counters import StatsCounters
+
+
+logger = logging.getLogger(__name__)
+
+
+def _bucket(interval: int) -> Floor:
+    """
+    Expression equivalent to CEIL(stamp/interval) (the grouping used by StatsCounters.get_grouped),
+    but using only integer arithmetic, so it behaves the same on every database
+    """
+    return Floor((F('stamp') + interval - 1) / interval)
+
+
+class StatsCountersAccum(models.Model):
+    """
+    Pre-aggregated (rolled up) statistics counters, by hour and by day.
+
+    Every row holds the count, sum, max and min of the StatsCounters values of an owner & counter type
+    for the interval ending at "stamp" (that is, raw counters with stamp in (stamp - interval_type, stamp])
+    """
+    HOUR = 3600
+    DAY = 86400
+    INTERVALS = (HOUR, DAY)
+
+    owner_id = models.IntegerField(default=0)
+    owner_type = models.SmallIntegerField(default=0)
+    counter_type = models.SmallIntegerField(default=0)
+    interval_type = models.IntegerField(default=HOUR)
+    stamp = models.IntegerField(default=0)
+    v_count = models.IntegerField(default=0)
+    v_sum = models.BigIntegerField(default=0)
+    v_max = models.IntegerField(default=0)
+    v_min = models.IntegerField(default=0)
+
+    # "fake" declarations for type checking
+    objects: 'models.BaseManager[StatsCountersAccum]'
+
+    class Meta:
+        """
+        Meta class to declare db table
+        """
+
+        db_table = 'uds_stats_c_accum'
+        app_label = 'uds'
+        indexes = [
+            models.Index(fields=['interval_type', 'stamp']),
+            models.Index(fields=['interval_type', 'owner_type', 'counter_type', 'stamp']),
+        ]
+
+    @staticmethod
+    def lastStamp(intervalType: int) -> int:
+        """
+        Returns the stamp of the last accumulated interval of this type (0 if none)
+        All raw counters with stamp <= this value are already accumulated
+        """
+        return StatsCountersAccum.objects.filter(interval_type=intervalType).aggregate(last=Max('stamp'))['last'] or 0
+
+    @staticmethod
+    def accumulate(intervalType: int, until: int, maxIntervals: int) -> int:
+        """
+        Accumulates counters for the intervals of type "intervalType" that have been completed before "until".
+        Hourly intervals are calculated from raw counters, daily ones from hourly ones.
+        At most "maxIntervals" intervals are processed (so first runs over big tables do not take too long)
+
+        Returns the number of accumulated rows created
+        """
+        if intervalType == StatsCountersAccum.HOUR:
+            source: 'models.QuerySet' = StatsCounters.objects.all()
+            aggregates = {'v_count': Count('id'), 'v_sum': Sum('value'), 'v_max': Max('value'), 'v_min': Min('value')}
+        else:
+            # Only from already accumulated hours
+            until = min(until, StatsCountersAccum.lastStamp(StatsCountersAccum.HOUR))
+            source = StatsCountersAccum.objects.filter(interval_type=StatsCountersAccum.HOUR)
+            aggregates = {'v_count': Sum('v_count'), 'v_sum': Sum('v_sum'), 'v_max': Max('v_max'), 'v_min': Min('v_min')}
+
+        # Only completed intervals
+        until = until // intervalType * intervalType
+        last = StatsCountersAccum.lastStamp(intervalType)
+        # Skip gaps without data
+        first = source.filter(stamp__gt=last, stamp__lte=until).aggregate(first=Min('stamp'))['first']
+        if first is None:
+            return 0
+        start = max(last, (first - 1) // intervalType * intervalType)
+        end = min(until, start + maxIntervals * intervalType)
+
+        rows = [
+            StatsCountersAccum(
+                owner_id=v['owner_id'],
+                owner_type=v['owner_type'],
+                counter_type=v['counter_type'],
+                interval_type=intervalType,
+                stamp=int(v['bucket']) * intervalType,
+                v_count=v['v_count'],
+                v_sum=v['v_sum'],
+                v_max=v['v_max'],
+                v_min=v['v_min'],
+            )
+            for v in source.filter(stamp__gt=start, stamp__lte=end)
+            .annotate(bucket=_bucket(intervalType))
+            .values('owner_id', 'owner_type', 'counter_type', 'bucket')
+            .annotate(**aggregates)
+            .order_by()
+        ]
+        with transaction.atomic():
+            StatsCountersAccum.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @staticmethod
+    def get_grouped(
+        interval_type: int, owner_type: typing.Union[int, typing.Iterable[int]], counter_type: int, **kwargs
+    ) -> typing.List[StatsCounters]:
+        """
+        Same as StatsCounters.get_grouped, but using the accumulated counters of "interval_type" (plus the raw counters
+        not accumulated yet). Intervals are never smaller than interval_type.
+
+        Returns a list of (not saved) StatsCounters, with the stamp and value of every interval
+        """
+        since = int(kwargs.get('since') or 0)
+        to = int(kwargs['to'])
+        interval = int(kwargs.get('interval') or '600')
+        max_intervals = kwargs.get('max_intervals')
+        limit = kwargs.get('limit')
+        use_max = kwargs.get('use_max', False)
+
+        fltr = Q(counter_type=counter_type)
+        if isinstance(owner_type, (list, tuple, types.GeneratorType)):
+            fltr &= Q(owner_type__in=list(owner_type))
+        else:
+            fltr &= Q(owner_type=owner_type)
+        owner_id = kwargs.get('owner_id')
+        if owner_id:
+            if isinstance(owner_id, (list, tuple, types.GeneratorType)):
+                fltr &= Q(owner_id__in=list(owner_id))
+            else:
+                fltr &= Q(owner_id=owner_id)
+
+        lastAccum = StatsCountersAccum.lastStamp(interval_type)
+        # Accumulated rows intersecting [since, to], and raw counters not accumulated yet
+        accum = StatsCountersAccum.objects.filter(
+            fltr, interval_type=interval_type, stamp__gt=since, stamp__lt=to + interval_type
+        )
+        raw = StatsCounters.objects.filter(fltr, stamp__gt=max(lastAccum, since - 1), stamp__lte=to)
+
+        if max_intervals:
+            max_intervals = int(max_intervals) if int(max_intervals) > 1 else 2
+            first = accum.aggregate(first=Min('stamp'))['first'] or raw.aggregate(first=Min('stamp'))['first']
+            lastRaw = raw.aggregate(last=Max('stamp'))['last']
+            last = lastRaw if lastRaw is not None else accum.aggregate(last=Max('stamp'))['last']
+            if first is not None and last is not None:
+                interval = max(interval, int((last - first) / (max_intervals - 1)))
+
+        interval = max(interval, interval_type)
+
+        # bucket -> [count, sum, max]
+        grouped: typing.Dict[int, typing.List[int]] = {}
+
+        def merge(bucket: int, count: int, sum_: int, max_: int) -> None:
+            v = grouped.setdefault(int(bucket), [0, 0, max_])
+            v[0] += count
+            v[1] += sum_
+            v[2] = max(v[2], max_)
+
+        for v in accum.annotate(bucket=_bucket(interval)).values('bucket').annotate(
+            count=Sum('v_count'), sum=Sum('v_sum'), max=Max('v_max')
+        ).order_by():
+            merge(v['bucket'], v['count'], v['sum'], v['max'])
+        for v in raw.annotate(bucket=_bucket(interval)).values('bucket').annotate(
+            count=Count('id'), sum=Sum('value'), max=Max('value')
+        ).order_by():
+            merge(v['bucket'], v['count'], v['sum'], v['max'])
+
+        result = [
+            StatsCounters(
+                id=-1, owner_id=-1, owner_type=-1, counter_type=-1, stamp=bucket * interval,
+                value=v[2] if use_max else math.ceil(v[1] / (v[0] or 1))
+            )
+            for bucket, v in sorted(grouped.items())
+        ]
+        if limit:
+            result = result[: int(limit)]
+        return result
+
+    def __str__(self):
+        return 'Accumulated counter of {}({}): {} - {} ({}s) - {}/{}/{}/{}'.format(
+            self.owner_type, self.owner_id, self.counter_type, self.stamp, self.interval_type,
+            self.v_count, self.v_sum, self.v_max, self.v_min
+        )
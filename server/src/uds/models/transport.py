@@ -37,7 +37,6 @@ from django.db import models
 
 from uds.core import transports
 
-from uds.core.util import net
 
 from .managed_object_model import ManagedObjectModel
 from .tag import TaggingMixin
@@ -119,14 +118,16 @@ class Transport(ManagedObjectModel, TaggingMixin):
 
         Raises:
 
-        :note: Ip addresses has been only tested with IPv4 addresses
+        :note: Networks are checked using an in memory index, so no database access is needed (usually)
         """
-        if self.networks.count() == 0:
+        from .network import Network  # pylint: disable=import-outside-toplevel
+
+        networks = Network.idsForTransport(self.id)
+        if not networks:
             return True
-        ip = net.ipToLong(ipStr)
         if self.nets_positive:
-            return self.networks.filter(net_start__lte=ip, net_end__gte=ip).count() > 0
-        return self.networks.filter(net_start__lte=ip, net_end__gte=ip).count() == 0
+            return bool(networks & Network.idsFor(ipStr))
+        return not networks & Network.idsFor(ipStr)
 
     def validForOs(self, os: str) -> bool:
         logger.debug('Checkin if os "%s" is in "%s"', os, self.allowed_oss)
@@ -30,10 +30,14 @@
 """
 .. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
 """
+import time
 import logging
+import threading
+import typing
 from time import mktime
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from django.conf import settings
 from django.db import models
 from django.db import connection
 
@@ -52,6 +56,105 @@ class UnsavedForeignKey(models.ForeignKey):
     # Allows pointing to an unsaved object
     allow_unsaved_instance_assignment = True
 
+def _queryDatetime() -> datetime:
+    """
+    Reads current date/time from database server
+    """
+    cursor = connection.cursor()
+    # NOW() on mysql is truncated to seconds, too coarse for measuring clock drift
+    sentence = 'SELECT NOW(6)' if connection.vendor == 'mysql' else 'SELECT CURRENT_TIMESTAMP'
+    cursor.execute(sentence)
+    return cursor.fetchone()[0]
+
+
+class DatabaseClock:
+    """
+    Keeps the offset between database server time and the local monotonic clock, so
+    database time can be obtained without a roundtrip to database.
+
+    Offset is measured again every "resync" seconds. If, on a resync, the estimated time differs
+    from the database one more than "maxDrift" seconds, resync interval is halved (and restored when back in bounds)
+    """
+    _resync: float
+    _maxDrift: float
+    _interval: float
+    _query: typing.Callable[[], datetime]
+    _monotonic: typing.Callable[[], float]
+    _lock: threading.Lock
+    _syncLock: threading.Lock  # Only one thread reads database time at a time, others use its result
+    _reference: typing.Optional[typing.Tuple[datetime, float]]  # database time, monotonic time of that database time
+
+    # to keep singleton DatabaseClock
+    _clock: typing.ClassVar[typing.Optional['DatabaseClock']] = None
+
+    def __init__(
+        self,
+        resync: float,
+        maxDrift: float,
+        query: typing.Callable[[], datetime] = _queryDatetime,
+        monotonic: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._resync = self._interval = resync
+        self._maxDrift = maxDrift
+        self._query = query
+        self._monotonic = monotonic
+        self._lock = threading.Lock()
+        self._syncLock = threading.Lock()
+        self._reference = None
+
+    @staticmethod
+    def clock() -> 'DatabaseClock':
+        """
+        Returns a singleton to the DatabaseClock, configured with DB_CLOCK_RESYNC and DB_CLOCK_MAX_DRIFT settings
+        """
+        if DatabaseClock._clock is None:
+            DatabaseClock._clock = DatabaseClock(
+                getattr(settings, 'DB_CLOCK_RESYNC', 60), getattr(settings, 'DB_CLOCK_MAX_DRIFT', 0.5)
+            )
+        return DatabaseClock._clock
+
+    def _sync(self) -> datetime:
+        start = self._monotonic()
+        dbNow = self._query()
+        end = self._monotonic()
+        # Database time is taken as the one at the middle of the roundtrip
+        at = (start + end) / 2
+
+        with self._lock:
+            if self._reference is not None:
+                drift = abs((self._estimate(self._reference, at) - dbNow).total_seconds())
+                if drift > self._maxDrift:
+                    logger.info('Database clock drifted %s seconds in %s seconds', drift, self._interval)
+                    self._interval = max(1.0, self._interval / 2)
+                else:
+                    self._interval = min(self._resync, self._interval * 2)
+            self._reference = (dbNow, at)
+        return dbNow
+
+    @staticmethod
+    def _estimate(reference: typing.Tuple[datetime, float], at: float) -> datetime:
+        return reference[0] + timedelta(seconds=at - reference[1])
+
+    def now(self) -> datetime:
+        if self._resync <= 0:  # Calibration disabled
+            return self._query()
+
+        at = self._monotonic()
+        with self._lock:
+            reference = self._reference
+            interval = self._interval
+        if reference is None or at - reference[1] >= interval:
+            with self._syncLock:
+                # Another thread may have resynced while we waited for the lock
+                at = self._monotonic()
+                with self._lock:
+                    reference = self._reference
+                    interval = self._interval
+                if reference is None or at - reference[1] >= interval:
+                    return self._sync()
+        return self._estimate(reference, at)
+
+
 def getSqlDatetime() -> datetime:
     """
     Returns the current date/time of the database server.
@@ -61,12 +164,12 @@ def getSqlDatetime() -> datetime:
     We support get database datetime for:
       * mysql
       * sqlite
+
+    Database time is not read on every call, but estimated from the local monotonic clock
+    (see DatabaseClock, DB_CLOCK_RESYNC and DB_CLOCK_MAX_DRIFT settings)
     """
     if connection.vendor in ('mysql', 'microsoft'):
-        cursor = connection.cursor()
-        sentence = 'SELECT NOW()' if connection.vendor == 'mysql' else 'SELECT CURRENT_TIMESTAMP'
-        cursor.execute(sentence)
-        date = cursor.fetchone()[0]
+        date = DatabaseClock.clock().now()
     else:
         date = datetime.now()  # If not know how to get database datetime, returns local datetime (this is fine for sqlite, which is local)
 
@@ -83,3 +186,18 @@ def getSqlFnc(fncName: str) -> str:
         return {'CEIL': 'CEILING'}.get(fncName, fncName)
 
     return fncName
+
+def hasRowLocking() -> bool:
+    """
+    Returns True if database locks rows on select_for_update (i.e. sqlite does not)
+    """
+    return connection.features.has_select_for_update
+
+def getLockingOptions() -> typing.Dict[str, bool]:
+    """
+    Returns the select_for_update options to use for claiming rows (jobs, tasks, ...).
+    If database supports it, rows locked by others are skipped instead of waiting for them to be released
+    """
+    if connection.features.has_select_for_update_skip_locked:
+        return {'skip_locked': True}
+    return {}
@@ -30,9 +30,8 @@
 """
 .. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
 """
-import io
-import csv
 import logging
+import typing
 
 from django.utils.translation import ugettext, ugettext_lazy as _
 
@@ -44,6 +43,9 @@ from .base import ListReport
 
 logger = logging.getLogger(__name__)
 
+# Users read from database on every round trip when generating the csv list
+CHUNK_SIZE = 2000
+
 
 class ListReportUsers(ListReport):
     filename = 'users.pdf'
@@ -101,17 +103,15 @@ class ListReportsUsersCSV(ListReportUsers):
             auth = Authenticator.objects.get(uuid=self.authenticator.value)
             self.filename = auth.name + '.csv'
 
-    def generate(self) -> bytes:
-        output = io.StringIO()
-        writer = csv.writer(output)
+    def generateStream(self) -> typing.Iterator[str]:
         auth = Authenticator.objects.get(uuid=self.authenticator.value)
-        users = auth.users.order_by('name')
 
-        writer.writerow([ugettext('User ID'), ugettext('Real Name'), ugettext('Last access')])
+        def rows() -> typing.Iterator[typing.List[typing.Any]]:
+            yield [ugettext('User ID'), ugettext('Real Name'), ugettext('Last access')]
+            for v in auth.users.order_by('name').values_list('name', 'real_name', 'last_access').iterator(chunk_size=CHUNK_SIZE):
+                yield list(v)
 
-        for v in users:
-            writer.writerow([v.name, v.real_name, v.last_access])
+        return self.csvStream(rows())
 
-        # writer.writerow(['ñoño', 'ádios', 'hola'])
-
-        return output.getvalue().encode()
+    def generate(self) -> bytes:
+        return ''.join(self.generateStream()).encode()
@@ -37,8 +37,8 @@ import logging
 import typing
 
 from django.utils.translation import ugettext, ugettext_lazy as _
-from django.db.models import Count
 import django.template.defaultfilters as filters
+import numpy as np
 
 from uds.core.ui import gui
 from uds.core.util.stats import events
@@ -104,6 +104,52 @@ class PoolPerformanceReport(StatsReport):
         for p in ServicePool.objects.filter(uuid__in=self.pools.value):
             yield (str(p.id), p.name)
 
+    def __binEvents(
+        self, bounds: 'np.ndarray', poolIndex: typing.Dict[int, int]
+    ) -> typing.Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Reads the access events of all pools in range just once, and bins them
+        into (pool, interval) matrices of distinct users and accesses
+        """
+        fld = events.statsManager().getEventFldFor('username')
+        rows = (
+            events.statsManager()
+            .getEvents(
+                events.OT_DEPLOYED,
+                events.ET_ACCESS,
+                since=int(bounds[0]),
+                to=int(bounds[-1]),
+                owner_id=list(poolIndex.keys()),
+            )
+            .order_by()
+            .values_list('owner_id', 'stamp', fld)
+        )
+
+        owners: typing.List[int] = []
+        stamps: typing.List[int] = []
+        names: typing.List[str] = []
+        for owner, stamp, name in rows.iterator():
+            owners.append(poolIndex[owner])
+            stamps.append(stamp)
+            names.append(name)
+
+        shape = (len(poolIndex), len(bounds) - 1)
+        if not stamps:
+            return np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+
+        # Flat (pool, interval) cell of every event
+        cells = np.array(owners, dtype=np.int64) * shape[1] + (
+            np.searchsorted(bounds, np.array(stamps, dtype=np.int64), side='right') - 1
+        )
+        accesses = np.bincount(cells, minlength=shape[0] * shape[1])
+
+        # Distinct (cell, user) pairs, counted by cell
+        userNames, userCodes = np.unique(np.array(names, dtype=object), return_inverse=True)
+        pairs = np.unique(cells * len(userNames) + userCodes)
+        users = np.bincount(pairs // len(userNames), minlength=shape[0] * shape[1])
+
+        return users.reshape(shape), accesses.reshape(shape)
+
     def getRangeData(
         self,
     ) -> typing.Tuple[str, typing.List, typing.List]:  # pylint: disable=too-many-locals
@@ -121,7 +167,7 @@ class PoolPerformanceReport(StatsReport):
 
         samplingPoints = self.samplingPoints.num()
 
-        pools = self.getPools()
+        pools = list(self.getPools())
 
         if not pools:
             raise Exception(_('Select at least a service pool for the report'))
@@ -144,43 +190,31 @@ class PoolPerformanceReport(StatsReport):
             samplingIntervals.append((prevVal, val))
             prevVal = val
 
+        # Interval boundaries, intervals are contiguous: [bounds[i], bounds[i + 1])
+        bounds = np.array(
+            [samplingIntervals[0][0]] + [i[1] for i in samplingIntervals], dtype=np.int64
+        )
+        poolIndex = {int(p[0]): n for n, p in enumerate(pools)}
+        users, accesses = self.__binEvents(bounds, poolIndex)
+
         # Store dataUsers for all pools
         poolsData = []
-
-        fld = events.statsManager().getEventFldFor('username')
-
         reportData = []
-        for p in pools:
+        for n, p in enumerate(pools):
             dataUsers = []
             dataAccesses = []
-            for interval in samplingIntervals:
+            for i, interval in enumerate(samplingIntervals):
                 key = (interval[0] + interval[1]) / 2
-                q = (
-                    events.statsManager()
-                    .getEvents(
-                        events.OT_DEPLOYED,
-                        events.ET_ACCESS,
-                        since=interval[0],
-                        to=interval[1],
-                        owner_id=p[0],
-                    )
-                    .values(fld)
-                    .annotate(cnt=Count(fld))
-                )
-                accesses = 0
-                for v in q:
-                    accesses += v['cnt']
-
-                dataUsers.append((key, len(q)))  # @UndefinedVariable
-                dataAccesses.append((key, accesses))
+                dataUsers.append((key, int(users[n, i])))
+                dataAccesses.append((key, int(accesses[n, i])))
                 reportData.append(
                     {
                         'name': p[1],
                         'date': tools.timestampAsStr(interval[0], xLabelFormat)
                         + ' - '
                         + tools.timestampAsStr(interval[1], xLabelFormat),
-                        'users': len(q),
-                        'accesses': accesses,
+                        'users': int(users[n, i]),
+                        'accesses': int(accesses[n, i]),
                     }
                 )
             poolsData.append(
@@ -29,8 +29,6 @@
 """
 .. moduleauthor:: Adolfo Gómez, dkmaster at dkmon dot com
 """
-import io
-import csv
 import datetime
 import logging
 import typing
@@ -46,6 +44,9 @@ from .base import StatsReport
 
 logger = logging.getLogger(__name__)
 
+# Events read from database on every round trip
+CHUNK_SIZE = 2000
+
 
 class UsageByPool(StatsReport):
     filename = 'pools_usage.pdf'
@@ -85,16 +86,15 @@ class UsageByPool(StatsReport):
         ]
         self.pool.setValues(vals)
 
-    def getData(self) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], str]:
-        # Generate the sampling intervals and get dataUsers from db
-        start = self.startDate.stamp()
-        end = self.endDate.stamp()
+    def getPools(self) -> typing.Iterable[ServicePool]:
         logger.debug(self.pool.value)
         if '0-0-0-0' in self.pool.value:
-            pools = ServicePool.objects.all()
-        else:
-            pools = ServicePool.objects.filter(uuid__in=self.pool.value)
-        data = []
+            return ServicePool.objects.all()
+        return ServicePool.objects.filter(uuid__in=self.pool.value)
+
+    def iterateData(self, pools: typing.Iterable[ServicePool]) -> typing.Iterator[typing.Dict[str, typing.Any]]:
+        start = self.startDate.stamp()
+        end = self.endDate.stamp()
         for pool in pools:
             items = (
                 events.statsManager()
@@ -109,7 +109,7 @@ class UsageByPool(StatsReport):
             )
 
             logins = {}
-            for i in items:
+            for i in items.iterator(chunk_size=CHUNK_SIZE):
                 # if '\\' in i.fld1:
                 #    continue
 
@@ -120,18 +120,19 @@ class UsageByPool(StatsReport):
                         stamp = logins[i.fld4]
                         del logins[i.fld4]
                         total = i.stamp - stamp
-                        data.append(
-                            {
-                                'name': i.fld4,
-                                'origin': i.fld2.split(':')[0],
-                                'date': datetime.datetime.fromtimestamp(stamp),
-                                'time': total,
-                                'pool': pool.uuid,
-                                'pool_name': pool.name,
-                            }
-                        )
-
-        return data, ','.join([p.name for p in pools])
+                        yield {
+                            'name': i.fld4,
+                            'origin': i.fld2.split(':')[0],
+                            'date': datetime.datetime.fromtimestamp(stamp),
+                            'time': total,
+                            'pool': pool.uuid,
+                            'pool_name': pool.name,
+                        }
+
+    def getData(self) -> typing.Tuple[typing.List[typing.Dict[str, typing.Any]], str]:
+        # Generate the sampling intervals and get dataUsers from db
+        pools = self.getPools()
+        return list(self.iterateData(pools)), ','.join([p.name for p in pools])
 
     def generate(self):
         items, poolName = self.getData()
@@ -158,25 +159,19 @@ class UsageByPoolCSV(UsageByPool):
     startDate = UsageByPool.startDate
     endDate = UsageByPool.endDate
 
-    def generate(self):
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        reportData = self.getData()[0]
-
-        writer.writerow(
-            [
+    def generateStream(self) -> typing.Iterator[str]:
+        def rows() -> typing.Iterator[typing.List[typing.Any]]:
+            yield [
                 ugettext('Date'),
                 ugettext('User'),
                 ugettext('Seconds'),
                 ugettext('Pool'),
                 ugettext('Origin'),
             ]
-        )
+            for v in self.iterateData(self.getPools()):
+                yield [v['date'], v['name'], v['time'], v['pool_name'], v['origin']]
 
-        for v in reportData:
-            writer.writerow(
-                [v['date'], v['name'], v['time'], v['pool_name'], v['origin']]
-            )
+        return self.csvStream(rows())
 
-        return output.getvalue()
+    def generate(self):
+        return ''.join(self.generateStream())
@@ -36,6 +36,8 @@ import logging
 import typing
 
 from django.utils.translation import ugettext, ugettext_lazy as _
+from django.db.models import F, Count
+from django.db.models.functions import Floor
 import django.template.defaultfilters as filters
 
 from uds.core.ui import gui
@@ -121,20 +123,29 @@ class StatsReportLogin(StatsReport):
             samplingIntervals.append((prevVal, val))
             prevVal = val
 
+        # Intervals are contiguous and of the same size, so count all of them in just one query
+        first = samplingIntervals[0][0]
+        size = samplingIntervals[0][1] - first
+        counts = {
+            int(v['interval']): v['count']
+            for v in events.statsManager()
+            .getEvents(
+                events.OT_AUTHENTICATOR,
+                events.ET_LOGIN,
+                since=first,
+                to=samplingIntervals[-1][1],
+            )
+            .annotate(interval=Floor((F('stamp') - first) / size))
+            .values('interval')
+            .annotate(count=Count('id'))
+            .order_by()
+        }
+
         data = []
         reportData = []
-        for interval in samplingIntervals:
+        for n, interval in enumerate(samplingIntervals):
             key = (interval[0] + interval[1]) / 2
-            val = (
-                events.statsManager()
-                .getEvents(
-                    events.OT_AUTHENTICATOR,
-                    events.ET_LOGIN,
-                    since=interval[0],
-                    to=interval[1],
-                )
-                .count()
-            )
+            val = counts.get(n, 0)
             data.append((key, val))  # @UndefinedVariable
             reportData.append(
                 {
@@ -154,14 +165,19 @@ class StatsReportLogin(StatsReport):
         dataWeek = [0] * 7
         dataHour = [0] * 24
         dataWeekHour = [[0] * 24 for _ in range(7)]
-        for val in events.statsManager().getEvents(
-            events.OT_AUTHENTICATOR, events.ET_LOGIN, since=start, to=end
+        # Counted by quarters of hour, so local time is right for any timezone offset
+        for val in (
+            events.statsManager()
+            .getEvents(events.OT_AUTHENTICATOR, events.ET_LOGIN, since=start, to=end)
+            .annotate(quarter=Floor(F('stamp') / 900))
+            .values('quarter')
+            .annotate(count=Count('id'))
+            .order_by()
         ):
-            s = datetime.datetime.fromtimestamp(val.stamp)
-            dataWeek[s.weekday()] += 1
-            dataHour[s.hour] += 1
-            dataWeekHour[s.weekday()][s.hour] += 1
-            logger.debug('Data: %s %s', s.weekday(), s.hour)
+            s = datetime.datetime.fromtimestamp(int(val['quarter']) * 900)
+            dataWeek[s.weekday()] += val['count']
+            dataHour[s.hour] += val['count']
+            dataWeekHour[s.weekday()][s.hour] += val['count']
 
         return dataWeek, dataHour, dataWeekHour
 
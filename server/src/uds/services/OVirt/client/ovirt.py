@@ -211,6 +211,7 @@ class Client:
             clusters = api.system_service().clusters_service().list()
 
             res: typing.List[typing.MutableMapping[str, typing.Any]] = []
+            clustersInfo: typing.Dict[typing.Union[str, bytes], typing.Any] = {}
 
             cluster: typing.Any
             for cluster in clusters:
@@ -219,12 +220,12 @@ class Client:
                 val = {'name': cluster.name, 'id': cluster.id, 'datacenter_id': dc.id if dc else None}
 
                 # Updates cache info for every single cluster
-                clKey = self.__getKey('o-cluster' + cluster.id)
-                self._cache.put(clKey, val)
+                clustersInfo[self.__getKey('o-cluster' + cluster.id)] = val
 
                 if dc is not None:
                     res.append(val)
 
+            self._cache.putMany(clustersInfo)
             self._cache.put(clsKey, res, Client.CACHE_TIME_HIGH)
 
             return res
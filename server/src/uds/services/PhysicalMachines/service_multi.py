@@ -106,13 +106,15 @@ class IPMachinesService(IPServiceBase):
             # Remove non existing "locked" ips from storage now
             skipKey = self.storage.getKey('ips')
             with transaction.atomic():
+                removed = []
                 for key, data, _ in self.storage.filter(forUpdate=True):
                     if key == skipKey: # Avoid "ips" key
                         continue
                     # If not in current active list of ips, remove it
                     if data.decode() not in active:
                         logger.info('IP %s locked but not in active list. Removed', data.decode())
-                        self.storage.remove(data.decode())
+                        removed.append(data.decode())
+                self.storage.remove(removed)  # All of them at once
 
         self._token = self.token.value.strip()
         self._port = self.port.value
@@ -153,11 +155,16 @@ class IPMachinesService(IPServiceBase):
     def getUnassignedMachine(self) -> typing.Optional[str]:
         # Search first unassigned machine
         try:
-            for ip in self._ips:
-                theIP = ip.split('~')[0]
-                if self.storage.readData(theIP) is None:
-                    if self._port > 0 and self.cache.get('port{}'.format(theIP)):
+            ips = [ip.split('~')[0] for ip in self._ips]
+            # Read all assigned & recently failed ips at once
+            assigned = self.storage.getMany(ips)
+            failed = self.cache.getMany(['port{}'.format(theIP) for theIP in ips]) if self._port > 0 else {}
+            for theIP in ips:
+                if assigned[theIP] is None:
+                    if failed.get('port{}'.format(theIP)):
                         continue  # The check failed not so long ago, skip it...
+                    if self.storage.readData(theIP) is not None:
+                        continue  # Assigned since we read them
                     self.storage.saveData(theIP, theIP)
                     # Now, check if it is available on port, if required...
                     if self._port > 0:
@@ -180,7 +187,8 @@ class IPMachinesService(IPServiceBase):
             logger.exception("Exception at getUnassignedMachine")
 
     def listAssignables(self):
-        return [(ip, ip.split('~')[0]) for ip in self._ips if self.storage.readData(ip) is None]
+        assigned = self.storage.getMany(self._ips)
+        return [(ip, ip.split('~')[0]) for ip in self._ips if assigned[ip] is None]
 
     def assignFromAssignables(self, assignableId: str, user: 'models.User', userDeployment: 'services.UserDeployment') -> str:
         userServiceInstance: IPMachineDeployed = typing.cast(IPMachineDeployed, userDeployment)
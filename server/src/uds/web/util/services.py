@@ -29,6 +29,7 @@
 @author: Adolfo Gómez, dkmaster at dkmon dot com
 '''
 import logging
+import threading
 import typing
 
 from django.utils.translation import ugettext
@@ -57,6 +58,71 @@ if typing.TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 
+class _TransportsEligibility:
+    """
+    Keeps the transports of every pool that are valid for an OS and the set of networks an ip belongs to
+    (so all ips on same networks shares them), so they are not checked again on every services list.
+    Cached data is dropped when networks or transports change (networks index version changes)
+    """
+
+    MAX_ENTRIES: typing.ClassVar[int] = 10000
+    _instance: typing.ClassVar[typing.Optional['_TransportsEligibility']] = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version: typing.Any = None
+        # (pool id, os, networks) -> valid transports ids
+        self._eligible: typing.Dict[typing.Tuple[int, str, typing.FrozenSet[int]], typing.FrozenSet[int]] = {}
+
+    @staticmethod
+    def eligibility() -> '_TransportsEligibility':
+        if not _TransportsEligibility._instance:
+            _TransportsEligibility._instance = _TransportsEligibility()
+        return _TransportsEligibility._instance
+
+    @staticmethod
+    def isValid(transport: Transport, ip: str, osName: str) -> bool:
+        try:
+            typeTrans = transport.getType()
+        except Exception:
+            return False
+        return bool(
+            typeTrans
+            and transport.validForIp(ip)
+            and typeTrans.supportsOs(osName)
+            and transport.validForOs(osName)
+        )
+
+    def validTransports(
+        self, pool: ServicePool, ip: str, osName: str
+    ) -> typing.List[Transport]:
+        """
+        Returns the transports of pool valid for ip and os, sorted by priority
+        """
+        version = Network.indexVersion()
+        key = (pool.id, osName, Network.idsFor(ip))
+        with self._lock:
+            if version != self._version:
+                self._eligible = {}
+                self._version = version
+            eligible = self._eligible.get(key)
+
+        transports = pool.transports.all()  # Prefetched
+        if eligible is None:
+            eligible = frozenset(
+                t.id for t in transports if _TransportsEligibility.isValid(t, ip, osName)
+            )
+            with self._lock:
+                if len(self._eligible) >= _TransportsEligibility.MAX_ENTRIES:
+                    self._eligible = {}
+                self._eligible[key] = eligible
+
+        # In memory sort, allows reuse prefetched and not too big array
+        return sorted(
+            (t for t in transports if t.id in eligible), key=lambda x: x.priority
+        )
+
+
 def getServicesData(
     request: 'ExtendedHttpRequestWithUser',
 ) -> typing.Dict[
@@ -97,7 +163,7 @@ def getServicesData(
         nets = ','.join([n.name for n in Network.networksFor(request.ip)])
         tt = []
         t: Transport
-        for t in Transport.objects.all().prefetch_related('networks'):
+        for t in Transport.objects.all():
             if t.validForIp(request.ip):
                 tt.append(t.name)
         validTrans = ','.join(tt)
@@ -116,16 +182,10 @@ def getServicesData(
         for member in meta.members.all():
             # if pool.isInMaintenance():
             #    continue
-            for t in member.pool.transports.all():
-                typeTrans = t.getType()
-                if (
-                    t.getType()
-                    and t.validForIp(request.ip)
-                    and typeTrans.supportsOs(osName)
-                    and t.validForOs(osName)
-                ):
-                    hasUsablePools = True
-                    break
+            if _TransportsEligibility.eligibility().validTransports(
+                member.pool, request.ip, osName
+            ):
+                hasUsablePools = True
 
             # if not in_use and meta.number_in_use:  # Only look for assignation on possible used
             #     assignedUserService = userServiceManager().getExistingAssignationForUser(pool, request.user)
@@ -181,25 +241,16 @@ def getServicesData(
         use = str(sPool.usage(typing.cast(typing.Any, sPool).usage_count)) + '%'
 
         trans = []
-        for t in sorted(
-            sPool.transports.all(), key=lambda x: x.priority
-        ):  # In memory sort, allows reuse prefetched and not too big array
-            try:
-                typeTrans = t.getType()
-            except Exception:
-                continue
-            if (
-                t.validForIp(request.ip)
-                and typeTrans.supportsOs(osName)
-                and t.validForOs(osName)
-            ):
-                if typeTrans.ownLink:
-                    link = reverse('TransportOwnLink', args=('F' + sPool.uuid, t.uuid))
-                else:
-                    link = html.udsAccessLink(request, 'F' + sPool.uuid, t.uuid)
-                trans.append(
-                    {'id': t.uuid, 'name': t.name, 'link': link, 'priority': t.priority}
-                )
+        for t in _TransportsEligibility.eligibility().validTransports(
+            sPool, request.ip, osName
+        ):
+            if t.getType().ownLink:
+                link = reverse('TransportOwnLink', args=('F' + sPool.uuid, t.uuid))
+            else:
+                link = html.udsAccessLink(request, 'F' + sPool.uuid, t.uuid)
+            trans.append(
+                {'id': t.uuid, 'name': t.name, 'link': link, 'priority': t.priority}
+            )
 
         # If empty transports, do not include it on list
         if not trans: